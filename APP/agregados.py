@@ -0,0 +1,192 @@
+"""
+Agregados dos registros (quantidade, soma, mínimo, máximo e média)
+mantidos a cada inserção, usados pelo relatório da simulação e da API
+"""
+from datetime import datetime
+from functools import reduce
+from operator import add
+
+from modulos import MODULOS
+
+
+def valor_registro(registro, campo):
+    """Valor numérico de um registro, ou None se ausente ou não numérico"""
+    if campo == 'itens':
+        try:
+            return sum(item['quantidade'] * item['valorUnitario'] for item in registro.get('itens') or [])
+        except (KeyError, TypeError):
+            return None
+
+    valor = registro.get(campo)
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+        return None
+    return valor
+
+
+class Estatistica:
+    """Quantidade, soma, mínimo e máximo de uma série de valores"""
+
+    def __init__(self):
+        self.quantidade = 0
+        self.soma = 0
+        self.minimo = None
+        self.maximo = None
+
+    def registrar(self, valor):
+        self.quantidade += 1
+        self.soma += valor
+        if self.minimo is None or valor < self.minimo:
+            self.minimo = valor
+        if self.maximo is None or valor > self.maximo:
+            self.maximo = valor
+
+    def registrar_varios(self, valores):
+        """Mesmo resultado de registrar cada valor, na mesma ordem"""
+        if not valores:
+            return
+        self.quantidade += len(valores)
+        self.soma = reduce(add, valores, self.soma)
+        self.minimo = min(valores if self.minimo is None else [self.minimo, *valores])
+        self.maximo = max(valores if self.maximo is None else [self.maximo, *valores])
+
+    def mesclar(self, outra):
+        if not outra.quantidade:
+            return
+        self.quantidade += outra.quantidade
+        self.soma += outra.soma
+        if self.minimo is None or outra.minimo < self.minimo:
+            self.minimo = outra.minimo
+        if self.maximo is None or outra.maximo > self.maximo:
+            self.maximo = outra.maximo
+
+    def como_dict(self):
+        return {
+            "quantidade": self.quantidade,
+            "soma": self.soma,
+            "minimo": self.minimo,
+            "maximo": self.maximo,
+            "media": self.soma / self.quantidade if self.quantidade else 0
+        }
+
+
+class AgregadosModulo:
+    """Agregados de um módulo: total de registros, estatística do campo de
+    valor e a mesma estatística separada por cada campo de agrupamento
+
+    registrar é chamado pela TabelaIndexada a cada registro indexado, de
+    modo que o relatório não precisa percorrer os registros. Agregados de
+    tabelas diferentes (por exemplo, de vários processos) podem ser
+    combinados com mesclar.
+    """
+
+    def __init__(self, campo_valor=None, agrupamentos=()):
+        self.campo_valor = campo_valor
+        self.agrupamentos = list(agrupamentos)
+        self.total_registros = 0
+        self.valores = Estatistica()
+        # campo -> {valor do campo: Estatistica}
+        self.grupos = {campo: {} for campo in self.agrupamentos}
+
+    def registrar(self, registro):
+        self.total_registros += 1
+        if not self.campo_valor:
+            return
+
+        valor = valor_registro(registro, self.campo_valor)
+        if valor is None:
+            return
+        self.valores.registrar(valor)
+
+        for campo in self.agrupamentos:
+            chave = registro.get(campo)
+            if chave is None:
+                continue
+            chave = str(chave)
+            grupo = self.grupos[campo].get(chave)
+            if grupo is None:
+                grupo = self.grupos[campo][chave] = Estatistica()
+            grupo.registrar(valor)
+
+    def registrar_varios(self, registros):
+        """Mesmo resultado de registrar cada registro, em uma passada por campo (carga do motor)"""
+        self.total_registros += len(registros)
+        if not self.campo_valor:
+            return
+
+        valores = [valor_registro(registro, self.campo_valor) for registro in registros]
+        self.valores.registrar_varios([valor for valor in valores if valor is not None])
+
+        for campo in self.agrupamentos:
+            por_chave = {}
+            for registro, valor in zip(registros, valores):
+                if valor is None:
+                    continue
+                chave = registro.get(campo)
+                if chave is None:
+                    continue
+                por_chave.setdefault(str(chave), []).append(valor)
+            grupos = self.grupos[campo]
+            for chave, valores_chave in por_chave.items():
+                grupo = grupos.get(chave)
+                if grupo is None:
+                    grupo = grupos[chave] = Estatistica()
+                grupo.registrar_varios(valores_chave)
+
+    def mesclar(self, outro):
+        self.total_registros += outro.total_registros
+        self.valores.mesclar(outro.valores)
+        for campo, grupos in outro.grupos.items():
+            destino = self.grupos.setdefault(campo, {})
+            for chave, estatistica in grupos.items():
+                destino.setdefault(chave, Estatistica()).mesclar(estatistica)
+
+    def como_dict(self):
+        resultado = {"total_registros": self.total_registros}
+        if self.campo_valor:
+            resultado["campo_valor"] = self.campo_valor
+            resultado["valores"] = self.valores.como_dict()
+        for campo, grupos in self.grupos.items():
+            resultado[f"por_{campo}"] = {
+                chave: estatistica.como_dict() for chave, estatistica in sorted(grupos.items())
+            }
+        return resultado
+
+
+def criar_agregados(modulo):
+    """Cria os agregados de um módulo conforme a definição em MODULOS"""
+    definicao = MODULOS[modulo]
+    return AgregadosModulo(definicao['campo_valor'], definicao['agrupamentos'])
+
+
+def estatisticas_modulo(modulo, agregados):
+    """Estatísticas de um módulo no formato do relatório"""
+    estatisticas = agregados.como_dict()
+
+    # Totais específicos mantidos do formato original do relatório
+    if modulo == 'financeiro' and agregados.total_registros:
+        por_tipo = agregados.grupos['tipo']
+        total_receitas = por_tipo['RECEITA'].soma if 'RECEITA' in por_tipo else 0
+        total_despesas = por_tipo['DESPESA'].soma if 'DESPESA' in por_tipo else 0
+        estatisticas.update({
+            "total_receitas": total_receitas,
+            "total_despesas": total_despesas,
+            "saldo": total_receitas - total_despesas
+        })
+    elif modulo == 'fiscal' and agregados.total_registros:
+        estatisticas.update({
+            "total_valor_notas": agregados.valores.soma,
+            "media_valor": agregados.valores.soma / agregados.total_registros
+        })
+
+    return estatisticas
+
+
+def montar_relatorio(banco):
+    """Monta o relatório a partir dos agregados das tabelas, em O(número de módulos)"""
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "estatisticas": {
+            modulo: estatisticas_modulo(modulo, tabela.agregados)
+            for modulo, tabela in banco.items()
+        }
+    }
@@ -0,0 +1,277 @@
+"""
+Relatórios analíticos dos lançamentos (fluxo de caixa, saldos por conta e
+balancete) calculados sobre colunas NumPy
+"""
+from datetime import datetime
+
+import numpy as np
+
+from agregados import valor_registro
+
+# Módulos com colunas analíticas e seus campos de categoria
+CATEGORIAS = {
+    'financeiro': ('tipo', 'conta'),
+    'contabil': ('debito', 'credito')
+}
+
+PERIODOS = {
+    'dia': 'datetime64[D]',
+    'mes': 'datetime64[M]'
+}
+
+
+def data_ou_nat(texto):
+    """Data (datetime64[D]) de um texto YYYY-MM-DD, ou NaT se inválida"""
+    try:
+        return np.datetime64(texto, 'D')
+    except ValueError:
+        return np.datetime64('NaT')
+
+
+class ColunasLancamentos:
+    """Colunas numéricas dos lançamentos, mantidas ao lado da TabelaIndexada
+
+    Cada registro indexado acrescenta uma linha: valor (float64, NaN se não
+    numérico), data (datetime64[D], NaT se inválida) e, para cada campo de
+    categoria, o código do valor em um dicionário compartilhado por todos
+    os campos (-1 se ausente), o que permite comparar débito e crédito. Os
+    arrays crescem dobrando a capacidade; visao() retorna as linhas usadas.
+    Colunas de tabelas diferentes podem ser combinadas com mesclar.
+    """
+
+    CAPACIDADE_INICIAL = 1024
+
+    def __init__(self, categorias):
+        self.categorias = list(categorias)
+        self.tamanho = 0
+        self.valor = np.empty(self.CAPACIDADE_INICIAL, dtype=np.float64)
+        self.data = np.empty(self.CAPACIDADE_INICIAL, dtype='datetime64[D]')
+        self.codigos = {campo: np.empty(self.CAPACIDADE_INICIAL, dtype=np.int32) for campo in self.categorias}
+        # Dicionário das categorias: valor -> código, e código -> valor
+        self.dicionario = {}
+        self.rotulos = []
+
+    def __len__(self):
+        return self.tamanho
+
+    def crescer(self):
+        capacidade = max(len(self.valor) * 2, self.CAPACIDADE_INICIAL)
+        self.valor = np.resize(self.valor, capacidade)
+        self.data = np.resize(self.data, capacidade)
+        self.codigos = {campo: np.resize(codigos, capacidade) for campo, codigos in self.codigos.items()}
+
+    def codigo(self, valor):
+        if valor is None:
+            return -1
+        valor = str(valor)
+        codigo = self.dicionario.get(valor)
+        if codigo is None:
+            codigo = self.dicionario[valor] = len(self.rotulos)
+            self.rotulos.append(valor)
+        return codigo
+
+    def registrar(self, registro):
+        """Acrescenta a linha de um registro às colunas"""
+        if self.tamanho == len(self.valor):
+            self.crescer()
+        linha = self.tamanho
+
+        valor = valor_registro(registro, 'valor')
+        self.valor[linha] = np.nan if valor is None else valor
+        self.data[linha] = data_ou_nat(str(registro.get('data'))[:10])
+        for campo in self.categorias:
+            self.codigos[campo][linha] = self.codigo(registro.get(campo))
+
+        self.tamanho += 1
+
+    def registrar_varios(self, registros):
+        """Acrescenta as linhas de vários registros de uma vez (carga do motor)"""
+        inicio, fim = self.tamanho, self.tamanho + len(registros)
+        while fim > len(self.valor):
+            self.crescer()
+
+        valores = [valor_registro(registro, 'valor') for registro in registros]
+        self.valor[inicio:fim] = [np.nan if valor is None else valor for valor in valores]
+        datas = [str(registro.get('data'))[:10] for registro in registros]
+        try:
+            self.data[inicio:fim] = np.array(datas, dtype='datetime64[D]')
+        except ValueError:
+            # Alguma data inválida: convertidas uma a uma, com NaT nas inválidas
+            self.data[inicio:fim] = [data_ou_nat(data) for data in datas]
+        # Os códigos são atribuídos registro a registro, na mesma ordem de registrar
+        codigos = {campo: [] for campo in self.categorias}
+        for registro in registros:
+            for campo in self.categorias:
+                codigos[campo].append(self.codigo(registro.get(campo)))
+        for campo in self.categorias:
+            self.codigos[campo][inicio:fim] = codigos[campo]
+
+        self.tamanho = fim
+
+    def mesclar(self, outras):
+        """Acrescenta as linhas de outras colunas (por exemplo, de outro processo)
+
+        Os códigos das categorias de outras são traduzidos para o dicionário
+        destas colunas; as linhas ficam depois das atuais, na mesma ordem.
+        """
+        valor, data, codigos = outras.visao()
+        inicio, fim = self.tamanho, self.tamanho + len(valor)
+        while fim > len(self.valor):
+            self.crescer()
+        # O último elemento traduz o código -1 (categoria ausente)
+        traducao = np.array([self.codigo(rotulo) for rotulo in outras.rotulos] + [-1], dtype=np.int32)
+        self.valor[inicio:fim] = valor
+        self.data[inicio:fim] = data
+        for campo in self.categorias:
+            self.codigos[campo][inicio:fim] = traducao[codigos[campo]]
+        self.tamanho = fim
+
+    def visao(self):
+        """Colunas com as linhas usadas: (valor, data, {campo: códigos})"""
+        n = self.tamanho
+        return self.valor[:n], self.data[:n], {campo: codigos[:n] for campo, codigos in self.codigos.items()}
+
+
+def criar_colunas(modulo):
+    """Cria as colunas analíticas de um módulo, ou None se ele não tiver relatórios analíticos"""
+    if modulo not in CATEGORIAS:
+        return None
+    return ColunasLancamentos(CATEGORIAS[modulo])
+
+
+def data_parametro(parametros, nome):
+    """Lê uma data (YYYY-MM-DD) dos parâmetros do relatório"""
+    valor = parametros.get(nome)
+    if not valor:
+        return None
+    try:
+        return np.datetime64(valor, 'D')
+    except ValueError:
+        raise ValueError(f"Parâmetro inválido: {nome}")
+
+
+def linhas_validas(valor, data, parametros):
+    """Máscara das linhas com valor e data válidos dentro do período informado"""
+    mascara = ~np.isnan(valor) & ~np.isnat(data)
+    inicio = data_parametro(parametros, 'data_inicio')
+    fim = data_parametro(parametros, 'data_fim')
+    if inicio is not None:
+        mascara &= data >= inicio
+    if fim is not None:
+        mascara &= data <= fim
+    return mascara
+
+
+def arredondar(valores):
+    return [round(float(valor), 2) for valor in valores]
+
+
+def fluxo_caixa(banco, parametros):
+    """Entradas (RECEITA), saídas (DESPESA) e saldo do financeiro por dia ou mês"""
+    periodo = parametros.get('periodo', 'dia')
+    if periodo not in PERIODOS:
+        raise ValueError("Parâmetro inválido: periodo (use dia ou mes)")
+
+    colunas = banco['financeiro'].colunas
+    valor, data, codigos = colunas.visao()
+    mascara = linhas_validas(valor, data, parametros)
+    valor, tipo = valor[mascara], codigos['tipo'][mascara]
+
+    periodos, grupo = np.unique(data[mascara].astype(PERIODOS[periodo]), return_inverse=True)
+    grupo = grupo.ravel()
+    receita = colunas.dicionario.get('RECEITA', -1)
+    despesa = colunas.dicionario.get('DESPESA', -1)
+    entradas = np.bincount(grupo, weights=np.where(tipo == receita, valor, 0), minlength=len(periodos))
+    saidas = np.bincount(grupo, weights=np.where(tipo == despesa, valor, 0), minlength=len(periodos))
+    saldo = entradas - saidas
+
+    return {
+        "periodo": periodo,
+        "fluxo": [
+            {
+                "periodo": str(p),
+                "entradas": e,
+                "saidas": s,
+                "saldo": sd,
+                "saldo_acumulado": a
+            }
+            for p, e, s, sd, a in zip(
+                periodos, arredondar(entradas), arredondar(saidas), arredondar(saldo), arredondar(np.cumsum(saldo))
+            )
+        ]
+    }
+
+
+def saldos_conta(banco, parametros):
+    """Entradas, saídas e saldo do financeiro por conta"""
+    colunas = banco['financeiro'].colunas
+    valor, data, codigos = colunas.visao()
+    mascara = linhas_validas(valor, data, parametros) & (codigos['conta'] >= 0)
+    valor, tipo, conta = valor[mascara], codigos['tipo'][mascara], codigos['conta'][mascara]
+
+    total = len(colunas.rotulos)
+    receita = colunas.dicionario.get('RECEITA', -1)
+    despesa = colunas.dicionario.get('DESPESA', -1)
+    quantidade = np.bincount(conta, minlength=total)
+    entradas = np.bincount(conta, weights=np.where(tipo == receita, valor, 0), minlength=total)
+    saidas = np.bincount(conta, weights=np.where(tipo == despesa, valor, 0), minlength=total)
+
+    return {
+        "contas": {
+            colunas.rotulos[codigo]: {
+                "lancamentos": int(quantidade[codigo]),
+                "entradas": round(float(entradas[codigo]), 2),
+                "saidas": round(float(saidas[codigo]), 2),
+                "saldo": round(float(entradas[codigo] - saidas[codigo]), 2)
+            }
+            for codigo in sorted(np.flatnonzero(quantidade), key=lambda codigo: colunas.rotulos[codigo])
+        }
+    }
+
+
+def balancete(banco, parametros):
+    """Balancete de verificação do contábil: débitos, créditos e saldo por conta"""
+    colunas = banco['contabil'].colunas
+    valor, data, codigos = colunas.visao()
+    mascara = linhas_validas(valor, data, parametros)
+    debito = mascara & (codigos['debito'] >= 0)
+    credito = mascara & (codigos['credito'] >= 0)
+
+    total = len(colunas.rotulos)
+    debitos = np.bincount(codigos['debito'][debito], weights=valor[debito], minlength=total)
+    creditos = np.bincount(codigos['credito'][credito], weights=valor[credito], minlength=total)
+    movimentadas = np.flatnonzero(
+        np.bincount(codigos['debito'][debito], minlength=total)
+        + np.bincount(codigos['credito'][credito], minlength=total)
+    )
+
+    total_debitos = round(float(debitos.sum()), 2)
+    total_creditos = round(float(creditos.sum()), 2)
+    return {
+        "contas": {
+            colunas.rotulos[codigo]: {
+                "debitos": round(float(debitos[codigo]), 2),
+                "creditos": round(float(creditos[codigo]), 2),
+                "saldo": round(float(debitos[codigo] - creditos[codigo]), 2)
+            }
+            for codigo in sorted(movimentadas, key=lambda codigo: colunas.rotulos[codigo])
+        },
+        "total_debitos": total_debitos,
+        "total_creditos": total_creditos,
+        "diferenca": round(total_debitos - total_creditos, 2)
+    }
+
+
+# Relatórios analíticos disponíveis no gerar_relatorio e em /api/relatorio/<tipo>
+RELATORIOS = {
+    'fluxo-caixa': fluxo_caixa,
+    'saldos-conta': saldos_conta,
+    'balancete': balancete
+}
+
+
+def gerar(banco, tipo, parametros=None):
+    """Gera um relatório analítico (levanta KeyError se o tipo não existir e
+    ValueError se algum parâmetro for inválido)"""
+    relatorio = RELATORIOS[tipo](banco, parametros or {})
+    return {"timestamp": datetime.now().isoformat(), "tipo": tipo, **relatorio}
@@ -1,34 +1,18 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, g, request, send_from_directory, stream_with_context
 from flask_swagger_ui import get_swaggerui_blueprint
-import logging
 import json
 import os
-from datetime import datetime
-import uuid
-
-# Configuração de logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='[%(levelname)s] %(asctime)s - %(message)s',
-    handlers=[
-        logging.FileHandler("api.log"),
-        logging.StreamHandler()
-    ]
-)
+import time
 
-app = Flask(__name__)
+import serializacao
+import servico
+from modulos import MODULOS
+from servico import API_URL, CONTENT_TYPE_METRICAS, METRICAS_URL, SWAGGER_URL, db  # db continua acessível como app.db
 
-# Simulação de banco de dados
-db = {
-    'financeiro': [],
-    'contabil': [],
-    'fiscal': [],
-    'rh': [],
-    'compras': [],
-    'vendas': [],
-    'estoque': [],
-    'patrimonio': []
-}
+# Configuração de logging (gravação do arquivo em segundo plano)
+servico.configurar_logging("api.log")
+
+app = Flask(__name__)
 
 # Garantir que o diretório static existe
 os.makedirs('static', exist_ok=True)
@@ -41,8 +25,6 @@ def generate_swagger_json():
     return swagger_content
 
 # Configuração do Swagger
-SWAGGER_URL = '/api/docs'
-API_URL = '/static/swagger.json'
 swaggerui_blueprint = get_swaggerui_blueprint(
     SWAGGER_URL,
     API_URL,
@@ -52,273 +34,236 @@ swaggerui_blueprint = get_swaggerui_blueprint(
 )
 app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
 
+def tipo_resposta():
+    """Tipo da resposta negociado pelo Accept: JSON (padrão) ou MessagePack"""
+    return serializacao.negociar(request.accept_mimetypes)
+
+def responder(corpo, status_code=200, tipo=None):
+    """Resposta serializada por serializacao.py no tipo negociado (JSON compacto ou MessagePack)"""
+    tipo = tipo or tipo_resposta()
+    resposta = Response(serializacao.codificar(corpo, tipo), status=status_code, mimetype=tipo)
+    resposta.vary.add('Accept')
+    return resposta
+
+def ler_corpo():
+    """Lê o corpo JSON ou MessagePack da requisição (None se ausente ou inválido)"""
+    tipo = serializacao.tipo_base(request.mimetype)
+    if tipo != serializacao.MSGPACK and not request.is_json:
+        return None
+    try:
+        return serializacao.decodificar(request.get_data(), tipo)
+    except ValueError:
+        return None
+
+# Métricas por rota (ver metricas.py): o início é marcado antes da autenticação,
+# para que as requisições recusadas também sejam medidas
+def iniciar_medida():
+    g.inicio_requisicao = time.perf_counter()
+
+def registrar_medida(resposta):
+    inicio = g.get('inicio_requisicao')
+    if inicio is not None:
+        rota = request.url_rule.rule if request.url_rule else None
+        servico.metricas.registrar(request.method, rota, resposta.status_code, time.perf_counter() - inicio)
+    return resposta
+
+if servico.METRICAS_ATIVAS:
+    app.before_request(iniciar_medida)
+    app.after_request(registrar_medida)
+
 # Middleware para autenticação
 @app.before_request
 def authenticate():
-    # Ignorar autenticação para swagger e static files
-    if request.path.startswith(SWAGGER_URL) or request.path.startswith('/static'):
-        return
-    
-    # Ignorar autenticação para a rota de status
-    if request.path == '/api/status':
-        return
-    
-    api_key = request.headers.get('X-API-Key')
-    if not api_key or api_key != os.environ.get('NASAJON_API_KEY', 'api_key_simulada'):
-        return jsonify({"error": "Unauthorized"}), 401
+    erro = servico.autenticar(request.path, request.headers.get('X-API-Key'))
+    if erro:
+        corpo, status_code = erro
+        return responder(corpo, status_code)
+
+@app.before_request
+def sincronizar_tabelas():
+    servico.sincronizar(request.path)
+
+# Perfil sob demanda (ver perfilador.py), iniciado depois da autenticação
+def iniciar_perfil():
+    rota = request.url_rule.rule if request.url_rule else None
+    g.perfil = servico.iniciar_perfil(
+        request.method, rota, request.headers.get('X-Profile'), request.headers.get('X-API-Key')
+    )
+
+def encerrar_perfil(resposta):
+    perfil = g.pop('perfil', None)
+    if perfil is not None:
+        resultado = servico.encerrar_perfil(perfil, resposta.status_code)
+        resposta.headers['Server-Timing'] = (
+            f"total;dur={resultado['parede_s'] * 1000:.3f}, cpu;dur={resultado['cpu_s'] * 1000:.3f}"
+        )
+        if resultado['arquivo']:
+            resposta.headers['X-Profile-File'] = resultado['arquivo']
+    return resposta
+
+def descartar_perfil(erro=None):
+    # Requisições interrompidas por exceção não passam pelo after_request
+    perfil = g.pop('perfil', None)
+    if perfil is not None:
+        servico.encerrar_perfil(perfil, 500)
+
+if servico.PERFIL_ATIVO:
+    app.before_request(iniciar_perfil)
+    app.after_request(encerrar_perfil)
+    app.teardown_request(descartar_perfil)
+
+def criar(modulo):
+    """Cria um registro a partir do corpo (JSON ou MessagePack) da requisição"""
+    corpo, status_code = servico.criar_registro(
+        modulo, ler_corpo(), request.headers.get('Idempotency-Key')
+    )
+    return responder(corpo, status_code)
 
 # Rotas para o módulo Financeiro
 @app.route('/api/financeiro/lancamentos', methods=['POST'])
 def criar_lancamento_financeiro():
-    try:
-        data = request.json
-        
-        # Validação básica
-        required_fields = ['identificador', 'data', 'valor', 'tipo', 'conta']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Campo obrigatório ausente: {field}"}), 400
-        
-        # Adiciona ID e timestamp
-        data['id'] = str(uuid.uuid4())
-        data['timestamp'] = datetime.now().isoformat()
-        
-        # Salva no "banco de dados"
-        db['financeiro'].append(data)
-        
-        logging.info(f"Lançamento financeiro criado: {data['identificador']}")
-        
-        return jsonify({
-            "message": "Lançamento financeiro criado com sucesso",
-            "id": data['id']
-        }), 201
-    except Exception as e:
-        logging.error(f"Erro ao criar lançamento financeiro: {str(e)}")
-        return jsonify({"error": "Erro interno do servidor"}), 500
+    return criar('financeiro')
 
 @app.route('/api/financeiro/lancamentos', methods=['GET'])
 def listar_lancamentos_financeiros():
-    try:
-        return jsonify(db['financeiro']), 200
-    except Exception as e:
-        logging.error(f"Erro ao listar lançamentos financeiros: {str(e)}")
-        return jsonify({"error": "Erro interno do servidor"}), 500
+    return listar('financeiro')
 
 # Rotas para o módulo Contábil
 @app.route('/api/contabil/lancamentos', methods=['POST'])
 def criar_lancamento_contabil():
-    try:
-        data = request.json
-        
-        # Validação básica
-        required_fields = ['identificador', 'data', 'valor', 'debito', 'credito']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Campo obrigatório ausente: {field}"}), 400
-        
-        # Adiciona ID e timestamp
-        data['id'] = str(uuid.uuid4())
-        data['timestamp'] = datetime.now().isoformat()
-        
-        # Salva no "banco de dados"
-        db['contabil'].append(data)
-        
-        logging.info(f"Lançamento contábil criado: {data['identificador']}")
-        
-        return jsonify({
-            "message": "Lançamento contábil criado com sucesso",
-            "id": data['id']
-        }), 201
-    except Exception as e:
-        logging.error(f"Erro ao criar lançamento contábil: {str(e)}")
-        return jsonify({"error": "Erro interno do servidor"}), 500
+    return criar('contabil')
 
 # Rotas para o módulo Fiscal
 @app.route('/api/fiscal/notas-fiscais', methods=['POST'])
 def emitir_nota_fiscal():
-    try:
-        data = request.json
-        
-        # Validação básica
-        required_fields = ['numero', 'data', 'valor', 'cliente', 'itens']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Campo obrigatório ausente: {field}"}), 400
-        
-        # Adiciona ID e timestamp
-        data['id'] = str(uuid.uuid4())
-        data['timestamp'] = datetime.now().isoformat()
-        
-        # Salva no "banco de dados"
-        db['fiscal'].append(data)
-        
-        logging.info(f"Nota fiscal emitida: {data['numero']}")
-        
-        return jsonify({
-            "message": "Nota fiscal emitida com sucesso",
-            "id": data['id']
-        }), 201
-    except Exception as e:
-        logging.error(f"Erro ao emitir nota fiscal: {str(e)}")
-        return jsonify({"error": "Erro interno do servidor"}), 500
+    return criar('fiscal')
 
 # Rotas para o módulo RH
 @app.route('/api/rh/funcionarios', methods=['POST'])
 def cadastrar_funcionario():
-    try:
-        data = request.json
-        
-        # Validação básica
-        required_fields = ['matricula', 'nome', 'cpf', 'cargo', 'salario']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Campo obrigatório ausente: {field}"}), 400
-        
-        # Adiciona ID e timestamp
-        data['id'] = str(uuid.uuid4())
-        data['timestamp'] = datetime.now().isoformat()
-        
-        # Salva no "banco de dados"
-        db['rh'].append(data)
-        
-        logging.info(f"Funcionário cadastrado: {data['nome']}")
-        
-        return jsonify({
-            "message": "Funcionário cadastrado com sucesso",
-            "id": data['id']
-        }), 201
-    except Exception as e:
-        logging.error(f"Erro ao cadastrar funcionário: {str(e)}")
-        return jsonify({"error": "Erro interno do servidor"}), 500
+    return criar('rh')
 
 # Rotas para o módulo Compras
 @app.route('/api/compras/pedidos', methods=['POST'])
 def criar_pedido_compra():
-    try:
-        data = request.json
-        
-        # Validação básica
-        required_fields = ['numero', 'data', 'fornecedor', 'itens']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Campo obrigatório ausente: {field}"}), 400
-        
-        # Adiciona ID e timestamp
-        data['id'] = str(uuid.uuid4())
-        data['timestamp'] = datetime.now().isoformat()
-        
-        # Salva no "banco de dados"
-        db['compras'].append(data)
-        
-        logging.info(f"Pedido de compra criado: {data['numero']}")
-        
-        return jsonify({
-            "message": "Pedido de compra criado com sucesso",
-            "id": data['id']
-        }), 201
-    except Exception as e:
-        logging.error(f"Erro ao criar pedido de compra: {str(e)}")
-        return jsonify({"error": "Erro interno do servidor"}), 500
+    return criar('compras')
 
 # Rotas para o módulo Vendas
 @app.route('/api/vendas/pedidos', methods=['POST'])
 def criar_pedido_venda():
-    try:
-        data = request.json
-        
-        # Validação básica
-        required_fields = ['numero', 'data', 'cliente', 'itens']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Campo obrigatório ausente: {field}"}), 400
-        
-        # Adiciona ID e timestamp
-        data['id'] = str(uuid.uuid4())
-        data['timestamp'] = datetime.now().isoformat()
-        
-        # Salva no "banco de dados"
-        db['vendas'].append(data)
-        
-        logging.info(f"Pedido de venda criado: {data['numero']}")
-        
-        return jsonify({
-            "message": "Pedido de venda criado com sucesso",
-            "id": data['id']
-        }), 201
-    except Exception as e:
-        logging.error(f"Erro ao criar pedido de venda: {str(e)}")
-        return jsonify({"error": "Erro interno do servidor"}), 500
+    return criar('vendas')
 
 # Rotas para o módulo Estoque
 @app.route('/api/estoque/produtos', methods=['POST'])
 def cadastrar_produto():
-    try:
-        data = request.json
-        
-        # Validação básica
-        required_fields = ['codigo', 'descricao', 'unidade', 'preco']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Campo obrigatório ausente: {field}"}), 400
-        
-        # Adiciona ID e timestamp
-        data['id'] = str(uuid.uuid4())
-        data['timestamp'] = datetime.now().isoformat()
-        
-        # Salva no "banco de dados"
-        db['estoque'].append(data)
-        
-        logging.info(f"Produto cadastrado: {data['codigo']}")
-        
-        return jsonify({
-            "message": "Produto cadastrado com sucesso",
-            "id": data['id']
-        }), 201
-    except Exception as e:
-        logging.error(f"Erro ao cadastrar produto: {str(e)}")
-        return jsonify({"error": "Erro interno do servidor"}), 500
+    return criar('estoque')
 
 # Rotas para o módulo Patrimônio
 @app.route('/api/patrimonio/bens', methods=['POST'])
 def cadastrar_bem():
-    try:
-        data = request.json
-        
-        # Validação básica
-        required_fields = ['codigo', 'descricao', 'valor', 'dataAquisicao']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Campo obrigatório ausente: {field}"}), 400
-        
-        # Adiciona ID e timestamp
-        data['id'] = str(uuid.uuid4())
-        data['timestamp'] = datetime.now().isoformat()
-        
-        # Salva no "banco de dados"
-        db['patrimonio'].append(data)
-        
-        logging.info(f"Bem patrimonial cadastrado: {data['codigo']}")
-        
-        return jsonify({
-            "message": "Bem patrimonial cadastrado com sucesso",
-            "id": data['id']
-        }), 201
-    except Exception as e:
-        logging.error(f"Erro ao cadastrar bem patrimonial: {str(e)}")
-        return jsonify({"error": "Erro interno do servidor"}), 500
+    return criar('patrimonio')
+
+# Rotas de lote (um array JSON ou MessagePack, ou um stream NDJSON, por requisição)
+def ler_lote():
+    """Lê os registros do corpo de uma requisição de lote"""
+    if request.mimetype == 'application/x-ndjson':
+        return servico.ler_ndjson(request.stream)
+    return ler_corpo()
+
+def criar_lote(modulo):
+    """Valida e grava um lote de registros de um módulo"""
+    corpo, status_code = servico.criar_lote(modulo, ler_lote(), request.headers.get('Idempotency-Key'))
+    return responder(corpo, status_code)
+
+def resposta_consulta(nome, modulos, consultar):
+    """Resposta de uma consulta, guardada em cache pela versão das tabelas
+
+    consultar(tipo) retorna (corpo, status, proximo_cursor). A ETag
+    identifica a versão (e o tipo negociado): se o cliente enviar a atual em
+    If-None-Match, a resposta é 304, sem consultar nem serializar.
+    """
+    tipo = tipo_resposta()
+    chave, etag = servico.versao_consulta(nome, modulos, request.args, tipo)
+    if request.if_none_match.contains(etag):
+        resposta = Response(status=304)
+    else:
+        corpo, status_code, proximo_cursor = servico.consultar_em_cache(chave, lambda: consultar(tipo), tipo)
+        resposta = responder(corpo, status_code, tipo)
+        if proximo_cursor is not None:
+            resposta.headers['X-Next-Cursor'] = proximo_cursor
+        if status_code != 200:
+            return resposta
+    resposta.set_etag(etag)
+    resposta.vary.add('Accept')
+    return resposta
+
+# Rotas de listagem (paginação por cursor, filtros e streaming NDJSON)
+def listar(modulo):
+    """Lista os registros de um módulo"""
+    streaming = (
+        request.args.get('formato') == 'ndjson'
+        or request.accept_mimetypes.best == 'application/x-ndjson'
+    )
+    if not streaming:
+        return resposta_consulta(
+            f"listar_{modulo}", [modulo], lambda tipo: servico.listar(modulo, request.args, tipo=tipo)
+        )
+
+    corpo, status_code, _ = servico.listar(modulo, request.args, streaming)
+    if status_code == 200:
+        return Response(stream_with_context(corpo), mimetype='application/x-ndjson')
+    return responder(corpo, status_code)
+
+def obter(modulo, id_registro):
+    """Busca um registro de um módulo pelo id"""
+    tipo = tipo_resposta()
+    corpo, status_code = servico.obter(modulo, id_registro, tipo)
+    return responder(corpo, status_code, tipo)
+
+for modulo, definicao in MODULOS.items():
+    app.add_url_rule(
+        f"{definicao['rota']}/batch",
+        endpoint=f"criar_lote_{modulo}",
+        view_func=lambda modulo=modulo: criar_lote(modulo),
+        methods=['POST']
+    )
+    if modulo != 'financeiro':
+        app.add_url_rule(
+            definicao['rota'],
+            endpoint=f"listar_{modulo}",
+            view_func=lambda modulo=modulo: listar(modulo),
+            methods=['GET']
+        )
+    app.add_url_rule(
+        f"{definicao['rota']}/<id_registro>",
+        endpoint=f"obter_{modulo}",
+        view_func=lambda id_registro, modulo=modulo: obter(modulo, id_registro),
+        methods=['GET']
+    )
+
+# Rota para o relatório com as estatísticas dos módulos
+@app.route('/api/relatorio', methods=['GET'])
+def relatorio():
+    return resposta_consulta('relatorio', MODULOS, lambda _: (*servico.relatorio(), None))
+
+# Rota para os relatórios analíticos (fluxo-caixa, saldos-conta, balancete)
+@app.route('/api/relatorio/<tipo>', methods=['GET'])
+def relatorio_analitico(tipo):
+    return resposta_consulta(
+        f"relatorio_{tipo}", MODULOS, lambda _: (*servico.relatorio(tipo, request.args), None)
+    )
 
 # Rota para status da API
 @app.route('/api/status', methods=['GET'])
 def status():
-    try:
-        return jsonify({
-            "status": "online",
-            "timestamp": datetime.now().isoformat(),
-            "modules": list(db.keys())
-        }), 200
-    except Exception as e:
-        logging.error(f"Erro ao verificar status: {str(e)}")
-        return jsonify({"error": "Erro interno do servidor"}), 500
+    corpo, status_code = servico.status()
+    return responder(corpo, status_code)
+
+# Rota das métricas no formato do Prometheus
+@app.route(METRICAS_URL, methods=['GET'])
+def metrics():
+    texto, status_code = servico.exportar_metricas()
+    return Response(texto, status=status_code, content_type=CONTENT_TYPE_METRICAS)
 
 # Rota para servir arquivos estáticos
 @app.route('/static/<path:path>')
@@ -328,6 +273,6 @@ def send_static(path):
 if __name__ == '__main__':
     # Cria o diretório static se não existir
     os.makedirs('static', exist_ok=True)
-    
-    # Inicia o servidor
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+
+    # Inicia o servidor de desenvolvimento (para produção, use servidor.py)
+    app.run(debug=os.environ.get('NASAJON_DEBUG', '1') == '1', host='0.0.0.0', port=5000)
\ No newline at end of file
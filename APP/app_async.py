@@ -0,0 +1,262 @@
+"""
+Versão assíncrona (ASGI) da API, com as mesmas rotas e o mesmo swagger.json do app.py
+
+Usa o Quart e as regras compartilhadas de servico.py. As chamadas ao
+servico.py que gravam, sincronizam ou montam consultas (validação,
+indexação, SQLite, relatórios) rodam no executor padrão do asyncio, fora do
+loop de eventos; as leituras simples (um registro, status, métricas e as
+consultas já em cache) continuam no loop. O log é gravado por uma thread
+(QueueListener) e, com NASAJON_GRAVACAO_ASSINCRONA=1, a persistência também
+(MotorAssincrono).
+
+Execução:
+    hypercorn app_async:app --bind 0.0.0.0:5000
+"""
+import asyncio
+import os
+import time
+
+from quart import Quart, Response, g, request, redirect, send_from_directory
+
+import serializacao
+import servico
+from modulos import MODULOS
+from servico import API_URL, CONTENT_TYPE_METRICAS, METRICAS_URL, SWAGGER_URL
+
+# Configuração de logging (gravação do arquivo em segundo plano)
+servico.configurar_logging("api.log")
+
+app = Quart(__name__)
+
+async def em_thread(funcao, *argumentos):
+    """Executa uma chamada bloqueante no executor padrão, sem parar o loop de eventos
+
+    Com um perfil ativo na requisição, a chamada roda no próprio loop, que
+    é a thread observada pelo perfilador.
+    """
+    if g.get('perfil') is not None:
+        return funcao(*argumentos)
+    return await asyncio.get_running_loop().run_in_executor(None, funcao, *argumentos)
+
+def tipo_resposta():
+    """Tipo da resposta negociado pelo Accept: JSON (padrão) ou MessagePack"""
+    return serializacao.negociar(request.accept_mimetypes)
+
+def responder(corpo, status_code=200, tipo=None):
+    """Resposta serializada por serializacao.py no tipo negociado (JSON compacto ou MessagePack)"""
+    tipo = tipo or tipo_resposta()
+    resposta = Response(serializacao.codificar(corpo, tipo), status=status_code, mimetype=tipo)
+    resposta.vary.add('Accept')
+    return resposta
+
+async def ler_corpo():
+    """Lê o corpo JSON ou MessagePack da requisição (None se ausente ou inválido)"""
+    tipo = serializacao.tipo_base(request.mimetype)
+    if tipo != serializacao.MSGPACK and not request.is_json:
+        return None
+    try:
+        return serializacao.decodificar(await request.get_data(), tipo)
+    except ValueError:
+        return None
+
+# Métricas por rota (ver metricas.py): o início é marcado antes da autenticação,
+# para que as requisições recusadas também sejam medidas
+async def iniciar_medida():
+    g.inicio_requisicao = time.perf_counter()
+
+async def registrar_medida(resposta):
+    inicio = g.get('inicio_requisicao')
+    if inicio is not None:
+        rota = request.url_rule.rule if request.url_rule else None
+        servico.metricas.registrar(request.method, rota, resposta.status_code, time.perf_counter() - inicio)
+    return resposta
+
+if servico.METRICAS_ATIVAS:
+    app.before_request(iniciar_medida)
+    app.after_request(registrar_medida)
+
+# Middleware para autenticação
+@app.before_request
+async def authenticate():
+    erro = servico.autenticar(request.path, request.headers.get('X-API-Key'))
+    if erro:
+        corpo, status_code = erro
+        return responder(corpo, status_code)
+
+@app.before_request
+async def sincronizar_tabelas():
+    await em_thread(servico.sincronizar, request.path)
+
+# Perfil sob demanda (ver perfilador.py), iniciado depois da autenticação
+async def iniciar_perfil():
+    rota = request.url_rule.rule if request.url_rule else None
+    g.perfil = servico.iniciar_perfil(
+        request.method, rota, request.headers.get('X-Profile'), request.headers.get('X-API-Key')
+    )
+
+async def encerrar_perfil(resposta):
+    perfil = g.pop('perfil', None)
+    if perfil is not None:
+        resultado = servico.encerrar_perfil(perfil, resposta.status_code)
+        resposta.headers['Server-Timing'] = (
+            f"total;dur={resultado['parede_s'] * 1000:.3f}, cpu;dur={resultado['cpu_s'] * 1000:.3f}"
+        )
+        if resultado['arquivo']:
+            resposta.headers['X-Profile-File'] = resultado['arquivo']
+    return resposta
+
+async def descartar_perfil(erro=None):
+    # Requisições interrompidas por exceção não passam pelo after_request
+    perfil = g.pop('perfil', None)
+    if perfil is not None:
+        servico.encerrar_perfil(perfil, 500)
+
+if servico.PERFIL_ATIVO:
+    app.before_request(iniciar_perfil)
+    app.after_request(encerrar_perfil)
+    app.teardown_request(descartar_perfil)
+
+async def criar(modulo):
+    """Cria um registro a partir do corpo (JSON ou MessagePack) da requisição"""
+    corpo, status_code = await em_thread(
+        servico.criar_registro, modulo, await ler_corpo(), request.headers.get('Idempotency-Key')
+    )
+    return responder(corpo, status_code)
+
+async def ler_lote():
+    """Lê os registros do corpo de uma requisição de lote"""
+    if request.mimetype == 'application/x-ndjson':
+        return await em_thread(servico.ler_ndjson, (await request.get_data()).splitlines())
+    return await ler_corpo()
+
+async def criar_lote(modulo):
+    """Valida e grava um lote de registros de um módulo"""
+    corpo, status_code = await em_thread(
+        servico.criar_lote, modulo, await ler_lote(), request.headers.get('Idempotency-Key')
+    )
+    return responder(corpo, status_code)
+
+async def resposta_consulta(nome, modulos, consultar):
+    """Resposta de uma consulta, guardada em cache pela versão das tabelas
+
+    consultar(tipo) retorna (corpo, status, proximo_cursor) e roda fora do
+    loop de eventos, sem acesso ao request (os parâmetros são lidos antes).
+    A ETag identifica a versão (e o tipo negociado): se o cliente enviar a
+    atual em If-None-Match, a resposta é 304, sem consultar nem serializar.
+    """
+    tipo = tipo_resposta()
+    chave, etag = servico.versao_consulta(nome, modulos, request.args, tipo)
+    if request.if_none_match.contains(etag):
+        resposta = Response(b'', status=304)
+    else:
+        # Uma resposta já em cache sai direto do loop; só a consulta vai para o executor
+        em_cache = servico.respostas_consultas.obter(chave)
+        if em_cache is None:
+            em_cache = await em_thread(servico.consultar_em_cache, chave, lambda: consultar(tipo), tipo)
+        corpo, status_code, proximo_cursor = em_cache
+        resposta = responder(corpo, status_code, tipo)
+        if proximo_cursor is not None:
+            resposta.headers['X-Next-Cursor'] = proximo_cursor
+        if status_code != 200:
+            return resposta
+    resposta.set_etag(etag)
+    resposta.vary.add('Accept')
+    return resposta
+
+async def listar(modulo):
+    """Lista os registros de um módulo"""
+    streaming = (
+        request.args.get('formato') == 'ndjson'
+        or request.accept_mimetypes.best == 'application/x-ndjson'
+    )
+    if not streaming:
+        args = request.args
+        return await resposta_consulta(
+            f"listar_{modulo}", [modulo], lambda tipo: servico.listar(modulo, args, tipo=tipo)
+        )
+
+    corpo, status_code, _ = servico.listar(modulo, request.args, streaming)
+    if status_code == 200:
+        async def gerar():
+            for bloco in corpo:
+                yield bloco
+        return Response(gerar(), mimetype='application/x-ndjson')
+    return responder(corpo, status_code)
+
+async def obter(modulo, id_registro):
+    """Busca um registro de um módulo pelo id"""
+    tipo = tipo_resposta()
+    corpo, status_code = servico.obter(modulo, id_registro, tipo)
+    return responder(corpo, status_code, tipo)
+
+def rota_modulo(funcao, modulo):
+    """Cria a view assíncrona de uma rota de módulo"""
+    async def view(**parametros):
+        return await funcao(modulo, **parametros)
+    return view
+
+# Rotas dos módulos (as mesmas do app.py)
+for modulo, definicao in MODULOS.items():
+    app.add_url_rule(
+        definicao['rota'],
+        endpoint=f"criar_{modulo}",
+        view_func=rota_modulo(criar, modulo),
+        methods=['POST']
+    )
+    app.add_url_rule(
+        f"{definicao['rota']}/batch",
+        endpoint=f"criar_lote_{modulo}",
+        view_func=rota_modulo(criar_lote, modulo),
+        methods=['POST']
+    )
+    app.add_url_rule(
+        definicao['rota'],
+        endpoint=f"listar_{modulo}",
+        view_func=rota_modulo(listar, modulo),
+        methods=['GET']
+    )
+    app.add_url_rule(
+        f"{definicao['rota']}/<id_registro>",
+        endpoint=f"obter_{modulo}",
+        view_func=rota_modulo(obter, modulo),
+        methods=['GET']
+    )
+
+# Rota para o relatório com as estatísticas dos módulos
+@app.route('/api/relatorio', methods=['GET'])
+async def relatorio():
+    return await resposta_consulta('relatorio', MODULOS, lambda _: (*servico.relatorio(), None))
+
+# Rota para os relatórios analíticos (fluxo-caixa, saldos-conta, balancete)
+@app.route('/api/relatorio/<tipo>', methods=['GET'])
+async def relatorio_analitico(tipo):
+    args = request.args
+    return await resposta_consulta(
+        f"relatorio_{tipo}", MODULOS, lambda _: (*servico.relatorio(tipo, args), None)
+    )
+
+# Rota para status da API
+@app.route('/api/status', methods=['GET'])
+async def status():
+    corpo, status_code = servico.status()
+    return responder(corpo, status_code)
+
+# Rota das métricas no formato do Prometheus
+@app.route(METRICAS_URL, methods=['GET'])
+async def metrics():
+    texto, status_code = servico.exportar_metricas()
+    return Response(texto, status=status_code, content_type=CONTENT_TYPE_METRICAS)
+
+# A interface do Swagger (flask-swagger-ui) existe apenas no app.py; aqui a
+# documentação aponta para o mesmo swagger.json
+@app.route(SWAGGER_URL)
+async def docs():
+    return redirect(API_URL)
+
+# Rota para servir arquivos estáticos
+@app.route('/static/<path:path>')
+async def send_static(path):
+    return await send_from_directory('static', path)
+
+if __name__ == '__main__':
+    app.run(debug=os.environ.get('NASAJON_DEBUG', '1') == '1', host='0.0.0.0', port=5000)
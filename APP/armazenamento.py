@@ -0,0 +1,572 @@
+"""
+Motores de armazenamento usados pelas tabelas em memória
+
+- memoria: nada é persistido (comportamento original da simulação)
+- sqlite: grava cada módulo em uma tabela SQLite em modo WAL
+- wal: acrescenta os registros a um log (group commit com fsync) e o
+  compacta periodicamente em snapshots (ver MotorWAL)
+
+Com NASAJON_GRAVACAO_ASSINCRONA=1, as gravações são feitas em segundo plano
+(ver MotorAssincrono).
+"""
+import glob
+import logging
+import os
+import queue
+import shutil
+import sqlite3
+import threading
+import time
+import zlib
+
+import serializacao
+from modulos import MODULOS
+from registros import RegistroDuplicado
+
+
+class MotorMemoria:
+    """Motor sem persistência: os registros vivem apenas nas tabelas em memória"""
+
+    # Se o motor pode ser compartilhado por vários processos (ver servico.sincronizar)
+    compartilhado = False
+
+    def carregar(self, modulo):
+        """Retorna os registros gravados de um módulo, em ordem de inserção"""
+        return iter(())
+
+    def novos(self, modulo, ids_conhecidos):
+        """Retorna os registros gravados desde a última leitura que não estão em ids_conhecidos"""
+        return iter(())
+
+    def alterados(self):
+        """Módulos com registros gravados por outros processos desde a última leitura"""
+        return []
+
+    def gravar(self, modulo, registros):
+        """Grava uma lista de registros de um módulo"""
+
+    def fechar(self):
+        """Libera os recursos do motor"""
+
+
+class MotorSQLite(MotorMemoria):
+    """Motor que persiste os registros em SQLite (modo WAL)
+
+    Cada módulo tem sua tabela, com colunas indexadas para o id, as chaves
+    naturais e a data, e o documento completo em JSON. As gravações usam
+    sempre a mesma instrução (preparada e reaproveitada pelo cache de
+    instruções do sqlite3) e cada chamada a gravar é uma única transação.
+
+    Com vários processos, alterados() diz quais módulos têm registros novos
+    sem ler as tabelas: o PRAGMA data_version só muda quando outra conexão
+    grava no arquivo, e só então uma única consulta traz o maior seq de
+    cada módulo.
+    """
+
+    compartilhado = True
+
+    def __init__(self, caminho):
+        diretorio = os.path.dirname(caminho)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+
+        self.caminho = caminho
+        self.lock = threading.Lock()
+        self.conexao = sqlite3.connect(caminho, isolation_level=None, check_same_thread=False)
+        self.conexao.execute("PRAGMA journal_mode=WAL")
+        self.conexao.execute("PRAGMA synchronous=NORMAL")
+
+        self.colunas = {}
+        self.insercoes = {}
+        # Último seq lido de cada módulo (usado na sincronização entre processos)
+        self.ultimo_seq = {}
+        for modulo, definicao in MODULOS.items():
+            self.criar_tabela(modulo, definicao)
+        self.consulta_maximos = 'SELECT ' + ', '.join(f'(SELECT MAX(seq) FROM "{modulo}")' for modulo in MODULOS)
+        self.versao_dados = None
+
+    def criar_tabela(self, modulo, definicao):
+        """Cria a tabela e os índices de um módulo"""
+        colunas = ['id'] + definicao['chaves']
+        if definicao['campo_data']:
+            colunas.append(definicao['campo_data'])
+        self.colunas[modulo] = colunas
+
+        declaracoes = ['seq INTEGER PRIMARY KEY', 'id TEXT NOT NULL UNIQUE']
+        declaracoes += [f'"{chave}" TEXT UNIQUE' for chave in definicao['chaves']]
+        if definicao['campo_data']:
+            declaracoes.append(f'"{definicao["campo_data"]}" TEXT')
+        declaracoes.append('documento TEXT NOT NULL')
+
+        self.conexao.execute(f'CREATE TABLE IF NOT EXISTS "{modulo}" ({", ".join(declaracoes)})')
+        if definicao['campo_data']:
+            self.conexao.execute(
+                f'CREATE INDEX IF NOT EXISTS "idx_{modulo}_data" ON "{modulo}" ("{definicao["campo_data"]}")'
+            )
+
+        nomes = ', '.join(f'"{coluna}"' for coluna in colunas)
+        marcadores = ', '.join('?' for _ in range(len(colunas) + 1))
+        self.insercoes[modulo] = f'INSERT INTO "{modulo}" ({nomes}, documento) VALUES ({marcadores})'
+        self.ultimo_seq[modulo] = 0
+
+    def carregar(self, modulo):
+        return self.novos(modulo, ())
+
+    def novos(self, modulo, ids_conhecidos):
+        with self.lock:
+            cursor = self.conexao.execute(
+                f'SELECT seq, id, documento FROM "{modulo}" WHERE seq > ? ORDER BY seq',
+                (self.ultimo_seq[modulo],)
+            )
+            linhas = cursor.fetchall()
+            if linhas:
+                self.ultimo_seq[modulo] = linhas[-1][0]
+        for _, id_registro, documento in linhas:
+            # Registros já indexados (gravados por este processo sem ordem_do_motor)
+            if id_registro not in ids_conhecidos:
+                yield serializacao.loads(documento)
+
+    def alterados(self):
+        with self.lock:
+            versao = self.conexao.execute("PRAGMA data_version").fetchone()[0]
+            if versao == self.versao_dados:
+                return []
+            maximos = self.conexao.execute(self.consulta_maximos).fetchone()
+            self.versao_dados = versao
+        return [modulo for modulo, maximo in zip(MODULOS, maximos) if (maximo or 0) > self.ultimo_seq[modulo]]
+
+    def gravar(self, modulo, registros):
+        if not registros:
+            return
+
+        colunas = self.colunas[modulo]
+        parametros = [
+            [None if registro.get(coluna) is None else str(registro.get(coluna)) for coluna in colunas]
+            + [serializacao.dumps(registro).decode('utf-8')]
+            for registro in registros
+        ]
+
+        with self.lock:
+            self.conexao.execute("BEGIN IMMEDIATE")
+            try:
+                self.conexao.executemany(self.insercoes[modulo], parametros)
+            except sqlite3.IntegrityError as e:
+                # Chave gravada por outro processo e ainda não sincronizada
+                self.conexao.execute("ROLLBACK")
+                raise RegistroDuplicado(f"Registro duplicado: {e}")
+            except Exception:
+                self.conexao.execute("ROLLBACK")
+                raise
+            self.conexao.execute("COMMIT")
+
+    def fechar(self):
+        with self.lock:
+            self.conexao.close()
+
+
+class CacheSQLite:
+    """Cache com expiração guardado em uma tabela do arquivo do MotorSQLite
+
+    Tem a interface do CacheTTL (obter, guardar, remover, limpar), mas é
+    visto por todos os processos que usam o mesmo arquivo (as respostas de
+    Idempotency-Key com NASAJON_MULTIPROCESSO=1). Chaves e valores são
+    guardados em JSON, e os itens expirados são apagados a cada guardar.
+    """
+
+    # Sem limite por bytes (ver metricas.exportar)
+    tamanho = None
+
+    def __init__(self, motor, nome, ttl):
+        self.motor = motor
+        self.ttl = ttl
+        self.tabela = f"cache_{nome}"
+        with motor.lock:
+            motor.conexao.execute(
+                f'CREATE TABLE IF NOT EXISTS "{self.tabela}" '
+                f'(chave TEXT PRIMARY KEY, expiracao REAL NOT NULL, valor TEXT NOT NULL)'
+            )
+            motor.conexao.execute(
+                f'CREATE INDEX IF NOT EXISTS "idx_{self.tabela}_expiracao" ON "{self.tabela}" (expiracao)'
+            )
+
+    def __len__(self):
+        with self.motor.lock:
+            cursor = self.motor.conexao.execute(
+                f'SELECT COUNT(*) FROM "{self.tabela}" WHERE expiracao > ?', (time.time(),)
+            )
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def texto(objeto):
+        return serializacao.dumps(objeto).decode('utf-8')
+
+    def obter(self, chave, padrao=None):
+        with self.motor.lock:
+            linha = self.motor.conexao.execute(
+                f'SELECT valor FROM "{self.tabela}" WHERE chave = ? AND expiracao > ?',
+                (self.texto(chave), time.time())
+            ).fetchone()
+        return padrao if linha is None else serializacao.loads(linha[0])
+
+    def guardar(self, chave, valor):
+        agora = time.time()
+        with self.motor.lock:
+            self.motor.conexao.execute("BEGIN IMMEDIATE")
+            try:
+                self.motor.conexao.execute(f'DELETE FROM "{self.tabela}" WHERE expiracao <= ?', (agora,))
+                self.motor.conexao.execute(
+                    f'INSERT OR REPLACE INTO "{self.tabela}" (chave, expiracao, valor) VALUES (?, ?, ?)',
+                    (self.texto(chave), agora + self.ttl, self.texto(valor))
+                )
+            except Exception:
+                self.motor.conexao.execute("ROLLBACK")
+                raise
+            self.motor.conexao.execute("COMMIT")
+
+    def remover(self, chave):
+        with self.motor.lock:
+            self.motor.conexao.execute(f'DELETE FROM "{self.tabela}" WHERE chave = ?', (self.texto(chave),))
+
+    def limpar(self):
+        with self.motor.lock:
+            self.motor.conexao.execute(f'DELETE FROM "{self.tabela}"')
+
+
+class MotorAssincrono:
+    """Envolve outro motor, fazendo as gravações em uma thread de segundo plano
+
+    gravar apenas coloca os registros em uma fila; a thread agrupa tudo o
+    que estiver na fila e grava em uma transação por módulo. Os registros
+    já estão nas tabelas em memória quando a requisição retorna, mas podem
+    ser perdidos se o processo morrer antes da gravação.
+    """
+
+    # As gravações pendentes não são vistas pelos outros processos
+    compartilhado = False
+
+    def __init__(self, motor):
+        self.motor = motor
+        self.fila = queue.Queue()
+        self.thread = threading.Thread(target=self.executar, name="gravacao-assincrona", daemon=True)
+        self.thread.start()
+
+    def carregar(self, modulo):
+        return self.motor.carregar(modulo)
+
+    def novos(self, modulo, ids_conhecidos):
+        return self.motor.novos(modulo, ids_conhecidos)
+
+    def alterados(self):
+        return self.motor.alterados()
+
+    def gravar(self, modulo, registros):
+        if registros:
+            self.fila.put((modulo, list(registros)))
+
+    def executar(self):
+        """Grava os registros da fila até receber o sinal de encerramento"""
+        encerrar = False
+        while not encerrar:
+            pendentes = [self.fila.get()]
+            while True:
+                try:
+                    pendentes.append(self.fila.get_nowait())
+                except queue.Empty:
+                    break
+
+            por_modulo = {}
+            for item in pendentes:
+                if item is None:
+                    encerrar = True
+                    continue
+                modulo, registros = item
+                por_modulo.setdefault(modulo, []).extend(registros)
+
+            for modulo, registros in por_modulo.items():
+                try:
+                    self.motor.gravar(modulo, registros)
+                except Exception as e:
+                    logging.error(f"Erro ao gravar {len(registros)} registro(s) do módulo {modulo}: {str(e)}")
+
+    def fechar(self):
+        """Grava o que estiver pendente e fecha o motor"""
+        self.fila.put(None)
+        self.thread.join()
+        self.motor.fechar()
+
+
+TAMANHO_BLOCO = 10000
+
+
+def sincronizar_diretorio(diretorio):
+    """fsync do diretório, para que criações e renomeações sobrevivam a uma queda (só POSIX)"""
+    if os.name == 'nt':
+        return
+    descritor = os.open(diretorio, os.O_RDONLY)
+    try:
+        os.fsync(descritor)
+    finally:
+        os.close(descritor)
+
+
+class MotorWAL(MotorMemoria):
+    """Motor com log de escrita antecipada (WAL) e snapshots compactos
+
+    Cada registro gravado é acrescentado ao log atual (wal_<n>.log) como
+    uma linha "crc32<TAB>módulo<TAB>documento JSON". gravar apenas coloca
+    as linhas na fila; uma thread faz o group commit, escrevendo tudo o que
+    estiver pendente com um único fsync quando há max_lote registros na
+    fila ou intervalo_ms depois do primeiro registro pendente. Se o
+    processo morrer, perde-se no máximo esse último intervalo.
+
+    Quando o log atual passa de snapshot_a_cada registros, ele é fechado e
+    um novo é aberto; em segundo plano, o snapshot anterior e os logs
+    fechados são compactados em snapshot_<n>.ndjson (uma linha
+    "módulo<TAB>lista JSON" por bloco de até TAMANHO_BLOCO documentos, sem
+    o crc), gravado em um arquivo temporário, sincronizado e renomeado.
+    Assim a recuperação lê o snapshot em blocos e só valida linha a linha
+    os logs recentes. Uma linha incompleta ou com crc inválido (gravação
+    interrompida) encerra a leitura do log; cada inicialização começa um
+    log novo, então ela só pode ser a última.
+    """
+
+    def __init__(self, diretorio, max_lote=1000, intervalo_ms=10, snapshot_a_cada=100000):
+        os.makedirs(diretorio, exist_ok=True)
+        self.diretorio = diretorio
+        self.max_lote = max_lote
+        self.intervalo = intervalo_ms / 1000
+        self.snapshot_a_cada = snapshot_a_cada
+
+        # Registros recuperados de cada módulo, entregues uma vez por carregar()
+        self.recuperados = {modulo: [] for modulo in MODULOS}
+        ultimo, compactar_ate = self.recuperar()
+
+        self.segmento = ultimo + 1
+        self.arquivo = open(self.caminho_log(self.segmento), 'ab')
+        sincronizar_diretorio(diretorio)
+        self.registros_segmento = 0
+
+        self.condicao = threading.Condition()
+        self.pendentes = []
+        self.enviados = 0
+        self.gravados = 0
+        self.urgente = False
+        self.encerrado = False
+        self.erro = None
+
+        self.compactacao = None
+        if compactar_ate:
+            self.iniciar_compactacao(compactar_ate)
+        self.thread = threading.Thread(target=self.executar, name="wal", daemon=True)
+        self.thread.start()
+
+    def caminho_log(self, numero):
+        return os.path.join(self.diretorio, f"wal_{numero:06d}.log")
+
+    def caminho_snapshot(self, numero):
+        return os.path.join(self.diretorio, f"snapshot_{numero:06d}.ndjson")
+
+    def numerados(self, padrao):
+        """Números dos arquivos do diretório que seguem o padrão (prefixo_<n>.ext), em ordem"""
+        return sorted(
+            int(os.path.basename(arquivo).split('_')[1].split('.')[0])
+            for arquivo in glob.glob(os.path.join(self.diretorio, padrao))
+        )
+
+    def ler_log(self, numero):
+        """Gera (módulo, documento JSON em bytes) das linhas válidas de um log"""
+        with open(self.caminho_log(numero), 'rb') as f:
+            for linha in f:
+                partes = linha[:-1].split(b'\t', 2)
+                if (not linha.endswith(b'\n') or len(partes) != 3
+                        or partes[0] != b'%08x' % zlib.crc32(partes[2])):
+                    logging.warning(f"Linha inválida descartada no fim de {f.name}")
+                    return
+                yield partes[1].decode('utf-8'), partes[2]
+
+    def recuperar(self):
+        """Lê o snapshot mais recente e os logs posteriores a ele
+
+        Retorna o número do último arquivo existente e até qual log há
+        registros ainda fora do snapshot (0 se nenhum).
+        """
+        snapshots = self.numerados('snapshot_*.ndjson')
+        logs = self.numerados('wal_*.log')
+        base = snapshots[-1] if snapshots else 0
+
+        if snapshots:
+            with open(self.caminho_snapshot(base), 'rb') as f:
+                for linha in f:
+                    modulo, documentos = linha.split(b'\t', 1)
+                    self.recuperados[modulo.decode('utf-8')].extend(serializacao.loads(documentos))
+        recentes = [numero for numero in logs if numero > base]
+        quantidade = 0
+        for numero in recentes:
+            for modulo, documento in self.ler_log(numero):
+                self.recuperados[modulo].append(serializacao.loads(documento))
+                quantidade += 1
+        if not quantidade:
+            # Logs vazios (por exemplo, o de uma execução sem gravações) não precisam de snapshot
+            for numero in recentes:
+                os.remove(self.caminho_log(numero))
+            recentes = []
+
+        # Restos de uma compactação interrompida
+        for numero in snapshots[:-1]:
+            os.remove(self.caminho_snapshot(numero))
+        for numero in logs:
+            if numero <= base:
+                os.remove(self.caminho_log(numero))
+        for temporario in glob.glob(os.path.join(self.diretorio, '*.tmp')):
+            os.remove(temporario)
+
+        return max([base] + logs), (recentes[-1] if recentes else 0)
+
+    def carregar(self, modulo):
+        return iter(self.recuperados.pop(modulo, []))
+
+    def gravar(self, modulo, registros):
+        if not registros:
+            return
+        if self.erro:
+            raise RuntimeError(f"Falha ao gravar o log: {self.erro}")
+
+        prefixo = f"\t{modulo}\t".encode('utf-8')
+        linhas = []
+        for registro in registros:
+            documento = serializacao.dumps(registro)
+            linhas.append(b'%08x' % zlib.crc32(documento) + prefixo + documento + b'\n')
+
+        with self.condicao:
+            self.pendentes.extend(linhas)
+            self.enviados += len(linhas)
+            if len(self.pendentes) >= self.max_lote or len(self.pendentes) == len(linhas):
+                self.condicao.notify_all()
+
+    def executar(self):
+        """Group commit: grava os registros pendentes em lotes até o encerramento"""
+        while True:
+            with self.condicao:
+                self.condicao.wait_for(lambda: self.pendentes or self.urgente or self.encerrado)
+                self.condicao.wait_for(
+                    lambda: len(self.pendentes) >= self.max_lote or self.urgente or self.encerrado,
+                    self.intervalo
+                )
+                lote, self.pendentes = self.pendentes, []
+                self.urgente = False
+                encerrar = self.encerrado
+
+            if lote:
+                try:
+                    self.escrever(lote)
+                except Exception as e:
+                    logging.error(f"Erro ao gravar {len(lote)} registro(s) no log: {str(e)}")
+                    self.erro = e
+            with self.condicao:
+                self.gravados += len(lote)
+                self.condicao.notify_all()
+            if encerrar:
+                return
+
+    def escrever(self, lote):
+        """Acrescenta um lote ao log com um único fsync, trocando de log quando necessário"""
+        self.arquivo.write(b''.join(lote))
+        self.arquivo.flush()
+        os.fsync(self.arquivo.fileno())
+        self.registros_segmento += len(lote)
+
+        if (self.registros_segmento >= self.snapshot_a_cada
+                and (self.compactacao is None or not self.compactacao.is_alive())):
+            self.arquivo.close()
+            self.segmento += 1
+            self.arquivo = open(self.caminho_log(self.segmento), 'ab')
+            sincronizar_diretorio(self.diretorio)
+            self.registros_segmento = 0
+            self.iniciar_compactacao(self.segmento - 1)
+
+    def iniciar_compactacao(self, ate):
+        self.compactacao = threading.Thread(target=self.compactar, args=(ate,), name="wal-snapshot", daemon=True)
+        self.compactacao.start()
+
+    def compactar(self, ate):
+        """Gera snapshot_<ate> com o snapshot anterior e os logs fechados até ate"""
+        try:
+            snapshots = self.numerados('snapshot_*.ndjson')
+            base = snapshots[-1] if snapshots else 0
+            logs = [numero for numero in self.numerados('wal_*.log') if base < numero <= ate]
+            destino = self.caminho_snapshot(ate)
+
+            with open(destino + '.tmp', 'wb') as saida:
+                # Os blocos do snapshot anterior são copiados sem decodificar
+                if snapshots:
+                    with open(self.caminho_snapshot(base), 'rb') as f:
+                        shutil.copyfileobj(f, saida)
+                blocos = {}
+                for numero in logs:
+                    for modulo, documento in self.ler_log(numero):
+                        bloco = blocos.setdefault(modulo, [])
+                        bloco.append(documento)
+                        if len(bloco) >= TAMANHO_BLOCO:
+                            saida.write(modulo.encode('utf-8') + b'\t[' + b','.join(bloco) + b']\n')
+                            bloco.clear()
+                for modulo, bloco in blocos.items():
+                    if bloco:
+                        saida.write(modulo.encode('utf-8') + b'\t[' + b','.join(bloco) + b']\n')
+                saida.flush()
+                os.fsync(saida.fileno())
+
+            os.replace(destino + '.tmp', destino)
+            sincronizar_diretorio(self.diretorio)
+            for numero in snapshots:
+                os.remove(self.caminho_snapshot(numero))
+            for numero in logs:
+                os.remove(self.caminho_log(numero))
+        except Exception as e:
+            logging.error(f"Erro ao gerar o snapshot do log: {str(e)}")
+
+    def descarregar(self):
+        """Aguarda o fsync de todos os registros já enviados"""
+        with self.condicao:
+            alvo = self.enviados
+            self.urgente = True
+            self.condicao.notify_all()
+            self.condicao.wait_for(lambda: self.gravados >= alvo or not self.thread.is_alive())
+
+    def fechar(self):
+        """Grava o que estiver pendente e fecha o log"""
+        with self.condicao:
+            if self.encerrado:
+                return
+            self.encerrado = True
+            self.condicao.notify_all()
+        self.thread.join()
+        if self.compactacao:
+            self.compactacao.join()
+        self.arquivo.close()
+
+
+def criar_motor(nome=None, caminho=None):
+    """Cria o motor de armazenamento configurado
+
+    Sem parâmetros, usa as variáveis de ambiente NASAJON_ARMAZENAMENTO
+    ("memoria", "sqlite" ou "wal"), NASAJON_SQLITE (caminho do arquivo),
+    NASAJON_GRAVACAO_ASSINCRONA, NASAJON_WAL (diretório do log) e
+    NASAJON_WAL_INTERVALO_MS (intervalo do group commit).
+    """
+    nome = nome or os.environ.get('NASAJON_ARMAZENAMENTO', 'memoria')
+
+    if nome == 'memoria':
+        return MotorMemoria()
+    if nome == 'sqlite':
+        caminho = caminho or os.environ.get('NASAJON_SQLITE', os.path.join('dados', 'nasajon.db'))
+        motor = MotorSQLite(caminho)
+        # Com vários processos a gravação precisa ser síncrona para detectar chaves duplicadas
+        if (os.environ.get('NASAJON_GRAVACAO_ASSINCRONA') == '1'
+                and os.environ.get('NASAJON_MULTIPROCESSO') != '1'):
+            return MotorAssincrono(motor)
+        return motor
+    if nome == 'wal':
+        caminho = caminho or os.environ.get('NASAJON_WAL', os.path.join('dados', 'wal'))
+        return MotorWAL(caminho, intervalo_ms=float(os.environ.get('NASAJON_WAL_INTERVALO_MS', '10')))
+
+    raise ValueError(f"Motor de armazenamento desconhecido: {nome}")
@@ -0,0 +1,467 @@
+"""
+Suíte de benchmarks da simulação local e da API, com resultados em JSON
+para comparar o desempenho entre versões
+
+Mede:
+- operacoes: custo por chamada de cada método de criação da
+  SimulacaoNasajon (criar_*, cadastrar_* e emitir_nota_fiscal);
+- volume: carga, exportar_dados e gerar_relatorio (e os relatórios
+  analíticos) com 10 mil, 100 mil e 1 milhão de registros no total;
+- rotas: vazão de cada rota do app.py pelo cliente de teste do Flask, no
+  mesmo processo (sem rede);
+- memoria: memória retida e pico de memória por registro em cada tabela;
+- recuperacao: leitura do log (motor wal) e reconstrução das tabelas,
+  índices e agregados com 1 milhão de lançamentos gravados.
+
+Os dados vêm de gerador_dados.py com semente e data fixas, então duas
+execuções medem exatamente o mesmo trabalho. Os arquivos gerados ficam em
+um diretório temporário, removido no fim.
+
+Uso:
+    python benchmark.py                                   # grava benchmarks/benchmark_<commit>_<data>.json
+    python benchmark.py --rapido --partes operacoes rotas
+    python benchmark.py --comparar benchmarks/anterior.json --limite 10
+"""
+import argparse
+import gc
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+import serializacao
+from benchmark_serializacao import cronometrar
+from gerador_dados import GeradorDados
+from modulos import MODULOS
+
+PARTES = ('operacoes', 'volume', 'rotas', 'memoria', 'recuperacao')
+
+# Data final fixa dos registros sintéticos (as datas entram nos relatórios analíticos)
+DATA_REFERENCIA = date(2024, 12, 31)
+
+# Método de criação da SimulacaoNasajon de cada módulo
+METODOS = {
+    'financeiro': 'criar_lancamento_financeiro',
+    'contabil': 'criar_lancamento_contabil',
+    'fiscal': 'emitir_nota_fiscal',
+    'rh': 'cadastrar_funcionario',
+    'compras': 'criar_pedido_compra',
+    'vendas': 'criar_pedido_venda',
+    'estoque': 'cadastrar_produto',
+    'patrimonio': 'cadastrar_bem'
+}
+
+# Registros por requisição nas rotas /batch
+REGISTROS_POR_LOTE = 100
+
+
+def registros(modulo, quantidade, semente, numero_lote=0):
+    """Registros sintéticos de um módulo (sempre os mesmos para a mesma semente e lote)
+
+    Lotes diferentes do mesmo tamanho não repetem chaves nem CPFs.
+    """
+    return GeradorDados(semente, DATA_REFERENCIA).lote(modulo, numero_lote, quantidade)
+
+
+def ambiente():
+    """Descrição da máquina e da versão medida, gravada junto dos resultados"""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=10,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "commit": commit,
+        "data": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "processador": platform.processor() or platform.machine(),
+        "cpus": os.cpu_count(),
+        "numpy": np.__version__,
+        "serializador_json": serializacao.NOME,
+        "msgpack": serializacao.msgpack is not None
+    }
+
+
+def medir_operacoes(quantidade, repeticoes, semente):
+    """Microssegundos por chamada de cada método de criação da SimulacaoNasajon"""
+    from simulacao_local import SimulacaoNasajon
+
+    nasajon = SimulacaoNasajon(silencioso=True, formato_notas='segmentos')
+    resultados = {}
+    try:
+        for modulo, metodo in METODOS.items():
+            criar = getattr(nasajon, metodo)
+            melhor = None
+            # Cada repetição usa chaves novas (os registros não podem se repetir na tabela)
+            for repeticao in range(repeticoes):
+                lote = registros(modulo, quantidade, semente, repeticao)
+                inicio = time.perf_counter()
+                for registro in lote:
+                    criar(registro)
+                duracao = time.perf_counter() - inicio
+                melhor = duracao if melhor is None else min(melhor, duracao)
+            resultados[metodo] = {
+                "modulo": modulo,
+                "operacoes": quantidade,
+                "us_por_operacao": melhor / quantidade * 1e6
+            }
+    finally:
+        nasajon.encerrar()
+    return resultados
+
+
+def medir_volume(total, repeticoes, semente):
+    """Carga, exportações e relatórios de uma simulação com total registros (divididos entre os módulos)"""
+    import analitico
+    from gerador_dados import carregar_simulacao
+    from simulacao_local import SimulacaoNasajon
+
+    por_modulo = total // len(MODULOS)
+    gerador = GeradorDados(semente, DATA_REFERENCIA)
+    nasajon = SimulacaoNasajon(silencioso=True, formato_notas='segmentos')
+    try:
+        inicio = time.perf_counter()
+        for modulo in MODULOS:
+            carregar_simulacao(nasajon, modulo, gerador.lotes(modulo, por_modulo))
+        carga = time.perf_counter() - inicio
+        # As notas fiscais são gravadas em segundo plano; a espera não entra nas medidas seguintes
+        nasajon.notas.fechar()
+
+        # A primeira exportação incremental grava todos os registros; a completa os regrava
+        inicio = time.perf_counter()
+        nasajon.exportar_dados(incremental=True)
+        exportar_incremental = time.perf_counter() - inicio
+        exportar_completo = cronometrar(lambda: nasajon.exportar_dados(incremental=False), 1)
+
+        resultado = {
+            "registros": por_modulo * len(MODULOS),
+            "carga_s": carga,
+            "carga_registros_por_segundo": por_modulo * len(MODULOS) / carga,
+            "exportar_dados_s": exportar_incremental,
+            "exportar_dados_completo_s": exportar_completo,
+            "gerar_relatorio_s": cronometrar(nasajon.gerar_relatorio, repeticoes)
+        }
+        for tipo in analitico.RELATORIOS:
+            resultado[f"gerar_relatorio_{tipo}_s"] = cronometrar(lambda: nasajon.gerar_relatorio(tipo), repeticoes)
+        return resultado
+    finally:
+        nasajon.encerrar()
+
+
+def medir_requisicoes(enviar, argumentos, status_esperados):
+    """Executa enviar(argumento) para cada argumento; retorna a vazão e os erros"""
+    erros = 0
+    inicio = time.perf_counter()
+    for argumento in argumentos:
+        if enviar(argumento).status_code not in status_esperados:
+            erros += 1
+    duracao = time.perf_counter() - inicio
+    return {
+        "requisicoes": len(argumentos),
+        "requisicoes_por_segundo": len(argumentos) / duracao,
+        "us_por_requisicao": duracao / len(argumentos) * 1e6,
+        "erros": erros
+    }
+
+
+def medir_rotas(quantidade, semente):
+    """Vazão de cada rota do app.py pelo cliente de teste do Flask
+
+    A API usa o motor em memória e não repete o log no terminal; as
+    listagens e os relatórios consultam tabelas que não mudam durante a
+    medida, como em uma leitura repetida pelos clientes (o cache de
+    respostas responde a partir da segunda requisição).
+    """
+    os.environ.setdefault('NASAJON_ARMAZENAMENTO', 'memoria')
+    os.environ['NASAJON_LOG_TERMINAL'] = '0'
+    os.environ['NASAJON_DEBUG'] = '0'
+    import analitico
+    from app import app
+
+    cliente = app.test_client()
+    cabecalhos = {'X-API-Key': os.environ.get('NASAJON_API_KEY', 'api_key_simulada')}
+    resultados = {}
+    for modulo, definicao in MODULOS.items():
+        rota = definicao['rota']
+        criados = []
+
+        def criar(registro):
+            resposta = cliente.post(rota, json=registro, headers=cabecalhos)
+            if resposta.status_code == 201:
+                criados.append(resposta.get_json()['id'])
+            return resposta
+        resultados[f"POST {rota}"] = medir_requisicoes(
+            criar, registros(modulo, quantidade, semente), (201,)
+        )
+
+        # O lote 1 (com pelo menos quantidade registros) começa depois dos registros criados um a um
+        lote = registros(modulo, max(1, quantidade // 10) * REGISTROS_POR_LOTE, semente, 1)
+        lotes = [lote[inicio:inicio + REGISTROS_POR_LOTE] for inicio in range(0, len(lote), REGISTROS_POR_LOTE)]
+        resultado = medir_requisicoes(
+            lambda corpo: cliente.post(f"{rota}/batch", json=corpo, headers=cabecalhos), lotes, (201,)
+        )
+        resultado["registros_por_segundo"] = resultado["requisicoes_por_segundo"] * REGISTROS_POR_LOTE
+        resultados[f"POST {rota}/batch"] = resultado
+
+        resultados[f"GET {rota}"] = medir_requisicoes(
+            lambda _: cliente.get(f"{rota}?limit=100", headers=cabecalhos), range(quantidade), (200,)
+        )
+        if criados:
+            ids = [criados[indice % len(criados)] for indice in range(quantidade)]
+            resultados[f"GET {rota}/<id>"] = medir_requisicoes(
+                lambda id_registro: cliente.get(f"{rota}/{id_registro}", headers=cabecalhos), ids, (200,)
+            )
+
+    resultados["GET /api/relatorio"] = medir_requisicoes(
+        lambda _: cliente.get('/api/relatorio', headers=cabecalhos), range(quantidade), (200,)
+    )
+    for tipo in analitico.RELATORIOS:
+        resultados[f"GET /api/relatorio/{tipo}"] = medir_requisicoes(
+            lambda _: cliente.get(f"/api/relatorio/{tipo}", headers=cabecalhos), range(quantidade), (200,)
+        )
+    resultados["GET /api/status"] = medir_requisicoes(lambda _: cliente.get('/api/status'), range(quantidade), (200,))
+    resultados["GET /api/metrics"] = medir_requisicoes(
+        lambda _: cliente.get('/api/metrics'), range(quantidade), (200,)
+    )
+    return resultados
+
+
+def medir_memoria(quantidade, semente):
+    """Bytes por registro retidos na tabela de cada módulo e pico durante a carga
+
+    Os registros entram como na API (com id e timestamp), em lotes de 10
+    mil; o pico inclui o lote em conversão.
+    """
+    import uuid
+    from registros import criar_banco
+
+    banco = criar_banco()
+    gerador = GeradorDados(semente, DATA_REFERENCIA)
+    timestamp = datetime.now().isoformat()
+    resultados = {}
+    for modulo, tabela in banco.items():
+        gc.collect()
+        tracemalloc.start()
+        for lote in gerador.lotes(modulo, quantidade):
+            for registro in lote:
+                registro['id'] = str(uuid.uuid4())
+                registro['timestamp'] = timestamp
+            tabela.inserir_varios(lote)
+            del lote
+        atual, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        resultados[modulo] = {
+            "registros": len(tabela),
+            "bytes_por_registro": atual / len(tabela),
+            "pico_bytes_por_registro": pico / len(tabela)
+        }
+        # Libera a tabela antes de medir a próxima
+        banco[modulo] = None
+        del tabela
+    return resultados
+
+
+def medir_recuperacao(total, semente):
+    """Recuperação do motor wal com total lançamentos financeiros gravados
+
+    Os registros são gravados como pela simulação (com id e timestamp) e o
+    motor é fechado; a medida é a abertura de um motor novo no mesmo
+    diretório (leitura do snapshot e dos logs) e a criação do banco sobre
+    ele (modelos, índices, agregados e colunas analíticas).
+    """
+    from armazenamento import MotorWAL
+    from registros import criar_banco
+
+    diretorio = os.path.abspath('wal')
+    instante = datetime(2024, 12, 31, 12)
+    motor = MotorWAL(diretorio)
+    gravados = 0
+    for lote in GeradorDados(semente, DATA_REFERENCIA).lotes('financeiro', total):
+        for registro in lote:
+            gravados += 1
+            registro['id'] = str(uuid.UUID(int=gravados))
+            registro['timestamp'] = (instante + timedelta(microseconds=gravados)).isoformat()
+        motor.gravar('financeiro', lote)
+    motor.fechar()
+
+    gc.collect()
+    inicio = time.perf_counter()
+    motor = MotorWAL(diretorio)
+    leitura = time.perf_counter() - inicio
+    banco = criar_banco(motor)
+    total_s = time.perf_counter() - inicio
+    motor.fechar()
+    if len(banco['financeiro']) != total:
+        raise RuntimeError(f"Recuperados {len(banco['financeiro'])} de {total} registros")
+    return {
+        "registros": total,
+        "leitura_s": leitura,
+        "reconstrucao_s": total_s - leitura,
+        "recuperacao_s": total_s,
+        "recuperacao_registros_por_segundo": total / total_s
+    }
+
+
+def executar(partes=PARTES, operacoes=2000, volumes=(10000, 100000, 1000000), requisicoes=500, memoria=20000,
+             repeticoes=3, semente=0, recuperacao=1000000):
+    """Executa as partes pedidas em um diretório temporário e retorna os resultados"""
+    resultado = {
+        "ambiente": ambiente(),
+        "parametros": {
+            "partes": list(partes),
+            "operacoes": operacoes,
+            "volumes": list(volumes),
+            "requisicoes": requisicoes,
+            "memoria": memoria,
+            "repeticoes": repeticoes,
+            "semente": semente,
+            "recuperacao": recuperacao
+        }
+    }
+    original = os.getcwd()
+    temporario = tempfile.mkdtemp(prefix='benchmark_nasajon_')
+    try:
+        # Cada parte roda em um subdiretório próprio (logs, notas e exportações)
+        def em(subdiretorio):
+            caminho = os.path.join(temporario, subdiretorio)
+            os.makedirs(caminho, exist_ok=True)
+            os.chdir(caminho)
+
+        if 'operacoes' in partes:
+            em('operacoes')
+            resultado['operacoes'] = medir_operacoes(operacoes, repeticoes, semente)
+            print(f"operacoes: {len(resultado['operacoes'])} métodos", file=sys.stderr)
+        if 'volume' in partes:
+            resultado['volume'] = {}
+            for total in volumes:
+                em(f"volume_{total}")
+                resultado['volume'][str(total)] = medir_volume(total, repeticoes, semente)
+                gc.collect()
+                print(f"volume: {total} registros", file=sys.stderr)
+        if 'memoria' in partes:
+            resultado['memoria'] = medir_memoria(memoria, semente)
+            print(f"memoria: {len(resultado['memoria'])} módulos", file=sys.stderr)
+        if 'rotas' in partes:
+            em('rotas')
+            resultado['rotas'] = medir_rotas(requisicoes, semente)
+            print(f"rotas: {len(resultado['rotas'])} rotas", file=sys.stderr)
+        if 'recuperacao' in partes:
+            em('recuperacao')
+            resultado['recuperacao'] = medir_recuperacao(recuperacao, semente)
+            gc.collect()
+            print(f"recuperacao: {recuperacao} registros", file=sys.stderr)
+    finally:
+        os.chdir(original)
+        shutil.rmtree(temporario, ignore_errors=True)
+    return resultado
+
+
+def metricas(resultado, prefixo=''):
+    """Valores numéricos dos resultados, com o caminho de cada um (por exemplo volume.10000.carga_s)"""
+    valores = {}
+    for chave, valor in resultado.items():
+        if chave in ('ambiente', 'parametros'):
+            continue
+        nome = f"{prefixo}{chave}"
+        if isinstance(valor, dict):
+            valores.update(metricas(valor, nome + '.'))
+        elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            valores[nome] = valor
+    return valores
+
+
+def eh_medida(nome):
+    """Métricas de tempo, vazão e memória (as demais são contagens)"""
+    return nome.endswith('_s') or any(parte in nome for parte in ('us_por', 'por_segundo', 'bytes'))
+
+
+def comparar(anterior, atual, limite=None):
+    """Variação de cada métrica de tempo, vazão e memória entre dois resultados
+
+    Retorna as linhas (métrica, anterior, atual, variação, piora) e se
+    alguma piora passou do limite (em %). Vazões (por_segundo) pioram ao
+    diminuir; tempos e memória, ao aumentar.
+    """
+    antes, depois = metricas(anterior), metricas(atual)
+    linhas = []
+    regressao = False
+    for nome in sorted(antes.keys() & depois.keys()):
+        if not eh_medida(nome) or not antes[nome]:
+            continue
+        variacao = (depois[nome] - antes[nome]) / antes[nome] * 100
+        piora = -variacao if 'por_segundo' in nome else variacao
+        if limite is not None and piora > limite:
+            regressao = True
+        linhas.append((nome, antes[nome], depois[nome], variacao, piora))
+    return linhas, regressao
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks da simulação local e da API Nasajon")
+    parser.add_argument('--partes', nargs='+', choices=PARTES, default=list(PARTES))
+    parser.add_argument('--operacoes', type=int, default=2000, help="Chamadas por método de criação")
+    parser.add_argument('--volumes', nargs='+', type=int, default=[10000, 100000, 1000000],
+                        help="Totais de registros das medidas de exportação e relatório")
+    parser.add_argument('--requisicoes', type=int, default=500, help="Requisições por rota")
+    parser.add_argument('--memoria', type=int, default=20000, help="Registros por módulo na medida de memória")
+    parser.add_argument('--repeticoes', type=int, default=3, help="Repetições (vale a melhor) das medidas curtas")
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--recuperacao', type=int, default=1000000,
+                        help="Lançamentos gravados na medida de recuperação do motor wal")
+    parser.add_argument('--rapido', action='store_true',
+                        help="Medidas reduzidas (10 mil registros, 200 requisições por rota)")
+    parser.add_argument('--saida', help="Arquivo JSON dos resultados (padrão: benchmarks/benchmark_<commit>_<data>.json)")
+    parser.add_argument('--comparar', help="Resultado anterior (JSON) para comparar com este")
+    parser.add_argument('--limite', type=float,
+                        help="Piora máxima aceita (%%) na comparação; acima dela o código de saída é 1")
+    args = parser.parse_args()
+
+    if args.rapido:
+        args.operacoes, args.volumes, args.requisicoes, args.memoria, args.recuperacao = 500, [10000], 200, 5000, 10000
+
+    resultado = executar(
+        args.partes, args.operacoes, args.volumes, args.requisicoes, args.memoria, args.repeticoes, args.semente,
+        args.recuperacao
+    )
+
+    saida = args.saida
+    if not saida:
+        os.makedirs('benchmarks', exist_ok=True)
+        saida = os.path.join(
+            'benchmarks',
+            f"benchmark_{resultado['ambiente']['commit'] or 'local'}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        )
+    with open(saida, 'wb') as f:
+        f.write(serializacao.dumps(resultado, indentado=True))
+    print(f"Resultados gravados em {saida}")
+
+    for nome, valor in metricas(resultado).items():
+        if eh_medida(nome):
+            print(f"{nome:<72}{valor:>16.6g}")
+
+    if args.comparar:
+        with open(args.comparar, 'rb') as f:
+            anterior = serializacao.loads(f.read())
+        linhas, regressao = comparar(anterior, resultado, args.limite)
+        print(f"\nComparação com {args.comparar} (commit {anterior.get('ambiente', {}).get('commit')}):")
+        for nome, antes, depois, variacao, piora in linhas:
+            marca = ' <' if args.limite is not None and piora > args.limite else ''
+            print(f"{nome:<72}{antes:>14.6g}{depois:>14.6g}{variacao:>+9.1f}%{marca}")
+        if regressao:
+            print(f"Piora acima de {args.limite}% em alguma métrica")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Compara a memória ocupada por registro com dicts e com as classes de modelos.py
+
+Uso:
+    python benchmark_memoria.py --registros 100000
+"""
+import argparse
+import gc
+import random
+import tracemalloc
+import uuid
+from datetime import datetime
+
+from modelos import MODELOS
+from teste_carga import gerar_registro
+
+
+def gerar_registros(modulo, quantidade, semente=0):
+    """Registros no formato guardado pela API (com id e timestamp em texto)"""
+    rnd = random.Random(semente)
+    registros = []
+    for numero in range(quantidade):
+        registro = gerar_registro(modulo, f"BM{numero}", rnd)
+        registro['id'] = str(uuid.uuid4())
+        registro['timestamp'] = datetime.now().isoformat()
+        registros.append(registro)
+    return registros
+
+
+def medir(criar):
+    """Memória alocada (bytes) pelos objetos que criar() retorna e mantém"""
+    gc.collect()
+    tracemalloc.start()
+    objetos = criar()
+    memoria = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return memoria, objetos
+
+
+def medir_modulo(modulo, quantidade):
+    """Bytes por registro de um módulo como dict e como modelo"""
+    modelo = MODELOS[modulo]
+    bytes_dict, _ = medir(lambda: gerar_registros(modulo, quantidade))
+
+    # Os dicts são convertidos e descartados um a um, como na TabelaIndexada
+    def criar_modelos():
+        return [modelo.de_dict(registro) for registro in gerar_registros(modulo, quantidade)]
+    bytes_modelo, _ = medir(criar_modelos)
+
+    # Confere se a conversão preserva o registro
+    original = gerar_registros(modulo, 1)[0]
+    assert modelo.de_dict(original).como_dict() == original
+
+    return {
+        "modulo": modulo,
+        "dict": bytes_dict / quantidade,
+        "modelo": bytes_modelo / quantidade,
+        "economia": 1 - bytes_modelo / bytes_dict
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memória por registro: dict x classes com __slots__")
+    parser.add_argument('--registros', type=int, default=100000, help="Registros por módulo")
+    parser.add_argument('--modulos', nargs='+', choices=list(MODELOS), default=list(MODELOS))
+    args = parser.parse_args()
+
+    print(f"{'Módulo':<12}{'dict (B/reg)':>14}{'modelo (B/reg)':>16}{'economia':>10}")
+    for modulo in args.modulos:
+        resultado = medir_modulo(modulo, args.registros)
+        print(f"{modulo:<12}{resultado['dict']:>14.0f}{resultado['modelo']:>16.0f}{resultado['economia']:>10.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Compara o custo de serializar listagens e exportações com o json da
+biblioteca padrão (como o jsonify do Flask) e com os serializadores de
+serializacao.py
+
+Uso:
+    python benchmark_serializacao.py --registros 20000
+"""
+import argparse
+import json
+import time
+
+import serializacao
+from benchmark_memoria import gerar_registros
+from registros import criar_banco
+
+
+def cronometrar(funcao, repeticoes):
+    """Menor tempo (s) de uma execução de funcao entre as repetições"""
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        duracao = time.perf_counter() - inicio
+        melhor = duracao if melhor is None else min(melhor, duracao)
+    return melhor
+
+
+def jsonify_padrao(objeto):
+    """O que o jsonify do Flask faz: chaves ordenadas, ASCII e separadores compactos"""
+    return json.dumps(objeto, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def medir(tabela, pagina, repeticoes):
+    """Microssegundos por registro de cada caminho de serialização"""
+    total = len(tabela)
+    caminhos = {"json (jsonify)": jsonify_padrao}
+    caminhos.update({nome: dumps for nome, (dumps, _) in serializacao.SERIALIZADORES.items()})
+
+    resultados = []
+    for nome, dumps in caminhos.items():
+        def listar():
+            for inicio in range(0, total, pagina):
+                dumps([tabela[posicao].como_dict() for posicao in range(inicio, min(inicio + pagina, total))])
+
+        def exportar():
+            b'\n'.join(dumps(tabela[posicao].como_dict()) for posicao in range(total))
+
+        resultados.append((nome, cronometrar(listar, repeticoes), cronometrar(exportar, repeticoes)))
+
+    # Listagem com o JSON guardado de cada registro (o caminho da API depois da primeira leitura)
+    for posicao in range(total):
+        tabela.registro_serializado(posicao)
+
+    def listar_guardado():
+        for inicio in range(0, total, pagina):
+            posicoes = range(inicio, min(inicio + pagina, total))
+            serializacao.lista([tabela.registro_serializado(posicao) for posicao in posicoes])
+
+    resultados.append((f"{serializacao.NOME} + JSON guardado", cronometrar(listar_guardado, repeticoes), None))
+    return [
+        (nome, listagem / total * 1e6, None if exportacao is None else exportacao / total * 1e6)
+        for nome, listagem, exportacao in resultados
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serialização JSON: biblioteca padrão x orjson/ujson")
+    parser.add_argument('--registros', type=int, default=20000, help="Lançamentos financeiros na tabela")
+    parser.add_argument('--pagina', type=int, default=1000, help="Registros por página da listagem")
+    parser.add_argument('--repeticoes', type=int, default=3)
+    args = parser.parse_args()
+
+    tabela = criar_banco()['financeiro']
+    tabela.inserir_varios(gerar_registros('financeiro', args.registros))
+
+    print(f"Serializadores disponíveis: {', '.join(serializacao.SERIALIZADORES)} (em uso: {serializacao.NOME})")
+    print(f"{'Caminho':<28}{'listagem (µs/reg)':>20}{'exportação (µs/reg)':>22}")
+    for nome, listagem, exportacao in medir(tabela, args.pagina, args.repeticoes):
+        exportacao = '-' if exportacao is None else f"{exportacao:.2f}"
+        print(f"{nome:<28}{listagem:>20.2f}{exportacao:>22}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+Cache em memória com capacidade limitada e expiração por tempo
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheTTL:
+    """Dicionário limitado a capacidade itens, cada um válido por ttl segundos
+
+    Os itens ficam em ordem de uso: ao inserir em um cache cheio, o menos
+    usado recentemente é descartado, e os itens expirados são removidos
+    quando consultados ou quando chegam ao início da fila. Com ttl=None os
+    itens não expiram (cache LRU simples). Pode ser usado por várias
+    threads.
+
+    Com tamanho (função valor -> bytes) e limite_bytes, o cache também é
+    limitado pela soma dos tamanhos: os menos usados são descartados até
+    caber, e um valor maior que o limite sozinho não é guardado.
+    """
+
+    def __init__(self, capacidade=10000, ttl=None, limite_bytes=None, tamanho=None):
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self.limite_bytes = limite_bytes
+        self.tamanho = tamanho
+        # Soma dos tamanhos dos valores guardados (0 sem a função tamanho)
+        self.bytes = 0
+        # chave -> (instante de expiração, valor, tamanho)
+        self.itens = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.itens)
+
+    def obter(self, chave, padrao=None):
+        """Retorna o valor da chave (marcando-o como usado), ou padrao se ausente ou expirado"""
+        with self.lock:
+            item = self.itens.get(chave)
+            if item is None:
+                return padrao
+            if item[0] is not None and item[0] <= time.monotonic():
+                del self.itens[chave]
+                self.bytes -= item[2]
+                return padrao
+            self.itens.move_to_end(chave)
+            return item[1]
+
+    def guardar(self, chave, valor):
+        """Guarda um valor, descartando os itens expirados e os menos usados se necessário"""
+        agora = time.monotonic()
+        expiracao = None if self.ttl is None else agora + self.ttl
+        tamanho = self.tamanho(valor) if self.tamanho is not None else 0
+        limite_bytes = self.limite_bytes
+        with self.lock:
+            anterior = self.itens.pop(chave, None)
+            if anterior is not None:
+                self.bytes -= anterior[2]
+            if limite_bytes is not None and tamanho > limite_bytes:
+                return
+            self.itens[chave] = (expiracao, valor, tamanho)
+            self.bytes += tamanho
+            # Remove do início da fila os itens em excesso e os expirados; um item
+            # expirado que foi usado depois fica até ser consultado ou descartado
+            while self.itens:
+                primeiro = next(iter(self.itens.values()))
+                if (len(self.itens) > self.capacidade
+                        or (limite_bytes is not None and self.bytes > limite_bytes)
+                        or (primeiro[0] is not None and primeiro[0] <= agora)):
+                    self.bytes -= self.itens.popitem(last=False)[1][2]
+                else:
+                    break
+
+    def remover(self, chave):
+        with self.lock:
+            item = self.itens.pop(chave, None)
+            if item is not None:
+                self.bytes -= item[2]
+
+    def limpar(self):
+        with self.lock:
+            self.itens.clear()
+            self.bytes = 0
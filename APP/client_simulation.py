@@ -1,26 +1,25 @@
 import requests
+import argparse
 import json
 import os
 import time
 from datetime import datetime
 
+from cliente_nasajon import ClienteNasajon
+
 # URL base da API
 BASE_URL = "http://localhost:5000/api"
 
 # Chave de API simulada
 API_KEY = os.environ.get("NASAJON_API_KEY", "api_key_simulada")
 
-# Headers para autenticação
-headers = {
-    "Content-Type": "application/json",
-    "X-API-Key": API_KEY
-}
+# Cliente compartilhado: reaproveita as conexões entre as chamadas
+cliente = ClienteNasajon(BASE_URL, API_KEY)
 
 def check_api_status():
     """Verifica o status da API"""
     try:
-        response = requests.get(f"{BASE_URL}/status", headers=headers)
-        return response.json()
+        return cliente.status()
     except requests.exceptions.ConnectionError:
         print("Erro de conexão: Verifique se a API está rodando")
         return None
@@ -31,12 +30,7 @@ def check_api_status():
 def criar_lancamento_financeiro(lancamento):
     """Cria um lançamento financeiro"""
     try:
-        response = requests.post(
-            f"{BASE_URL}/financeiro/lancamentos",
-            headers=headers,
-            json=lancamento
-        )
-        return response.json(), response.status_code
+        return cliente.criar_lancamento_financeiro(lancamento)
     except Exception as e:
         print(f"Erro ao criar lançamento financeiro: {str(e)}")
         return {"error": str(e)}, 500
@@ -44,12 +38,7 @@ def criar_lancamento_financeiro(lancamento):
 def criar_lancamento_contabil(lancamento):
     """Cria um lançamento contábil"""
     try:
-        response = requests.post(
-            f"{BASE_URL}/contabil/lancamentos",
-            headers=headers,
-            json=lancamento
-        )
-        return response.json(), response.status_code
+        return cliente.criar_lancamento_contabil(lancamento)
     except Exception as e:
         print(f"Erro ao criar lançamento contábil: {str(e)}")
         return {"error": str(e)}, 500
@@ -57,12 +46,7 @@ def criar_lancamento_contabil(lancamento):
 def emitir_nota_fiscal(nota_fiscal):
     """Emite uma nota fiscal"""
     try:
-        response = requests.post(
-            f"{BASE_URL}/fiscal/notas-fiscais",
-            headers=headers,
-            json=nota_fiscal
-        )
-        return response.json(), response.status_code
+        return cliente.emitir_nota_fiscal(nota_fiscal)
     except Exception as e:
         print(f"Erro ao emitir nota fiscal: {str(e)}")
         return {"error": str(e)}, 500
@@ -70,12 +54,7 @@ def emitir_nota_fiscal(nota_fiscal):
 def cadastrar_funcionario(funcionario):
     """Cadastra um funcionário"""
     try:
-        response = requests.post(
-            f"{BASE_URL}/rh/funcionarios",
-            headers=headers,
-            json=funcionario
-        )
-        return response.json(), response.status_code
+        return cliente.cadastrar_funcionario(funcionario)
     except Exception as e:
         print(f"Erro ao cadastrar funcionário: {str(e)}")
         return {"error": str(e)}, 500
@@ -83,29 +62,35 @@ def cadastrar_funcionario(funcionario):
 def criar_pedido_compra(pedido):
     """Cria um pedido de compra"""
     try:
-        response = requests.post(
-            f"{BASE_URL}/compras/pedidos",
-            headers=headers,
-            json=pedido
-        )
-        return response.json(), response.status_code
+        return cliente.criar_pedido_compra(pedido)
     except Exception as e:
         print(f"Erro ao criar pedido de compra: {str(e)}")
         return {"error": str(e)}, 500
 
+def criar_pedido_venda(pedido):
+    """Cria um pedido de venda"""
+    try:
+        return cliente.criar_pedido_venda(pedido)
+    except Exception as e:
+        print(f"Erro ao criar pedido de venda: {str(e)}")
+        return {"error": str(e)}, 500
+
 def cadastrar_produto(produto):
     """Cadastra um produto"""
     try:
-        response = requests.post(
-            f"{BASE_URL}/estoque/produtos",
-            headers=headers,
-            json=produto
-        )
-        return response.json(), response.status_code
+        return cliente.cadastrar_produto(produto)
     except Exception as e:
         print(f"Erro ao cadastrar produto: {str(e)}")
         return {"error": str(e)}, 500
 
+def cadastrar_bem(bem):
+    """Cadastra um bem patrimonial"""
+    try:
+        return cliente.cadastrar_bem(bem)
+    except Exception as e:
+        print(f"Erro ao cadastrar bem patrimonial: {str(e)}")
+        return {"error": str(e)}, 500
+
 def esperar_api_iniciar(max_tentativas=5, intervalo=2):
     """Espera a API iniciar antes de prosseguir"""
     print("Verificando se a API está online...")
@@ -225,7 +210,30 @@ def simular_operacoes():
     print(f"Resultado: {json.dumps(resultado, indent=2)}")
     print("\n")
     
-    # 6. Estoque - Cadastrar produto
+    # 6. Vendas - Criar pedido
+    pedido_venda = {
+        "numero": "PV001",
+        "data": datetime.now().strftime("%Y-%m-%d"),
+        "cliente": {
+            "cnpj": "12345678000100",
+            "nome": "Cliente Exemplo"
+        },
+        "itens": [
+            {
+                "codigo": "001",
+                "descricao": "Produto A",
+                "quantidade": 1,
+                "valorUnitario": 1500.00
+            }
+        ]
+    }
+    
+    resultado, status_code = criar_pedido_venda(pedido_venda)
+    print(f"Vendas - Criar pedido: {status_code}")
+    print(f"Resultado: {json.dumps(resultado, indent=2)}")
+    print("\n")
+    
+    # 7. Estoque - Cadastrar produto
     produto = {
         "codigo": "P001",
         "descricao": "Produto Teste",
@@ -238,7 +246,59 @@ def simular_operacoes():
     print(f"Resultado: {json.dumps(resultado, indent=2)}")
     print("\n")
     
+    # 8. Patrimônio - Cadastrar bem
+    bem = {
+        "codigo": "B001",
+        "descricao": "Computador",
+        "valor": 3000.00,
+        "dataAquisicao": datetime.now().strftime("%Y-%m-%d")
+    }
+    
+    resultado, status_code = cadastrar_bem(bem)
+    print(f"Patrimônio - Cadastrar bem: {status_code}")
+    print(f"Resultado: {json.dumps(resultado, indent=2)}")
+    print("\n")
+    
     print("=== Simulação concluída com sucesso ===")
 
+def executar_teste_carga(args):
+    """Executa o teste de carga (modo --carga)"""
+    import teste_carga
+    
+    if not esperar_api_iniciar():
+        print("Não foi possível conectar à API. Verifique se o servidor está rodando.")
+        return
+    
+    print("=== Teste de carga da API Nasajon ===")
+    relatorio = teste_carga.executar_carga(
+        BASE_URL,
+        API_KEY,
+        workers=args.workers,
+        rps=args.rps,
+        duracao=args.duracao,
+        modulos=args.modulos,
+        formato=args.formato
+    )
+    teste_carga.imprimir_relatorio(relatorio)
+    
+    if args.saida:
+        teste_carga.salvar_relatorio(relatorio, args.saida)
+        print(f"Relatório salvo em {args.saida}")
+
 if __name__ == "__main__":
-    simular_operacoes()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Cliente de simulação da API Nasajon")
+    parser.add_argument('--carga', action='store_true', help="Executa o teste de carga em vez da simulação")
+    parser.add_argument('--workers', type=int, default=8, help="Workers concorrentes (modo --carga)")
+    parser.add_argument('--rps', type=float, default=0, help="Taxa alvo total em req/s, 0 = sem limite (modo --carga)")
+    parser.add_argument('--duracao', type=float, default=30, help="Duração do teste em segundos (modo --carga)")
+    parser.add_argument('--modulos', nargs='+', help="Módulos usados no teste (padrão: todos)")
+    parser.add_argument('--saida', help="Arquivo JSON para salvar o relatório do teste de carga")
+    parser.add_argument('--formato', choices=['json', 'msgpack'], default='json',
+                        help="Formato dos corpos das requisições e respostas")
+    args = parser.parse_args()
+    cliente = ClienteNasajon(BASE_URL, API_KEY, formato=args.formato)
+    
+    if args.carga:
+        executar_teste_carga(args)
+    else:
+        simular_operacoes()
\ No newline at end of file
@@ -0,0 +1,158 @@
+"""
+Cliente HTTP da API Nasajon com conexões reaproveitadas (keep-alive)
+"""
+import os
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import serializacao
+
+# Formatos dos corpos: nome -> tipo (Content-Type/Accept)
+FORMATOS = {
+    'json': serializacao.JSON,
+    'msgpack': serializacao.MSGPACK
+}
+
+# Rotas de criação de cada módulo (relativas à URL base)
+ROTAS = {
+    'financeiro': '/financeiro/lancamentos',
+    'contabil': '/contabil/lancamentos',
+    'fiscal': '/fiscal/notas-fiscais',
+    'rh': '/rh/funcionarios',
+    'compras': '/compras/pedidos',
+    'vendas': '/vendas/pedidos',
+    'estoque': '/estoque/produtos',
+    'patrimonio': '/patrimonio/bens'
+}
+
+
+class ClienteNasajon:
+    """Cliente da API baseado em uma requests.Session
+
+    A sessão mantém um pool de conexões abertas com o servidor, evitando
+    uma nova conexão TCP por requisição. Falhas de conexão e respostas
+    429/503 (o servidor não processou a requisição) são repetidas com
+    espera exponencial; as demais respostas são devolvidas ao chamador.
+
+    Uma instância pode ser usada por várias threads, desde que pool seja
+    pelo menos o número de threads.
+
+    Com formato='msgpack', os corpos são enviados e recebidos em
+    MessagePack (menores e mais rápidos de ler que JSON); o padrão é JSON.
+    """
+
+    def __init__(self, base_url="http://localhost:5000/api", api_key=None, pool=10,
+                 tentativas=3, backoff=0.2, timeout=10, formato='json'):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato desconhecido: {formato}")
+        if formato == 'msgpack' and serializacao.msgpack is None:
+            raise RuntimeError("O formato msgpack requer o pacote msgpack (pip install msgpack)")
+        self.base_url = base_url
+        self.timeout = timeout
+        self.tipo = FORMATOS[formato]
+
+        retry = Retry(
+            total=tentativas,
+            connect=tentativas,
+            read=0,
+            status=tentativas,
+            status_forcelist=(429, 503),
+            allowed_methods=frozenset(['GET', 'POST']),
+            backoff_factor=backoff,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool, max_retries=retry)
+
+        self.sessao = requests.Session()
+        self.sessao.mount('http://', adapter)
+        self.sessao.mount('https://', adapter)
+        self.sessao.headers.update({
+            "Content-Type": self.tipo,
+            "Accept": self.tipo,
+            "X-API-Key": api_key or os.environ.get("NASAJON_API_KEY", "api_key_simulada")
+        })
+
+    def enviar(self, metodo, rota, corpo=None, **kwargs):
+        """Envia uma requisição e retorna a resposta (exceções de rede são propagadas)
+
+        corpo é serializado no formato do cliente.
+        """
+        if corpo is not None:
+            kwargs['data'] = serializacao.codificar(corpo, self.tipo)
+        kwargs.setdefault('timeout', self.timeout)
+        return self.sessao.request(metodo, f"{self.base_url}{rota}", **kwargs)
+
+    @staticmethod
+    def ler(resposta):
+        """Corpo da resposta, lido conforme o Content-Type (JSON ou MessagePack)"""
+        return serializacao.decodificar(resposta.content, resposta.headers.get('Content-Type'))
+
+    def status(self):
+        """Verifica o status da API"""
+        return self.ler(self.enviar('GET', '/status'))
+
+    @staticmethod
+    def cabecalhos(chave_idempotencia):
+        return {"Idempotency-Key": chave_idempotencia} if chave_idempotencia else None
+
+    def criar(self, modulo, registro, chave_idempotencia=None):
+        """Cria um registro de um módulo
+
+        Com chave_idempotencia, reenviar o mesmo registro com a mesma chave
+        devolve a resposta original em vez de criá-lo de novo.
+        """
+        resposta = self.enviar('POST', ROTAS[modulo], registro, headers=self.cabecalhos(chave_idempotencia))
+        return self.ler(resposta), resposta.status_code
+
+    def criar_lote(self, modulo, registros, chave_idempotencia=None):
+        """Cria uma lista de registros de um módulo em uma única requisição"""
+        resposta = self.enviar(
+            'POST', f"{ROTAS[modulo]}/batch", registros, headers=self.cabecalhos(chave_idempotencia)
+        )
+        return self.ler(resposta), resposta.status_code
+
+    def listar(self, modulo, **parametros):
+        """Lista uma página dos registros de um módulo (parâmetros como limit, after e filtros)
+
+        Retorna (registros, status, cursor da próxima página ou None).
+        """
+        resposta = self.enviar('GET', ROTAS[modulo], params=parametros)
+        return self.ler(resposta), resposta.status_code, resposta.headers.get('X-Next-Cursor')
+
+    def criar_lancamento_financeiro(self, lancamento):
+        """Cria um lançamento financeiro"""
+        return self.criar('financeiro', lancamento)
+
+    def criar_lancamento_contabil(self, lancamento):
+        """Cria um lançamento contábil"""
+        return self.criar('contabil', lancamento)
+
+    def emitir_nota_fiscal(self, nota_fiscal):
+        """Emite uma nota fiscal"""
+        return self.criar('fiscal', nota_fiscal)
+
+    def cadastrar_funcionario(self, funcionario):
+        """Cadastra um funcionário"""
+        return self.criar('rh', funcionario)
+
+    def criar_pedido_compra(self, pedido):
+        """Cria um pedido de compra"""
+        return self.criar('compras', pedido)
+
+    def criar_pedido_venda(self, pedido):
+        """Cria um pedido de venda"""
+        return self.criar('vendas', pedido)
+
+    def cadastrar_produto(self, produto):
+        """Cadastra um produto"""
+        return self.criar('estoque', produto)
+
+    def cadastrar_bem(self, bem):
+        """Cadastra um bem patrimonial"""
+        return self.criar('patrimonio', bem)
+
+    def fechar(self):
+        """Fecha as conexões do pool"""
+        self.sessao.close()
@@ -0,0 +1,301 @@
+"""
+Execução de simulações de grande volume em vários processos
+
+A carga (registros sintéticos de gerador_dados.py) é dividida em fatias,
+por módulo ou por faixa de chaves (números de lote), e cada fatia roda em
+um processo do pool com a sua própria SimulacaoNasajon, em
+<diretorio>/fatias/fatia_<n>. No fim, os resultados das fatias são
+mesclados sempre na ordem das fatias (e não na ordem em que terminaram),
+de modo que a mesma divisão produz sempre o mesmo resultado:
+
+- agregados (AgregadosModulo.mesclar) e colunas analíticas
+  (ColunasLancamentos.mesclar), com os quais são gerados os relatórios;
+- exportações: os arquivos NDJSON das fatias são concatenados em
+  <diretorio>/dados_exportados/<modulo>.ndjson[.gz|.zst];
+- logs: concatenados em <diretorio>/logs/, com o número da fatia em cada
+  linha.
+
+Com carregar=True (--carregar), os registros exportados também são
+carregados em um banco em memória (criar_banco), como o de uma simulação
+em um único processo.
+
+Uso:
+    python execucao_paralela.py --registros 2000000 --processos 8
+    python execucao_paralela.py --registros 500000 --divisao modulo --relatorios
+"""
+import argparse
+import gzip
+import io
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+
+import analitico
+import serializacao
+from agregados import criar_agregados, montar_relatorio
+from exportacao import EXTENSOES, zstandard
+from gerador_dados import TAMANHO_LOTE, GeradorDados
+from modulos import MODULOS
+from registros import criar_banco
+
+DIVISOES = ('chave', 'modulo')
+
+
+def dividir(modulos, quantidade, processos, divisao='chave', tamanho_lote=TAMANHO_LOTE):
+    """Lista das fatias (modulo, primeiro lote, último lote + 1), na ordem de mesclagem
+
+    Na divisão por módulo, cada módulo é uma fatia; na divisão por chave,
+    os lotes de cada módulo são repartidos em até processos faixas
+    contíguas (as chaves são prefixo + número do registro).
+    """
+    if divisao not in DIVISOES:
+        raise ValueError(f"Divisão desconhecida: {divisao} (use {' ou '.join(DIVISOES)})")
+    lotes = (quantidade + tamanho_lote - 1) // tamanho_lote
+    if divisao == 'modulo':
+        return [(modulo, 0, lotes) for modulo in modulos]
+
+    fatias = []
+    partes = max(1, min(processos, lotes))
+    for modulo in modulos:
+        for parte in range(partes):
+            inicio, fim = lotes * parte // partes, lotes * (parte + 1) // partes
+            if fim > inicio:
+                fatias.append((modulo, inicio, fim))
+    return fatias
+
+
+def executar_fatia(numero, fatia, parametros):
+    """Executa uma fatia em uma SimulacaoNasajon própria (no processo do pool)
+
+    Retorna o resumo da fatia com os agregados e as colunas do módulo e os
+    caminhos (absolutos) do log e do arquivo exportado.
+    """
+    from simulacao_local import SimulacaoNasajon
+
+    modulo, primeiro_lote, ultimo_lote = fatia
+    diretorio = os.path.abspath(os.path.join(parametros['diretorio'], 'fatias', f"fatia_{numero:03d}"))
+    os.makedirs(diretorio, exist_ok=True)
+    os.chdir(diretorio)
+
+    inicio = time.perf_counter()
+    gerador = GeradorDados(parametros['semente'], parametros['data_final'], em_ordem=parametros['em_ordem'])
+    nasajon = SimulacaoNasajon(silencioso=True, formato_notas=parametros['formato_notas'])
+    try:
+        criados = erros = 0
+        for numero_lote in range(primeiro_lote, ultimo_lote):
+            lote = gerador.lote(modulo, numero_lote, parametros['tamanho_lote'], parametros['quantidade'])
+            resultado = nasajon.criar_lote(modulo, lote)
+            criados += resultado['criados']
+            erros += resultado['erros']
+        nasajon.exportar_dados(incremental=False, compressao=parametros['compressao'])
+    finally:
+        nasajon.encerrar()
+
+    tabela = nasajon.db[modulo]
+    arquivo = os.path.join(diretorio, 'dados_exportados', f"{modulo}{EXTENSOES[parametros['compressao']]}")
+    return {
+        "fatia": numero,
+        "modulo": modulo,
+        "lotes": [primeiro_lote, ultimo_lote],
+        "criados": criados,
+        "erros": erros,
+        "segundos": time.perf_counter() - inicio,
+        "agregados": tabela.agregados,
+        "colunas": tabela.colunas,
+        "log": os.path.join(diretorio, nasajon.log_file),
+        "exportacao": arquivo if criados else None
+    }
+
+
+def mesclar_exportacoes(resultados, diretorio, compressao):
+    """Concatena os arquivos exportados das fatias, por módulo, na ordem das fatias
+
+    Os formatos gzip e zstd aceitam blocos comprimidos concatenados, então
+    os arquivos são copiados sem descomprimir.
+    """
+    destino = os.path.join(diretorio, 'dados_exportados')
+    os.makedirs(destino, exist_ok=True)
+    arquivos = {}
+    for resultado in resultados:
+        if resultado['exportacao']:
+            arquivos.setdefault(resultado['modulo'], []).append(resultado['exportacao'])
+
+    mesclados = {}
+    for modulo, origens in arquivos.items():
+        caminho = os.path.join(destino, f"{modulo}{EXTENSOES[compressao]}")
+        with open(caminho + '.tmp', 'wb') as saida:
+            for origem in origens:
+                with open(origem, 'rb') as entrada:
+                    shutil.copyfileobj(entrada, saida, 1024 * 1024)
+        os.replace(caminho + '.tmp', caminho)
+        mesclados[modulo] = caminho
+    return mesclados
+
+
+def mesclar_logs(resultados, diretorio):
+    """Concatena os logs das fatias em um único arquivo, com o número da fatia em cada linha"""
+    os.makedirs(os.path.join(diretorio, 'logs'), exist_ok=True)
+    caminho = os.path.join(diretorio, 'logs', f"simulacao_paralela_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
+    with open(caminho, 'w', encoding='utf-8') as saida:
+        for resultado in resultados:
+            prefixo = f"[fatia {resultado['fatia']:03d} {resultado['modulo']}] "
+            with open(resultado['log'], encoding='utf-8') as entrada:
+                saida.writelines(prefixo + linha for linha in entrada)
+    return caminho
+
+
+def ler_exportacao(caminho, compressao):
+    """Registros de um arquivo exportado, um por linha"""
+    if compressao == 'gzip':
+        arquivo = gzip.open(caminho, 'rb')
+    elif compressao == 'zstd':
+        leitor = zstandard.ZstdDecompressor().stream_reader(open(caminho, 'rb'), read_across_frames=True)
+        arquivo = io.BufferedReader(leitor)
+    else:
+        arquivo = open(caminho, 'rb')
+    with arquivo:
+        for linha in arquivo:
+            if linha.strip():
+                yield serializacao.loads(linha)
+
+
+def montar_banco(resultados, exportacoes=None, compressao=None):
+    """Banco em memória com os agregados e as colunas mesclados das fatias
+
+    Com exportacoes ({modulo: arquivo}), as tabelas também recebem os
+    registros exportados; sem elas, ficam vazias e servem apenas aos
+    relatórios.
+    """
+    banco = criar_banco()
+    for modulo, tabela in banco.items():
+        agregados = criar_agregados(modulo)
+        colunas = analitico.criar_colunas(modulo)
+        for resultado in resultados:
+            if resultado['modulo'] != modulo:
+                continue
+            agregados.mesclar(resultado['agregados'])
+            if colunas is not None:
+                colunas.mesclar(resultado['colunas'])
+
+        if exportacoes and modulo in exportacoes:
+            # Os agregados e as colunas já vêm mesclados: a carga só indexa os registros
+            tabela.agregados = tabela.colunas = None
+            for registro in ler_exportacao(exportacoes[modulo], compressao):
+                tabela.indexar(registro, indice_data=False)
+            tabela.reconstruir_indice_data()
+        tabela.agregados = agregados
+        tabela.colunas = colunas
+    return banco
+
+
+def executar(quantidade, processos=None, modulos=None, divisao='chave', tamanho_lote=TAMANHO_LOTE, semente=0,
+             diretorio='execucao_paralela', compressao=None, formato_notas='segmentos', em_ordem=True,
+             carregar=False):
+    """Executa a simulação em um pool de processos e mescla os resultados
+
+    Retorna (banco, resumo): o banco de montar_banco e o resumo da execução
+    (fatias, totais, tempo e caminhos dos arquivos mesclados).
+    """
+    processos = processos or os.cpu_count() or 1
+    modulos = modulos or list(MODULOS)
+    fatias = dividir(modulos, quantidade, processos, divisao, tamanho_lote)
+    parametros = {
+        "diretorio": os.path.abspath(diretorio),
+        "quantidade": quantidade,
+        "tamanho_lote": tamanho_lote,
+        "semente": semente,
+        # A mesma data final em todos os processos, mesmo que a execução passe da meia-noite
+        "data_final": date.today(),
+        "em_ordem": em_ordem,
+        "compressao": compressao,
+        "formato_notas": formato_notas
+    }
+
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processos) as pool:
+        # map devolve os resultados na ordem das fatias
+        resultados = list(pool.map(
+            executar_fatia, range(len(fatias)), fatias, [parametros] * len(fatias)
+        ))
+    execucao = time.perf_counter() - inicio
+
+    exportacoes = mesclar_exportacoes(resultados, parametros['diretorio'], compressao)
+    log = mesclar_logs(resultados, parametros['diretorio'])
+    banco = montar_banco(resultados, exportacoes if carregar else None, compressao)
+    decorrido = time.perf_counter() - inicio
+
+    criados = sum(resultado['criados'] for resultado in resultados)
+    resumo = {
+        "processos": processos,
+        "divisao": divisao,
+        "fatias": [
+            {chave: resultado[chave] for chave in ('fatia', 'modulo', 'lotes', 'criados', 'erros', 'segundos')}
+            for resultado in resultados
+        ],
+        "criados": criados,
+        "erros": sum(resultado['erros'] for resultado in resultados),
+        "segundos_execucao": execucao,
+        "segundos_total": decorrido,
+        "registros_por_minuto": criados / decorrido * 60 if decorrido else 0,
+        "exportacoes": exportacoes,
+        "log": log
+    }
+    return banco, resumo
+
+
+def gravar_relatorios(banco, diretorio):
+    """Grava o relatório de estatísticas e os relatórios analíticos do banco mesclado"""
+    os.makedirs(os.path.join(diretorio, 'relatorios'), exist_ok=True)
+    sufixo = datetime.now().strftime('%Y%m%d_%H%M%S')
+    relatorios = {'relatorio': montar_relatorio(banco)}
+    for tipo in analitico.RELATORIOS:
+        relatorios[f"relatorio_{tipo.replace('-', '_')}"] = analitico.gerar(banco, tipo)
+
+    arquivos = []
+    for prefixo, relatorio in relatorios.items():
+        arquivo = os.path.join(diretorio, 'relatorios', f"{prefixo}_{sufixo}.json")
+        with open(arquivo, 'wb') as f:
+            f.write(serializacao.dumps(relatorio, indentado=True))
+        arquivos.append(arquivo)
+    return arquivos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulação Nasajon em vários processos")
+    parser.add_argument('--registros', type=int, default=1000000, help="Registros sintéticos por módulo")
+    parser.add_argument('--processos', type=int, help="Processos do pool (padrão: número de CPUs)")
+    parser.add_argument('--divisao', choices=DIVISOES, default='chave',
+                        help="Fatias por faixa de chaves (lotes) de cada módulo ou uma por módulo")
+    parser.add_argument('--modulos', nargs='+', choices=list(MODULOS), default=list(MODULOS))
+    parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help="Registros por lote")
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--diretorio', default='execucao_paralela', help="Diretório das fatias e dos resultados")
+    parser.add_argument('--compressao', choices=['gzip', 'zstd'], help="Comprime os arquivos exportados")
+    parser.add_argument('--notas', choices=['arquivos', 'segmentos'], default='segmentos',
+                        help="Formato dos arquivos de notas fiscais de cada fatia")
+    parser.add_argument('--carregar', action='store_true',
+                        help="Carrega os registros exportados no banco mesclado (em memória)")
+    parser.add_argument('--relatorios', action='store_true', help="Grava os relatórios do resultado mesclado")
+    args = parser.parse_args()
+
+    banco, resumo = executar(
+        args.registros, args.processos, args.modulos, args.divisao, args.lote, args.semente,
+        args.diretorio, args.compressao, args.notas, carregar=args.carregar
+    )
+
+    for fatia in resumo['fatias']:
+        print(f"fatia {fatia['fatia']:03d} {fatia['modulo']:<12} lotes {fatia['lotes'][0]}-{fatia['lotes'][1] - 1}"
+              f"{fatia['criados']:>10} criados{fatia['erros']:>6} erros{fatia['segundos']:>8.1f}s")
+    print(f"{resumo['criados']} registros em {resumo['segundos_total']:.1f}s com {resumo['processos']} processos "
+          f"({resumo['registros_por_minuto']:,.0f} registros/min); log em {resumo['log']}")
+    if args.carregar:
+        print(f"Banco mesclado: {sum(len(tabela) for tabela in banco.values())} registros em memória")
+    if args.relatorios:
+        for arquivo in gravar_relatorios(banco, args.diretorio):
+            print(f"Relatório gerado: {arquivo}")
+
+
+if __name__ == '__main__':
+    main()
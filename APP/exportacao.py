@@ -0,0 +1,154 @@
+"""
+Exportação dos dados da simulação local em NDJSON (um registro por linha)
+"""
+import gzip
+import json
+import os
+
+import serializacao
+
+try:
+    import zstandard
+except ImportError:  # a compressão zstd é opcional
+    zstandard = None
+
+# Extensão dos arquivos por tipo de compressão
+EXTENSOES = {
+    None: '.ndjson',
+    'gzip': '.ndjson.gz',
+    'zstd': '.ndjson.zst'
+}
+
+ARQUIVO_MARCAS = 'marcas_exportacao.json'
+
+# Registros serializados e gravados de uma vez
+LINHAS_POR_ESCRITA = 1000
+
+
+def abrir_arquivo(caminho, modo, compressao=None):
+    """Abre um arquivo de exportação (binário) para escrita ('w') ou acréscimo ('a')
+
+    Os acréscimos em gzip e zstd criam um novo bloco comprimido no fim do
+    arquivo; os leitores dos dois formatos leem os blocos em sequência.
+    """
+    if compressao is None:
+        return open(caminho, modo + 'b')
+    if compressao == 'gzip':
+        return gzip.open(caminho, modo + 'b', compresslevel=6)
+    if compressao == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("A compressão zstd requer o pacote zstandard (pip install zstandard)")
+        return zstandard.ZstdCompressor().stream_writer(open(caminho, modo + 'b'))
+    raise ValueError(f"Compressão desconhecida: {compressao}")
+
+
+class Exportador:
+    """Exporta as tabelas para <diretorio>/<modulo>.ndjson[.gz|.zst]
+
+    No modo incremental, apenas os registros criados desde a última
+    exportação são acrescentados ao arquivo; sem uma marca válida (primeira
+    exportação, marcas perdidas ou outra simulação), o arquivo é regravado
+    com todos os registros. A marca de cada arquivo (a
+    quantidade de registros já exportados e o id do último) fica em
+    marcas_exportacao.json e só é atualizada depois que o arquivo foi
+    gravado; uma falha entre as duas etapas pode repetir registros na
+    próxima exportação, mas nunca perdê-los.
+    """
+
+    def __init__(self, diretorio='dados_exportados', compressao=None):
+        if compressao not in EXTENSOES:
+            raise ValueError(f"Compressão desconhecida: {compressao}")
+        self.diretorio = diretorio
+        self.compressao = compressao
+        self.arquivo_marcas = os.path.join(diretorio, ARQUIVO_MARCAS)
+        os.makedirs(diretorio, exist_ok=True)
+        self.marcas = self.ler_marcas()
+
+    def ler_marcas(self):
+        """Lê as marcas da última exportação de cada arquivo"""
+        try:
+            with open(self.arquivo_marcas, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def gravar_marcas(self):
+        """Grava as marcas substituindo o arquivo de uma só vez"""
+        temporario = self.arquivo_marcas + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(self.marcas, f, indent=2)
+        os.replace(temporario, self.arquivo_marcas)
+
+    def nome_arquivo(self, modulo):
+        return f"{modulo}{EXTENSOES[self.compressao]}"
+
+    def inicio_incremental(self, nome, tabela):
+        """Posição do primeiro registro ainda não exportado para o arquivo
+
+        Retorna None sem uma marca válida: o arquivo, se existir, não
+        corresponde a estes registros e precisa ser regravado.
+        """
+        marca = self.marcas.get(nome)
+        if not marca:
+            return None
+        posicao = marca['posicao']
+        # A marca só vale para a mesma sequência de registros (por exemplo, o
+        # mesmo banco SQLite); uma simulação nova em memória recomeça do zero
+        if 0 < posicao <= len(tabela) and tabela[posicao - 1]['id'] == marca['id']:
+            return posicao
+        return None
+
+    def escrever(self, arquivo, tabela, inicio):
+        """Grava os registros a partir de inicio, um por linha, e retorna a quantidade"""
+        total = len(tabela)
+        dumps = serializacao.dumps
+        for bloco in range(inicio, total, LINHAS_POR_ESCRITA):
+            fim = min(bloco + LINHAS_POR_ESCRITA, total)
+            linhas = [dumps(tabela[posicao].como_dict()) for posicao in range(bloco, fim)]
+            arquivo.write(b'\n'.join(linhas) + b'\n')
+        return total - inicio
+
+    def marcar(self, nome, tabela):
+        self.marcas[nome] = {"posicao": len(tabela), "id": tabela[len(tabela) - 1]['id']}
+
+    def exportar_incremental(self, modulo, tabela):
+        """Acrescenta ao arquivo do módulo os registros novos
+
+        Sem uma marca válida para o arquivo, ele é regravado do início.
+        """
+        nome = self.nome_arquivo(modulo)
+        inicio = self.inicio_incremental(nome, tabela)
+        if inicio is None:
+            return self.exportar_completo(modulo, tabela) if len(tabela) else 0
+        if inicio >= len(tabela):
+            return 0
+
+        with abrir_arquivo(os.path.join(self.diretorio, nome), 'a', self.compressao) as arquivo:
+            exportados = self.escrever(arquivo, tabela, inicio)
+
+        self.marcar(nome, tabela)
+        return exportados
+
+    def exportar_completo(self, modulo, tabela):
+        """Regrava o arquivo do módulo (não vazio) com todos os registros, um a um"""
+        nome = self.nome_arquivo(modulo)
+        caminho = os.path.join(self.diretorio, nome)
+        temporario = caminho + '.tmp'
+
+        with abrir_arquivo(temporario, 'w', self.compressao) as arquivo:
+            exportados = self.escrever(arquivo, tabela, 0)
+        os.replace(temporario, caminho)
+
+        self.marcar(nome, tabela)
+        return exportados
+
+    def exportar(self, banco, incremental=True):
+        """Exporta todas as tabelas e retorna a quantidade de registros gravados por módulo"""
+        exportados = {}
+        for modulo, tabela in banco.items():
+            if incremental:
+                exportados[modulo] = self.exportar_incremental(modulo, tabela)
+            elif len(tabela):
+                exportados[modulo] = self.exportar_completo(modulo, tabela)
+        self.gravar_marcas()
+        return exportados
@@ -0,0 +1,386 @@
+"""
+Gerador de dados sintéticos dos oito módulos para simulações de grande volume
+
+Os campos de cada lote são sorteados de uma vez com o NumPy (valores,
+datas, contas, CNPJs/CPFs e itens) e só no fim convertidos em dicts no
+formato das rotas de criação. Os registros saem em lotes (um gerador), sem
+manter o volume todo em memória, e podem ir para a SimulacaoNasajon, para
+a API (rotas /batch) ou para arquivos NDJSON.
+
+O resultado depende apenas da semente, da data final e do tamanho do lote:
+cada lote usa um gerador próprio, derivado da semente, do módulo e do
+número do lote, e pode ser gerado isoladamente (por exemplo, em outro
+processo).
+
+Uso:
+    python gerador_dados.py --registros 1000000 --destino simulacao
+    python gerador_dados.py --registros 100000 --destino api --modulos financeiro fiscal
+"""
+import argparse
+import os
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+import serializacao
+from modulos import MODULOS
+
+TAMANHO_LOTE = 10000
+
+# Populações fixas (sorteadas uma vez por semente) de onde os lotes escolhem
+PRODUTOS = 5000
+CLIENTES = 20000
+FORNECEDORES = 2000
+
+# Plano de contas do financeiro por tipo: (conta, peso)
+CONTAS = {
+    'RECEITA': [("1001", 50), ("1002", 25), ("1003", 15), ("1101", 10)],
+    'DESPESA': [("2001", 40), ("2002", 25), ("2003", 15), ("2101", 12), ("3001", 8)]
+}
+DESCRICOES = {
+    'RECEITA': ["Venda à vista", "Recebimento de cliente", "Rendimento de aplicação", "Venda a prazo"],
+    'DESPESA': ["Pagamento de fornecedor", "Folha de pagamento", "Aluguel", "Impostos", "Energia elétrica"]
+}
+PROPORCAO_RECEITAS = 0.45
+
+# Partidas do contábil: (débito, crédito, histórico, peso)
+PARTIDAS = [
+    ("1001", "3101", "Venda à vista", 35),
+    ("1101", "3101", "Venda a prazo", 20),
+    ("1001", "1101", "Recebimento de cliente", 15),
+    ("2001", "1001", "Pagamento de fornecedor", 15),
+    ("4101", "2101", "Provisão de folha", 8),
+    ("4201", "1001", "Despesas gerais", 7)
+]
+
+# Cargos do RH: (cargo, salário mediano, peso)
+CARGOS = [
+    ("Assistente", 2500, 40),
+    ("Analista", 5500, 35),
+    ("Coordenador", 9000, 12),
+    ("Gerente", 15000, 8),
+    ("Diretor", 30000, 5)
+]
+
+UNIDADES = [("UN", 60), ("CX", 15), ("KG", 12), ("LT", 8), ("MT", 5)]
+BENS = ["Computador", "Notebook", "Impressora", "Mesa", "Cadeira", "Veículo", "Servidor", "Ar-condicionado"]
+
+PESOS_CNPJ_1 = np.array([5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+PESOS_CNPJ_2 = np.array([6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2])
+PESOS_CPF_1 = np.arange(10, 1, -1)
+PESOS_CPF_2 = np.arange(11, 1, -1)
+
+# Multiplicador primo com 10: n -> (n * MULTIPLICADOR_CPF + deslocamento) mod 10^9 é uma
+# bijeção, então números de registro diferentes nunca geram o mesmo CPF
+MULTIPLICADOR_CPF = 387420489
+
+
+def probabilidades(pesos):
+    pesos = np.asarray(pesos, dtype=float)
+    return pesos / pesos.sum()
+
+
+def zipf(quantidade, expoente=1.1):
+    """Probabilidades decrescentes por posição: poucos clientes e produtos concentram o volume"""
+    return probabilidades(1.0 / np.arange(1, quantidade + 1) ** expoente)
+
+
+def digitos(numeros, quantidade):
+    """Matriz (n, quantidade) com os dígitos decimais de cada número"""
+    return (numeros[:, None] // 10 ** np.arange(quantidade - 1, -1, -1)) % 10
+
+
+def digito_verificador(matriz, pesos):
+    resto = (matriz @ pesos) % 11
+    return np.where(resto < 2, 0, 11 - resto)
+
+
+def cnpjs(raizes):
+    """CNPJs válidos (matriz 0001) das raízes de 8 dígitos, como texto"""
+    base = raizes.astype(np.int64) * 10000 + 1
+    matriz = digitos(base, 12)
+    dv1 = digito_verificador(matriz, PESOS_CNPJ_1)
+    dv2 = digito_verificador(np.column_stack([matriz, dv1]), PESOS_CNPJ_2)
+    return [f"{numero:014d}" for numero in (base * 100 + dv1 * 10 + dv2).tolist()]
+
+
+def cpfs(bases):
+    """CPFs válidos a partir das bases de 9 dígitos, como texto"""
+    bases = bases.astype(np.int64)
+    matriz = digitos(bases, 9)
+    dv1 = digito_verificador(matriz, PESOS_CPF_1)
+    dv2 = digito_verificador(np.column_stack([matriz, dv1]), PESOS_CPF_2)
+    return [f"{numero:011d}" for numero in (bases * 100 + dv1 * 10 + dv2).tolist()]
+
+
+def valores(rnd, mediana, dispersao, quantidade, minimo=0.01):
+    """Valores monetários com distribuição log-normal (muitos pequenos, poucos grandes)"""
+    return np.maximum(np.round(rnd.lognormal(np.log(mediana), dispersao, quantidade), 2), minimo)
+
+
+class GeradorDados:
+    """Gera registros sintéticos válidos dos módulos, em lotes
+
+    - valores: log-normais, com medianas por módulo (e por cargo no RH);
+    - datas: os dias do período (dias dias até data_final) têm pesos, com
+      menos movimento nos fins de semana e mais no fim do mês. Com
+      em_ordem=True (o padrão) as datas crescem com o número do registro,
+      como chegam em produção, e a tabela acrescenta cada uma no fim do
+      índice por data; com em_ordem=False são sorteadas;
+    - contas e partidas: planos com pesos por tipo de lançamento;
+    - clientes, fornecedores e produtos: populações fixas com CNPJs válidos
+      e frequências de Zipf;
+    - CPFs: válidos e únicos (derivados do número do registro);
+    - itens: de 1 a 10 por nota ou pedido, com quantidades geométricas e o
+      preço de tabela do produto com uma pequena variação; o valor da nota
+      é a soma dos itens.
+
+    As chaves naturais são prefixo + número do registro (com 10 dígitos).
+    """
+
+    def __init__(self, semente=0, data_final=None, dias=365, prefixo='SD', em_ordem=True):
+        self.semente = semente
+        self.prefixo = prefixo
+        self.em_ordem = em_ordem
+
+        data_final = data_final or date.today()
+        dias_periodo = [data_final - timedelta(days=dias - 1 - numero) for numero in range(dias)]
+        self.datas = np.array([dia.isoformat() for dia in dias_periodo], dtype=object)
+        pesos = np.array([
+            (1.0 if dia.weekday() < 5 else 0.3 if dia.weekday() == 5 else 0.1) * (1.6 if dia.day >= 25 else 1.0)
+            for dia in dias_periodo
+        ])
+        self.pesos_datas = probabilidades(pesos)
+        self.acumulado_datas = np.cumsum(self.pesos_datas)
+
+        rnd = np.random.default_rng([semente])
+        self.produtos_codigos = [f"{numero:06d}" for numero in range(1, PRODUTOS + 1)]
+        self.produtos_descricoes = [f"Produto {numero}" for numero in range(1, PRODUTOS + 1)]
+        self.produtos_precos = valores(rnd, 40, 1.2, PRODUTOS)
+        self.pesos_produtos = zipf(PRODUTOS)
+        self.clientes = [
+            {"cnpj": cnpj, "nome": f"Cliente {numero}"}
+            for numero, cnpj in enumerate(cnpjs(rnd.choice(10 ** 8, CLIENTES, replace=False)), 1)
+        ]
+        self.pesos_clientes = zipf(CLIENTES)
+        self.fornecedores = [
+            {"cnpj": cnpj, "nome": f"Fornecedor {numero}"}
+            for numero, cnpj in enumerate(cnpjs(rnd.choice(10 ** 8, FORNECEDORES, replace=False)), 1)
+        ]
+        self.pesos_fornecedores = zipf(FORNECEDORES)
+        self.deslocamento_cpf = int(rnd.integers(10 ** 9))
+
+    def gerador(self, modulo, numero_lote):
+        """Gerador do NumPy de um lote, independente dos outros lotes"""
+        return np.random.default_rng([self.semente, list(MODULOS).index(modulo), numero_lote])
+
+    def sortear_datas(self, rnd, numeros, total):
+        if self.em_ordem and total:
+            posicoes = np.searchsorted(self.acumulado_datas, (numeros + 0.5) / total)
+            posicoes = np.minimum(posicoes, len(self.datas) - 1)
+        else:
+            posicoes = rnd.choice(len(self.datas), len(numeros), p=self.pesos_datas)
+        return self.datas[posicoes].tolist()
+
+    def sortear_itens(self, rnd, quantidade):
+        """Itens de cada registro e o valor total (soma de quantidade x valorUnitario)"""
+        por_registro = np.minimum(1 + rnd.poisson(1.5, quantidade), 10)
+        total = int(por_registro.sum())
+        produtos = rnd.choice(PRODUTOS, total, p=self.pesos_produtos)
+        quantidades = rnd.geometric(0.4, total)
+        precos = np.round(self.produtos_precos[produtos] * rnd.uniform(0.95, 1.05, total), 2)
+        inicios = np.concatenate([[0], np.cumsum(por_registro)[:-1]])
+        totais = np.round(np.add.reduceat(quantidades * precos, inicios), 2)
+
+        codigos = self.produtos_codigos
+        descricoes = self.produtos_descricoes
+        itens = [
+            {"codigo": codigos[produto], "descricao": descricoes[produto], "quantidade": q, "valorUnitario": p}
+            for produto, q, p in zip(produtos.tolist(), quantidades.tolist(), precos.tolist())
+        ]
+        limites = np.cumsum(por_registro).tolist()
+        return [itens[inicio:fim] for inicio, fim in zip([0] + limites[:-1], limites)], totais.tolist()
+
+    def lote(self, modulo, numero_lote, tamanho=TAMANHO_LOTE, total=None):
+        """Registros de numero_lote * tamanho até (numero_lote + 1) * tamanho (ou total)
+
+        total é a quantidade de registros da geração inteira, usada para
+        distribuir as datas em ordem pelo período.
+        """
+        inicio = numero_lote * tamanho
+        fim = inicio + tamanho if total is None else min(inicio + tamanho, total)
+        if fim <= inicio:
+            return []
+        rnd = self.gerador(modulo, numero_lote)
+        numeros = np.arange(inicio, fim)
+        quantidade = len(numeros)
+        chaves = [f"{self.prefixo}{numero:010d}" for numero in numeros.tolist()]
+        campo_data = MODULOS[modulo]['campo_data']
+        datas = self.sortear_datas(rnd, numeros, total) if campo_data else None
+
+        if modulo == 'financeiro':
+            receitas = rnd.random(quantidade) < PROPORCAO_RECEITAS
+            contas = {tipo: np.array([conta for conta, _ in opcoes], dtype=object) for tipo, opcoes in CONTAS.items()}
+            conta = np.where(
+                receitas,
+                contas['RECEITA'][rnd.choice(len(contas['RECEITA']), quantidade,
+                                             p=probabilidades([peso for _, peso in CONTAS['RECEITA']]))],
+                contas['DESPESA'][rnd.choice(len(contas['DESPESA']), quantidade,
+                                             p=probabilidades([peso for _, peso in CONTAS['DESPESA']]))]
+            ).tolist()
+            descricao = np.where(
+                receitas,
+                np.array(DESCRICOES['RECEITA'], dtype=object)[rnd.integers(len(DESCRICOES['RECEITA']), size=quantidade)],
+                np.array(DESCRICOES['DESPESA'], dtype=object)[rnd.integers(len(DESCRICOES['DESPESA']), size=quantidade)]
+            ).tolist()
+            valor = np.where(receitas, valores(rnd, 1200, 1.1, quantidade), valores(rnd, 800, 1.2, quantidade))
+            return [
+                {"identificador": c, "data": d, "valor": v, "tipo": "RECEITA" if r else "DESPESA", "conta": k,
+                 "descricao": h}
+                for c, d, v, r, k, h in zip(chaves, datas, valor.tolist(), receitas.tolist(), conta, descricao)
+            ]
+
+        if modulo == 'contabil':
+            partidas = rnd.choice(len(PARTIDAS), quantidade, p=probabilidades([p[3] for p in PARTIDAS])).tolist()
+            return [
+                {"identificador": c, "data": d, "valor": v, "debito": PARTIDAS[p][0], "credito": PARTIDAS[p][1],
+                 "historico": PARTIDAS[p][2]}
+                for c, d, v, p in zip(chaves, datas, valores(rnd, 1000, 1.2, quantidade).tolist(), partidas)
+            ]
+
+        if modulo in ('fiscal', 'vendas', 'compras'):
+            itens, totais = self.sortear_itens(rnd, quantidade)
+            if modulo == 'compras':
+                fornecedores = rnd.choice(FORNECEDORES, quantidade, p=self.pesos_fornecedores).tolist()
+                return [
+                    {"numero": c, "data": d, "fornecedor": self.fornecedores[f], "itens": i}
+                    for c, d, f, i in zip(chaves, datas, fornecedores, itens)
+                ]
+            clientes = rnd.choice(CLIENTES, quantidade, p=self.pesos_clientes).tolist()
+            if modulo == 'vendas':
+                return [
+                    {"numero": c, "data": d, "cliente": self.clientes[k], "itens": i}
+                    for c, d, k, i in zip(chaves, datas, clientes, itens)
+                ]
+            return [
+                {"numero": c, "data": d, "valor": v, "cliente": self.clientes[k], "itens": i}
+                for c, d, v, k, i in zip(chaves, datas, totais, clientes, itens)
+            ]
+
+        if modulo == 'rh':
+            cargos = rnd.choice(len(CARGOS), quantidade, p=probabilidades([c[2] for c in CARGOS]))
+            medianas = np.array([c[1] for c in CARGOS], dtype=float)[cargos]
+            salarios = np.round(medianas * rnd.lognormal(0, 0.25, quantidade), 2)
+            documentos = cpfs((numeros * MULTIPLICADOR_CPF + self.deslocamento_cpf) % 10 ** 9)
+            return [
+                {"matricula": c, "nome": f"Funcionário {c}", "cpf": f, "cargo": CARGOS[k][0], "salario": s,
+                 "dataAdmissao": d}
+                for c, f, k, s, d in zip(chaves, documentos, cargos.tolist(), salarios.tolist(), datas)
+            ]
+
+        if modulo == 'estoque':
+            unidades = rnd.choice(len(UNIDADES), quantidade, p=probabilidades([u[1] for u in UNIDADES])).tolist()
+            return [
+                {"codigo": c, "descricao": f"Produto {c}", "unidade": UNIDADES[u][0], "preco": p}
+                for c, u, p in zip(chaves, unidades, valores(rnd, 40, 1.2, quantidade).tolist())
+            ]
+
+        if modulo == 'patrimonio':
+            bens = rnd.integers(len(BENS), size=quantidade).tolist()
+            return [
+                {"codigo": c, "descricao": BENS[b], "valor": v, "dataAquisicao": d}
+                for c, b, v, d in zip(chaves, bens, valores(rnd, 3000, 1.0, quantidade, 100).tolist(), datas)
+            ]
+
+        raise ValueError(f"Módulo desconhecido: {modulo}")
+
+    def lotes(self, modulo, quantidade, tamanho=TAMANHO_LOTE):
+        """Gera os quantidade registros de um módulo, um lote (lista de dicts) por vez"""
+        for numero_lote in range((quantidade + tamanho - 1) // tamanho):
+            yield self.lote(modulo, numero_lote, tamanho, quantidade)
+
+
+def carregar_simulacao(nasajon, modulo, lotes):
+    """Grava os lotes em uma SimulacaoNasajon; retorna (criados, erros)"""
+    criados = erros = 0
+    for lote in lotes:
+        resultado = nasajon.criar_lote(modulo, lote)
+        criados += resultado['criados']
+        erros += resultado['erros']
+    return criados, erros
+
+
+def enviar_api(cliente, modulo, lotes):
+    """Envia os lotes às rotas /batch da API por um ClienteNasajon; retorna (criados, erros)"""
+    criados = erros = 0
+    for lote in lotes:
+        corpo, status_code = cliente.criar_lote(modulo, lote)
+        if isinstance(corpo, dict) and 'criados' in corpo:
+            criados += corpo['criados']
+            erros += corpo['erros']
+        else:
+            raise RuntimeError(f"Falha ao enviar lote do módulo {modulo} ({status_code}): {corpo}")
+    return criados, erros
+
+
+def gravar_ndjson(diretorio, modulo, lotes):
+    """Grava os lotes em <diretorio>/<modulo>_sintetico.ndjson; retorna (registros, 0)"""
+    os.makedirs(diretorio, exist_ok=True)
+    gravados = 0
+    with open(os.path.join(diretorio, f"{modulo}_sintetico.ndjson"), 'wb') as arquivo:
+        for lote in lotes:
+            arquivo.write(b'\n'.join(map(serializacao.dumps, lote)) + b'\n')
+            gravados += len(lote)
+    return gravados, 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerador de dados sintéticos dos módulos Nasajon")
+    parser.add_argument('--registros', type=int, default=100000, help="Registros por módulo")
+    parser.add_argument('--modulos', nargs='+', choices=list(MODULOS), default=list(MODULOS))
+    parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help="Registros por lote")
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--datas-aleatorias', action='store_true',
+                        help="Sorteia as datas em vez de gerá-las em ordem crescente")
+    parser.add_argument('--destino', choices=['simulacao', 'api', 'ndjson', 'nenhum'], default='simulacao',
+                        help="Para onde vão os registros ('nenhum' mede só a geração)")
+    parser.add_argument('--url', default="http://localhost:5000/api", help="URL da API (destino api)")
+    parser.add_argument('--formato', choices=['json', 'msgpack'], default='json',
+                        help="Formato dos corpos enviados à API")
+    parser.add_argument('--saida', default='dados_sinteticos', help="Diretório dos arquivos (destino ndjson)")
+    args = parser.parse_args()
+
+    gerador = GeradorDados(args.semente, em_ordem=not args.datas_aleatorias)
+    nasajon = cliente = None
+    if args.destino == 'simulacao':
+        from simulacao_local import SimulacaoNasajon
+        nasajon = SimulacaoNasajon(silencioso=True, formato_notas='segmentos')
+    elif args.destino == 'api':
+        from cliente_nasajon import ClienteNasajon
+        cliente = ClienteNasajon(args.url, os.environ.get("NASAJON_API_KEY", "api_key_simulada"),
+                                 formato=args.formato)
+
+    try:
+        for modulo in args.modulos:
+            lotes = gerador.lotes(modulo, args.registros, args.lote)
+            inicio = time.perf_counter()
+            if nasajon:
+                criados, erros = carregar_simulacao(nasajon, modulo, lotes)
+            elif cliente:
+                criados, erros = enviar_api(cliente, modulo, lotes)
+            elif args.destino == 'ndjson':
+                criados, erros = gravar_ndjson(args.saida, modulo, lotes)
+            else:
+                criados, erros = sum(len(lote) for lote in lotes), 0
+            decorrido = time.perf_counter() - inicio
+            print(f"{modulo:<12}{criados:>10} registros{erros:>8} erros{criados / decorrido * 60:>14,.0f} reg/min")
+    finally:
+        if nasajon:
+            nasajon.encerrar()
+        if cliente:
+            cliente.fechar()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+Gravação dos arquivos das notas fiscais em segundo plano, usada pela simulação local
+"""
+import atexit
+import glob
+import os
+import queue
+import threading
+
+import serializacao
+
+FORMATOS = ('arquivos', 'segmentos')
+
+
+class GravadorNotas:
+    """Grava as notas fiscais por um pool de threads, em lotes
+
+    enviar() apenas coloca a nota na fila e retorna; os workers retiram até
+    max_lote notas por vez e gravam no formato escolhido:
+
+    - 'arquivos': um notas_fiscais/NF_<numero>.json por nota (o formato
+      original);
+    - 'segmentos': as notas são acrescentadas, uma por linha, a arquivos
+      segmento_<worker>_<n>.ndjson (um novo quando o atual passa de
+      max_segmento bytes), e cada lote acrescenta ao .idx do segmento as
+      linhas "numero<TAB>posição<TAB>tamanho". O índice é carregado na
+      inicialização e permite ler uma nota sem percorrer os segmentos.
+
+    A nota enviada não deve ser alterada depois; fechar() grava as notas
+    pendentes.
+    """
+
+    def __init__(self, diretorio='notas_fiscais', formato='arquivos', workers=2, max_lote=500,
+                 max_segmento=64 * 1024 * 1024, log=None):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato desconhecido: {formato}")
+        self.diretorio = diretorio
+        self.formato = formato
+        self.max_lote = max_lote
+        self.max_segmento = max_segmento
+        self.log = log or (lambda mensagem: None)
+        os.makedirs(diretorio, exist_ok=True)
+
+        # numero -> (arquivo do segmento, posição, tamanho)
+        self.indice = {}
+        self.lock = threading.Lock()
+        self.proximo_segmento = 1
+        if formato == 'segmentos':
+            self.carregar_indice()
+
+        self.fila = queue.Queue()
+        self.encerrado = False
+        self.threads = [
+            threading.Thread(target=self.executar, args=(numero,), name=f"gravador-notas-{numero}", daemon=True)
+            for numero in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+        atexit.register(self.fechar)
+
+    def enviar(self, nota_fiscal):
+        """Enfileira uma nota fiscal para gravação"""
+        self.fila.put(nota_fiscal)
+
+    def executar(self, worker):
+        """Laço de um worker: grava as notas da fila em lotes até receber None"""
+        segmento = None
+        while True:
+            lote = [self.fila.get()]
+            # Cada worker retira no máximo um None (o seu sinal de encerramento)
+            while lote[-1] is not None and len(lote) < self.max_lote:
+                try:
+                    lote.append(self.fila.get_nowait())
+                except queue.Empty:
+                    break
+
+            encerrar = lote[-1] is None
+            notas = lote[:-1] if encerrar else lote
+            try:
+                if notas:
+                    if self.formato == 'arquivos':
+                        self.gravar_arquivos(notas)
+                    else:
+                        segmento = self.gravar_segmento(worker, segmento, notas)
+            except Exception as e:
+                self.log(f"Erro ao gravar arquivos de notas fiscais: {str(e)}")
+            finally:
+                for _ in lote:
+                    self.fila.task_done()
+
+            if encerrar:
+                if segmento:
+                    segmento[0].close()
+                    segmento[1].close()
+                return
+
+    def gravar_arquivos(self, notas):
+        """Grava um arquivo JSON por nota fiscal"""
+        for nota in notas:
+            arquivo = os.path.join(self.diretorio, f"NF_{nota['numero']}.json")
+            with open(arquivo, 'wb') as f:
+                f.write(serializacao.dumps(nota, indentado=True))
+        self.log(f"{len(notas)} arquivos de notas fiscais gravados em {self.diretorio}")
+
+    def abrir_segmento(self, worker):
+        with self.lock:
+            numero = self.proximo_segmento
+            self.proximo_segmento += 1
+        base = os.path.join(self.diretorio, f"segmento_{worker:02d}_{numero:06d}")
+        return open(base + '.ndjson', 'ab'), open(base + '.idx', 'a', encoding='utf-8')
+
+    def gravar_segmento(self, worker, segmento, notas):
+        """Acrescenta as notas ao segmento do worker e atualiza o índice"""
+        if segmento is None or segmento[0].tell() >= self.max_segmento:
+            if segmento:
+                segmento[0].close()
+                segmento[1].close()
+            segmento = self.abrir_segmento(worker)
+        dados, indice = segmento
+
+        posicao = dados.tell()
+        linhas = []
+        entradas = []
+        for nota in notas:
+            linha = serializacao.dumps(nota) + b'\n'
+            linhas.append(linha)
+            entradas.append((str(nota['numero']), posicao, len(linha)))
+            posicao += len(linha)
+
+        dados.write(b''.join(linhas))
+        dados.flush()
+        # O índice só é gravado depois dos dados, então nunca aponta para uma nota incompleta
+        indice.write(''.join(f"{numero}\t{inicio}\t{tamanho}\n" for numero, inicio, tamanho in entradas))
+        indice.flush()
+
+        with self.lock:
+            for numero, inicio, tamanho in entradas:
+                self.indice[numero] = (dados.name, inicio, tamanho)
+
+        self.log(f"{len(notas)} notas fiscais gravadas em {dados.name}")
+        return segmento
+
+    def carregar_indice(self):
+        """Lê os índices dos segmentos já gravados"""
+        for arquivo_indice in sorted(glob.glob(os.path.join(self.diretorio, 'segmento_*.idx'))):
+            arquivo_dados = arquivo_indice[:-len('.idx')] + '.ndjson'
+            numero_segmento = int(os.path.basename(arquivo_indice).split('_')[2].split('.')[0])
+            self.proximo_segmento = max(self.proximo_segmento, numero_segmento + 1)
+            with open(arquivo_indice, encoding='utf-8') as f:
+                for linha in f:
+                    partes = linha[:-1].split('\t')
+                    if not linha.endswith('\n') or len(partes) != 3:
+                        continue  # linha incompleta (gravação interrompida)
+                    numero, inicio, tamanho = partes
+                    self.indice[numero] = (arquivo_dados, int(inicio), int(tamanho))
+
+    def ler(self, numero):
+        """Lê uma nota fiscal gravada, ou retorna None se ela não existir"""
+        if self.formato == 'arquivos':
+            arquivo = os.path.join(self.diretorio, f"NF_{numero}.json")
+            if not os.path.exists(arquivo):
+                return None
+            with open(arquivo, 'rb') as f:
+                return serializacao.loads(f.read())
+
+        with self.lock:
+            entrada = self.indice.get(str(numero))
+        if entrada is None:
+            return None
+        arquivo, inicio, tamanho = entrada
+        with open(arquivo, 'rb') as f:
+            f.seek(inicio)
+            return serializacao.loads(f.read(tamanho))
+
+    def descarregar(self):
+        """Aguarda a gravação de todas as notas enfileiradas"""
+        self.fila.join()
+
+    def fechar(self):
+        """Grava as notas pendentes e encerra os workers"""
+        if self.encerrado:
+            return
+        self.encerrado = True
+        for _ in self.threads:
+            self.fila.put(None)
+        for thread in self.threads:
+            thread.join()
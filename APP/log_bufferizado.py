@@ -0,0 +1,68 @@
+"""
+Log em arquivo com buffer, usado pela simulação local
+"""
+import atexit
+import threading
+import time
+
+
+class LogBufferizado:
+    """Mantém o arquivo de log aberto e grava as linhas em blocos
+
+    As linhas ficam em memória e são gravadas quando o buffer atinge
+    max_linhas, quando passam intervalo segundos desde a última gravação
+    (verificado a cada linha e por uma thread de segundo plano) e ao fechar.
+    Com silencioso=True, as linhas não são repetidas no terminal.
+    """
+
+    def __init__(self, arquivo, silencioso=False, max_linhas=1000, intervalo=1.0):
+        self.arquivo = open(arquivo, 'a', encoding='utf-8')
+        self.silencioso = silencioso
+        self.max_linhas = max_linhas
+        self.intervalo = intervalo
+        self.buffer = []
+        self.ultima_gravacao = time.monotonic()
+        self.lock = threading.Lock()
+        self.encerrado = threading.Event()
+
+        self.thread = threading.Thread(target=self.gravar_periodicamente, name="log-bufferizado", daemon=True)
+        self.thread.start()
+        atexit.register(self.fechar)
+
+    def escrever(self, linha):
+        """Adiciona uma linha ao log"""
+        if not self.silencioso:
+            print(linha)
+
+        with self.lock:
+            self.buffer.append(linha)
+            if (len(self.buffer) >= self.max_linhas
+                    or time.monotonic() - self.ultima_gravacao >= self.intervalo):
+                self._gravar()
+
+    def _gravar(self):
+        """Grava o buffer no arquivo (chamado com o lock adquirido)"""
+        if self.buffer and not self.arquivo.closed:
+            self.arquivo.write('\n'.join(self.buffer) + '\n')
+            self.arquivo.flush()
+            self.buffer = []
+        self.ultima_gravacao = time.monotonic()
+
+    def descarregar(self):
+        """Grava imediatamente as linhas pendentes"""
+        with self.lock:
+            self._gravar()
+
+    def gravar_periodicamente(self):
+        """Grava o buffer a cada intervalo, mesmo sem novas linhas"""
+        while not self.encerrado.wait(self.intervalo):
+            self.descarregar()
+
+    def fechar(self):
+        """Grava as linhas pendentes e fecha o arquivo"""
+        if self.encerrado.is_set():
+            return
+        self.encerrado.set()
+        with self.lock:
+            self._gravar()
+            self.arquivo.close()
@@ -0,0 +1,174 @@
+"""
+Métricas da API (requisições, latências, registros e memória) no formato
+de texto do Prometheus, expostas em /api/metrics
+
+Cada processo mantém as suas métricas; com vários workers (servidor.py),
+o Prometheus deve coletar cada processo ou a API deve rodar com um só.
+"""
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+from modulos import MODULOS
+
+try:
+    import resource
+except ImportError:  # indisponível no Windows
+    resource = None
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Limites (em segundos) das faixas do histograma de latência
+FAIXAS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Rótulo das requisições que não correspondem a nenhuma rota
+ROTA_DESCONHECIDA = 'desconhecida'
+
+
+def rotulos(**valores):
+    """Rótulos no formato do Prometheus, com os valores escapados"""
+    partes = []
+    for nome, valor in valores.items():
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        partes.append(f'{nome}="{valor}"')
+    return '{' + ','.join(partes) + '}'
+
+
+def memoria_residente():
+    """Memória residente atual do processo em bytes (None se não for possível ler)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def memoria_pico():
+    """Maior memória residente do processo em bytes (None se não for possível ler)"""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss está em bytes no macOS e em KiB nos demais sistemas
+    return pico if sys.platform == 'darwin' else pico * 1024
+
+
+class Metricas:
+    """Contadores de requisições e histogramas de latência por rota
+
+    registrar() é chamado ao fim de cada requisição com o método, o modelo
+    da rota (por exemplo /api/financeiro/lancamentos/<id_registro>, para
+    não criar uma série por id), o status e a duração; o custo é de alguns
+    microssegundos. Os valores atuais (registros por módulo, memória,
+    itens em cache) são lidos apenas ao exportar.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.inicio = time.time()
+        # (metodo, rota, modulo, status) -> quantidade
+        self.requisicoes = {}
+        # (metodo, rota, modulo) -> [quantidade por faixa (a última é +Inf), soma, total]
+        self.latencias = {}
+        self.modulos_rotas = {}
+
+    def modulo_rota(self, rota):
+        """Módulo de uma rota (pelo prefixo em MODULOS), ou vazio para as rotas gerais"""
+        modulo = self.modulos_rotas.get(rota)
+        if modulo is None:
+            modulo = next(
+                (nome for nome, definicao in MODULOS.items() if rota.startswith(definicao['rota'])), ''
+            )
+            self.modulos_rotas[rota] = modulo
+        return modulo
+
+    def registrar(self, metodo, rota, status, segundos):
+        rota = rota or ROTA_DESCONHECIDA
+        modulo = self.modulo_rota(rota)
+        faixa = bisect_left(FAIXAS, segundos)
+        chave = (metodo, rota, modulo)
+        with self.lock:
+            contador = chave + (status,)
+            self.requisicoes[contador] = self.requisicoes.get(contador, 0) + 1
+            histograma = self.latencias.get(chave)
+            if histograma is None:
+                histograma = self.latencias[chave] = [[0] * (len(FAIXAS) + 1), 0.0, 0]
+            histograma[0][faixa] += 1
+            histograma[1] += segundos
+            histograma[2] += 1
+
+    def exportar(self, banco=None, caches=None):
+        """Texto no formato do Prometheus com as métricas atuais
+
+        banco: {modulo: tabela} para o número de registros por módulo;
+        caches: {nome: cache} para o número de itens (e de bytes, nos
+        limitados por tamanho) em cada cache.
+        """
+        with self.lock:
+            requisicoes = dict(self.requisicoes)
+            latencias = {chave: [list(h[0]), h[1], h[2]] for chave, h in self.latencias.items()}
+
+        linhas = [
+            "# HELP nasajon_requisicoes_total Requisições atendidas, por rota e status",
+            "# TYPE nasajon_requisicoes_total counter"
+        ]
+        for (metodo, rota, modulo, status), quantidade in sorted(requisicoes.items()):
+            linhas.append(
+                f"nasajon_requisicoes_total{rotulos(metodo=metodo, rota=rota, modulo=modulo, status=status)} "
+                f"{quantidade}"
+            )
+
+        linhas += [
+            "# HELP nasajon_requisicao_segundos Duração das requisições, por rota",
+            "# TYPE nasajon_requisicao_segundos histogram"
+        ]
+        for (metodo, rota, modulo), (faixas, soma, total) in sorted(latencias.items()):
+            acumulado = 0
+            for limite, quantidade in zip(FAIXAS + ('+Inf',), faixas):
+                acumulado += quantidade
+                linhas.append(
+                    f"nasajon_requisicao_segundos_bucket"
+                    f"{rotulos(metodo=metodo, rota=rota, modulo=modulo, le=limite)} {acumulado}"
+                )
+            base = rotulos(metodo=metodo, rota=rota, modulo=modulo)
+            linhas.append(f"nasajon_requisicao_segundos_sum{base} {soma}")
+            linhas.append(f"nasajon_requisicao_segundos_count{base} {total}")
+
+        if banco is not None:
+            linhas += [
+                "# HELP nasajon_registros Registros em memória, por módulo",
+                "# TYPE nasajon_registros gauge"
+            ]
+            for modulo, tabela in banco.items():
+                linhas.append(f"nasajon_registros{rotulos(modulo=modulo)} {len(tabela)}")
+
+        if caches:
+            linhas += [
+                "# HELP nasajon_cache_itens Itens em cada cache de respostas",
+                "# TYPE nasajon_cache_itens gauge"
+            ]
+            for nome, cache in caches.items():
+                linhas.append(f"nasajon_cache_itens{rotulos(cache=nome)} {len(cache)}")
+            limitados = {nome: cache for nome, cache in caches.items() if cache.tamanho is not None}
+            if limitados:
+                linhas += [
+                    "# HELP nasajon_cache_bytes Bytes dos corpos guardados em cada cache de respostas",
+                    "# TYPE nasajon_cache_bytes gauge"
+                ]
+                for nome, cache in limitados.items():
+                    linhas.append(f"nasajon_cache_bytes{rotulos(cache=nome)} {cache.bytes}")
+
+        for nome, descricao, valor in (
+            ("nasajon_memoria_residente_bytes", "Memória residente atual do processo", memoria_residente()),
+            ("nasajon_memoria_pico_bytes", "Maior memória residente do processo", memoria_pico())
+        ):
+            if valor is not None:
+                linhas += [f"# HELP {nome} {descricao}", f"# TYPE {nome} gauge", f"{nome} {valor}"]
+
+        linhas += [
+            "# HELP nasajon_inicio_segundos Início do processo (segundos desde 1970)",
+            "# TYPE nasajon_inicio_segundos gauge",
+            f"nasajon_inicio_segundos {self.inicio}"
+        ]
+        return '\n'.join(linhas) + '\n'
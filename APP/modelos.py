@@ -0,0 +1,184 @@
+"""
+Classes compactas (com __slots__) dos registros guardados nas tabelas
+
+Cada registro ocupa um objeto com um campo por atributo em vez de um dict.
+O id é guardado como os 16 bytes do UUID e o timestamp como inteiro
+(microssegundos desde 1970-01-01, sem fuso, como o datetime.now() da API).
+A conversão para o formato JSON (id em texto e timestamp ISO) é feita só
+na saída, por como_dict().
+"""
+import uuid
+from datetime import datetime, timedelta
+
+EPOCA = datetime(1970, 1, 1)
+MICROSSEGUNDO = timedelta(microseconds=1)
+
+# Marca de campo ausente (None é um valor válido)
+_AUSENTE = object()
+
+
+def id_para_bytes(valor):
+    """UUID em texto -> 16 bytes (valores que não voltariam idênticos ao texto são mantidos)"""
+    # Caso comum (uuid4 da API, minúsculo e com hífens): convertido sem criar um uuid.UUID
+    if (isinstance(valor, str) and len(valor) == 36 and valor.islower()
+            and valor[8] == valor[13] == valor[18] == valor[23] == '-'):
+        try:
+            dados = bytes.fromhex(valor.replace('-', ''))
+        except ValueError:
+            dados = None
+        if dados is not None and len(dados) == 16:
+            return dados
+    try:
+        convertido = uuid.UUID(valor)
+    except (TypeError, ValueError, AttributeError):
+        return valor
+    return convertido.bytes if str(convertido) == valor else valor
+
+
+def id_para_texto(valor):
+    if isinstance(valor, bytes):
+        return str(uuid.UUID(bytes=valor))
+    return valor
+
+
+def timestamp_para_inteiro(valor):
+    """Timestamp ISO -> microssegundos desde a época (valores que não voltariam idênticos são mantidos)"""
+    try:
+        instante = datetime.fromisoformat(valor)
+        convertido = (instante - EPOCA) // MICROSSEGUNDO
+    except (TypeError, ValueError):
+        return valor
+    # Caso comum (datetime.now().isoformat() da API, com microssegundos e sem
+    # fuso): fromisoformat só aceita esse formato nessas posições, então o
+    # texto voltaria idêntico sem precisar formatar
+    if (len(valor) == 26 and valor[4] == valor[7] == '-' and valor[10] == 'T' and valor[19] == '.'
+            and instante.tzinfo is None and instante.microsecond):
+        return convertido
+    return convertido if instante.isoformat() == valor else valor
+
+
+def timestamp_para_texto(valor):
+    if isinstance(valor, int):
+        return (EPOCA + valor * MICROSSEGUNDO).isoformat()
+    return valor
+
+
+class Registro:
+    """Registro genérico: id, timestamp e os campos do módulo
+
+    As subclasses declaram os campos conhecidos do módulo em CAMPOS (e em
+    __slots__); campos desconhecidos enviados pelo cliente ficam em extras.
+    Os campos ausentes no registro original não são preenchidos, e get()
+    e como_dict() os tratam como ausentes.
+
+    Para o restante do código, o registro se comporta como um dict somente
+    leitura (get, [], in, keys).
+    """
+
+    __slots__ = ('_id', '_timestamp', 'extras')
+    CAMPOS = ()
+
+    @classmethod
+    def de_dict(cls, dados):
+        registro = cls()
+        extras = None
+        for campo, valor in dados.items():
+            if campo == 'id':
+                registro._id = id_para_bytes(valor)
+            elif campo == 'timestamp':
+                registro._timestamp = timestamp_para_inteiro(valor)
+            elif campo in cls.CAMPOS:
+                setattr(registro, campo, valor)
+            else:
+                if extras is None:
+                    extras = {}
+                extras[campo] = valor
+        registro.extras = extras
+        return registro
+
+    def get(self, campo, padrao=None):
+        if campo == 'id':
+            valor = getattr(self, '_id', padrao)
+            return id_para_texto(valor)
+        if campo == 'timestamp':
+            return timestamp_para_texto(getattr(self, '_timestamp', padrao))
+        if campo in self.CAMPOS:
+            return getattr(self, campo, padrao)
+        if self.extras:
+            return self.extras.get(campo, padrao)
+        return padrao
+
+    def __getitem__(self, campo):
+        valor = self.get(campo, _AUSENTE)
+        if valor is _AUSENTE:
+            raise KeyError(campo)
+        return valor
+
+    def __contains__(self, campo):
+        return self.get(campo, _AUSENTE) is not _AUSENTE
+
+    def keys(self):
+        return self.como_dict().keys()
+
+    def como_dict(self):
+        """Registro no formato JSON da API"""
+        dados = {}
+        for campo in self.CAMPOS:
+            valor = getattr(self, campo, _AUSENTE)
+            if valor is not _AUSENTE:
+                dados[campo] = valor
+        if self.extras:
+            dados.update(self.extras)
+        if hasattr(self, '_id'):
+            dados['id'] = id_para_texto(self._id)
+        if hasattr(self, '_timestamp'):
+            dados['timestamp'] = timestamp_para_texto(self._timestamp)
+        return dados
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.como_dict()!r})"
+
+
+class LancamentoFinanceiro(Registro):
+    __slots__ = CAMPOS = ('identificador', 'data', 'valor', 'tipo', 'conta', 'descricao')
+
+
+class LancamentoContabil(Registro):
+    __slots__ = CAMPOS = ('identificador', 'data', 'valor', 'debito', 'credito', 'historico')
+
+
+class NotaFiscal(Registro):
+    __slots__ = CAMPOS = ('numero', 'data', 'valor', 'cliente', 'itens')
+
+
+class Funcionario(Registro):
+    __slots__ = CAMPOS = ('matricula', 'nome', 'cpf', 'cargo', 'salario', 'dataAdmissao')
+
+
+class PedidoCompra(Registro):
+    __slots__ = CAMPOS = ('numero', 'data', 'fornecedor', 'itens')
+
+
+class PedidoVenda(Registro):
+    __slots__ = CAMPOS = ('numero', 'data', 'cliente', 'itens')
+
+
+class Produto(Registro):
+    __slots__ = CAMPOS = ('codigo', 'descricao', 'unidade', 'preco')
+
+
+class BemPatrimonial(Registro):
+    __slots__ = CAMPOS = ('codigo', 'descricao', 'valor', 'dataAquisicao')
+
+
+# Classe dos registros de cada módulo
+MODELOS = {
+    'financeiro': LancamentoFinanceiro,
+    'contabil': LancamentoContabil,
+    'fiscal': NotaFiscal,
+    'rh': Funcionario,
+    'compras': PedidoCompra,
+    'vendas': PedidoVenda,
+    'estoque': Produto,
+    'patrimonio': BemPatrimonial
+}
@@ -0,0 +1,111 @@
+"""
+Definição dos módulos do Nasajon compartilhada pela API e pela simulação local
+"""
+
+# Para cada módulo:
+# - rota: rota base da API
+# - chaves: chaves naturais (únicas) do módulo
+# - campo_data: campo usado nos filtros e no índice por data
+# - filtros: campos aceitos como filtro de igualdade na listagem
+# - campo_valor: campo numérico somado nos agregados do relatório ('itens'
+#   soma quantidade x valorUnitario dos itens do registro)
+# - agrupamentos: campos com agregados separados por valor no relatório
+# - mensagem, log, campo_log e acao: textos da resposta e do log de criação
+MODULOS = {
+    'financeiro': {
+        'rota': '/api/financeiro/lancamentos',
+        'chaves': ['identificador'],
+        'campo_data': 'data',
+        'filtros': ['tipo', 'conta'],
+        'campo_valor': 'valor',
+        'agrupamentos': ['tipo', 'conta'],
+        'mensagem': "Lançamento financeiro criado com sucesso",
+        'log': "Lançamento financeiro criado",
+        'campo_log': 'identificador',
+        'acao': "criar lançamento financeiro"
+    },
+    'contabil': {
+        'rota': '/api/contabil/lancamentos',
+        'chaves': ['identificador'],
+        'campo_data': 'data',
+        'filtros': ['debito', 'credito'],
+        'campo_valor': 'valor',
+        'agrupamentos': ['debito', 'credito'],
+        'mensagem': "Lançamento contábil criado com sucesso",
+        'log': "Lançamento contábil criado",
+        'campo_log': 'identificador',
+        'acao': "criar lançamento contábil"
+    },
+    'fiscal': {
+        'rota': '/api/fiscal/notas-fiscais',
+        'chaves': ['numero'],
+        'campo_data': 'data',
+        'filtros': [],
+        'campo_valor': 'valor',
+        'agrupamentos': [],
+        'mensagem': "Nota fiscal emitida com sucesso",
+        'log': "Nota fiscal emitida",
+        'campo_log': 'numero',
+        'acao': "emitir nota fiscal"
+    },
+    'rh': {
+        'rota': '/api/rh/funcionarios',
+        'chaves': ['matricula', 'cpf'],
+        'campo_data': 'dataAdmissao',
+        'filtros': ['cargo'],
+        'campo_valor': 'salario',
+        'agrupamentos': ['cargo'],
+        'mensagem': "Funcionário cadastrado com sucesso",
+        'log': "Funcionário cadastrado",
+        'campo_log': 'nome',
+        'acao': "cadastrar funcionário"
+    },
+    'compras': {
+        'rota': '/api/compras/pedidos',
+        'chaves': ['numero'],
+        'campo_data': 'data',
+        'filtros': [],
+        'campo_valor': 'itens',
+        'agrupamentos': [],
+        'mensagem': "Pedido de compra criado com sucesso",
+        'log': "Pedido de compra criado",
+        'campo_log': 'numero',
+        'acao': "criar pedido de compra"
+    },
+    'vendas': {
+        'rota': '/api/vendas/pedidos',
+        'chaves': ['numero'],
+        'campo_data': 'data',
+        'filtros': [],
+        'campo_valor': 'itens',
+        'agrupamentos': [],
+        'mensagem': "Pedido de venda criado com sucesso",
+        'log': "Pedido de venda criado",
+        'campo_log': 'numero',
+        'acao': "criar pedido de venda"
+    },
+    'estoque': {
+        'rota': '/api/estoque/produtos',
+        'chaves': ['codigo'],
+        'campo_data': None,
+        'filtros': ['unidade'],
+        'campo_valor': 'preco',
+        'agrupamentos': ['unidade'],
+        'mensagem': "Produto cadastrado com sucesso",
+        'log': "Produto cadastrado",
+        'campo_log': 'codigo',
+        'acao': "cadastrar produto"
+    },
+    'patrimonio': {
+        'rota': '/api/patrimonio/bens',
+        'chaves': ['codigo'],
+        'campo_data': 'dataAquisicao',
+        'filtros': [],
+        'campo_valor': 'valor',
+        'agrupamentos': [],
+        'mensagem': "Bem patrimonial cadastrado com sucesso",
+        'log': "Bem patrimonial cadastrado",
+        'campo_log': 'codigo',
+        'acao': "cadastrar bem patrimonial"
+    }
+}
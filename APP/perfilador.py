@@ -0,0 +1,236 @@
+"""
+Perfil sob demanda de requisições da API e de fases da simulação
+
+Dois modos, ambos gravando pilhas no formato "folded" (uma linha por pilha,
+"raiz;...;folha peso"), aceito pelo flamegraph.pl, pelo speedscope e pelo
+inferno:
+
+- amostragem: uma thread lê a pilha da thread medida a cada intervalo
+  (sys._current_frames); o peso é o número de amostras. Custo baixo,
+  adequado para requisições reais.
+- deterministico: sys.setprofile registra cada chamada e retorno da
+  thread medida; o peso é o tempo próprio da pilha em microssegundos.
+  Exato, mas deixa o código bem mais lento.
+
+Os arquivos são gravados em logs/perfis/. Em ambos os modos só a thread
+que iniciou o perfil é observada; no servidor assíncrono (app_async.py)
+ela é a do loop de eventos, então as requisições simultâneas aparecem
+juntas no mesmo perfil.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+MODOS = ('amostragem', 'deterministico')
+DIRETORIO = os.path.join('logs', 'perfis')
+
+# Intervalo entre as amostras, em segundos
+INTERVALO = 0.001
+
+
+def nome_quadro(codigo):
+    """Nome de uma função na pilha: arquivo:função"""
+    nome = getattr(codigo, 'co_qualname', codigo.co_name)
+    return f"{os.path.basename(codigo.co_filename)}:{nome}"
+
+
+def nome_funcao_c(funcao):
+    """Nome de uma função em C (chamada registrada por sys.setprofile)"""
+    modulo = getattr(funcao, '__module__', None) or type(getattr(funcao, '__self__', None)).__name__
+    return f"{modulo}:{getattr(funcao, '__qualname__', repr(funcao))}"
+
+
+class Amostrador:
+    """Perfil por amostragem da pilha de uma thread"""
+
+    def __init__(self, thread_id=None, intervalo=INTERVALO):
+        self.thread_id = thread_id or threading.get_ident()
+        self.intervalo = intervalo
+        self.pilhas = Counter()
+        self.parar_evento = threading.Event()
+        self.thread = threading.Thread(target=self.executar, name='perfilador', daemon=True)
+        # Códigos -> nomes, para não formatar o mesmo quadro a cada amostra
+        self.nomes = {}
+
+    def iniciar(self):
+        self.thread.start()
+
+    def parar(self):
+        self.parar_evento.set()
+        self.thread.join()
+        return self.pilhas
+
+    def executar(self):
+        while not self.parar_evento.wait(self.intervalo):
+            quadro = sys._current_frames().get(self.thread_id)
+            if quadro is None:
+                break
+            nomes = []
+            while quadro is not None:
+                codigo = quadro.f_code
+                nome = self.nomes.get(codigo)
+                if nome is None:
+                    nome = self.nomes[codigo] = nome_quadro(codigo)
+                nomes.append(nome)
+                quadro = quadro.f_back
+            self.pilhas[tuple(reversed(nomes))] += 1
+
+
+class Rastreador:
+    """Perfil determinístico: tempo próprio de cada pilha, via sys.setprofile
+
+    A pilha começa com as funções em execução no início do perfil (como na
+    amostragem), para que os perfis dos dois modos tenham as mesmas raízes.
+    """
+
+    def __init__(self):
+        self.pilha = []
+        self.pilhas = Counter()
+        self.nomes = {}
+        self.ultimo = 0
+
+    def iniciar(self):
+        quadro = sys._getframe()
+        while quadro is not None:
+            self.pilha.append(nome_quadro(quadro.f_code))
+            quadro = quadro.f_back
+        self.pilha.reverse()
+        self.ultimo = time.perf_counter_ns()
+        sys.setprofile(self.evento)
+
+    def parar(self):
+        sys.setprofile(None)
+        self.acumular(time.perf_counter_ns())
+        # Os pesos são gravados em microssegundos
+        return Counter({pilha: ns // 1000 for pilha, ns in self.pilhas.items() if ns >= 1000})
+
+    def acumular(self, agora):
+        if self.pilha:
+            self.pilhas[tuple(self.pilha)] += agora - self.ultimo
+
+    def evento(self, quadro, evento, argumento):
+        agora = time.perf_counter_ns()
+        self.acumular(agora)
+        if evento == 'call':
+            codigo = quadro.f_code
+            nome = self.nomes.get(codigo)
+            if nome is None:
+                nome = self.nomes[codigo] = nome_quadro(codigo)
+            self.pilha.append(nome)
+        elif evento == 'c_call':
+            self.pilha.append(nome_funcao_c(argumento))
+        elif self.pilha:  # return, c_return, c_exception
+            self.pilha.pop()
+        # O tempo gasto aqui não é atribuído a nenhuma pilha
+        self.ultimo = time.perf_counter_ns()
+
+
+def nome_arquivo(nome):
+    """Nome de arquivo seguro a partir do nome do perfil (rota, fase...)"""
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', nome).strip('_') or 'perfil'
+
+
+def gravar_pilhas(pilhas, nome, diretorio=DIRETORIO):
+    """Grava as pilhas no formato folded e retorna o caminho do arquivo"""
+    os.makedirs(diretorio, exist_ok=True)
+    arquivo = os.path.join(
+        diretorio, f"{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}_{nome_arquivo(nome)}.folded"
+    )
+    with open(arquivo, 'w', encoding='utf-8') as f:
+        for pilha, peso in sorted(pilhas.items()):
+            # ";" e espaços separam quadros e peso no formato folded
+            f.write(';'.join(quadro.replace(';', ':').replace(' ', '_') for quadro in pilha))
+            f.write(f" {peso}\n")
+    return arquivo
+
+
+class Perfil:
+    """Mede o tempo de parede e de CPU de um trecho e, com um modo, grava o seu perfil
+
+    cpu é o relógio de CPU usado: time.thread_time (padrão) mede apenas a
+    thread atual, como uma requisição; time.process_time inclui as threads
+    de apoio (log, notas fiscais), como nas fases da simulação.
+    """
+
+    def __init__(self, nome, modo=None, diretorio=DIRETORIO, cpu=time.thread_time, intervalo=INTERVALO):
+        if modo is not None and modo not in MODOS:
+            raise ValueError(f"Modo de perfil inválido: {modo} (use {', '.join(MODOS)})")
+        self.nome = nome
+        self.modo = modo
+        self.diretorio = diretorio
+        self.cpu = cpu
+        self.intervalo = intervalo
+        self.perfilador = None
+        self.resultado = None
+
+    def iniciar(self):
+        if self.modo == 'amostragem':
+            self.perfilador = Amostrador(intervalo=self.intervalo)
+        elif self.modo == 'deterministico':
+            self.perfilador = Rastreador()
+        self.inicio_cpu = self.cpu()
+        self.inicio = time.perf_counter()
+        if self.perfilador is not None:
+            self.perfilador.iniciar()
+        return self
+
+    def parar(self):
+        """Encerra a medida; retorna {nome, parede_s, cpu_s, modo, arquivo}"""
+        pilhas = self.perfilador.parar() if self.perfilador is not None else None
+        parede = time.perf_counter() - self.inicio
+        cpu = self.cpu() - self.inicio_cpu
+        self.resultado = {
+            "nome": self.nome,
+            "parede_s": round(parede, 6),
+            "cpu_s": round(cpu, 6),
+            "modo": self.modo,
+            "arquivo": gravar_pilhas(pilhas, self.nome, self.diretorio) if pilhas else None
+        }
+        return self.resultado
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *excecao):
+        self.parar()
+        return False
+
+
+class Fases:
+    """Tempos das fases de uma execução, com perfil das fases selecionadas
+
+    Todas as fases têm os tempos de parede e de CPU medidos; com um modo,
+    as fases em selecionadas (ou todas, se vazio) também têm o perfil
+    gravado.
+    """
+
+    def __init__(self, modo=None, selecionadas=None, diretorio=DIRETORIO):
+        self.modo = modo
+        self.selecionadas = set(selecionadas or ())
+        self.diretorio = diretorio
+        self.resultados = []
+
+    @contextmanager
+    def fase(self, nome):
+        modo = self.modo if not self.selecionadas or nome in self.selecionadas else None
+        perfil = Perfil(nome, modo, self.diretorio, cpu=time.process_time)
+        try:
+            with perfil:
+                yield perfil
+        finally:
+            self.resultados.append(perfil.resultado)
+
+    def relatorio(self):
+        return {
+            "modo": self.modo,
+            "fases": self.resultados,
+            "total": {
+                "parede_s": round(sum(fase["parede_s"] for fase in self.resultados), 6),
+                "cpu_s": round(sum(fase["cpu_s"] for fase in self.resultados), 6)
+            }
+        }
@@ -0,0 +1,283 @@
+"""
+Armazenamento em memória dos registros com índices secundários
+"""
+import gc
+from bisect import bisect_left, bisect_right
+
+import serializacao
+from agregados import criar_agregados
+from analitico import criar_colunas
+from modelos import MODELOS, Registro
+from modulos import MODULOS
+
+
+# Registros serializados guardados por tabela e formato; ao passar do limite, o cache é esvaziado
+MAXIMO_CACHE_SERIALIZADOS = 100000
+
+
+class RegistroDuplicado(ValueError):
+    """Erro lançado quando uma chave única já existe na tabela"""
+
+
+class TabelaIndexada:
+    """Lista de registros com índices por id, chaves naturais e data
+
+    Os registros são mantidos na ordem de inserção (a posição de um registro
+    nunca muda). Os índices de hash garantem busca e detecção de duplicados
+    em tempo constante, e o índice ordenado por data permite consultas por
+    período em O(log n). Se houver um motor de armazenamento, cada inserção
+    é gravada nele antes de entrar na tabela.
+
+    Com ordem_do_motor (vários processos sobre um motor compartilhado), os
+    registros gravados por este processo não são indexados na inserção:
+    entram pela sincronização, junto com os dos outros processos, na ordem
+    em que o motor os gravou. Assim todos os processos têm cada registro na
+    mesma posição, e o cursor das listagens vale em qualquer um deles.
+
+    Se houver agregados (ver agregados.py) ou colunas analíticas (ver
+    analitico.py), eles são atualizados a cada registro indexado.
+
+    Os registros recebidos como dict são guardados como objetos da classe
+    modelo (ver modelos.py), que ocupam bem menos memória; para voltar ao
+    formato JSON, use registro.como_dict().
+
+    versao é incrementada a cada registro indexado e identifica o estado
+    da tabela (usada no cache de respostas e nas ETags da API). Como os
+    registros não mudam depois de indexados, registro_serializado() guarda
+    cada registro já serializado (em JSON ou MessagePack) para as próximas
+    respostas.
+    """
+
+    def __init__(self, chaves=(), campo_data=None, modulo=None, motor=None, agregados=None, colunas=None,
+                 modelo=Registro, ordem_do_motor=False):
+        self.modulo = modulo
+        self.motor = motor
+        self.ordem_do_motor = ordem_do_motor and motor is not None
+        self.modelo = modelo
+        self.agregados = agregados
+        self.colunas = colunas
+        self.registros = []
+        self.versao = 0
+        self.chaves = ['id'] + list(chaves)
+        self.campo_data = campo_data
+        # Índices de hash: campo -> {valor: posição}
+        self.indices = {campo: {} for campo in self.chaves}
+        # Índice ordenado por data: listas paralelas (data, posição)
+        self._datas = []
+        self._posicoes_data = []
+        # tipo (serializacao.JSON ou MSGPACK) -> {posição: registro serializado}
+        self.serializados = {}
+
+    def __len__(self):
+        return len(self.registros)
+
+    def __iter__(self):
+        return iter(self.registros)
+
+    def __getitem__(self, posicao):
+        return self.registros[posicao]
+
+    def verificar_duplicado(self, registro):
+        """Retorna a mensagem de erro se alguma chave única já existir"""
+        for campo in self.chaves:
+            valor = registro.get(campo)
+            if valor is not None and str(valor) in self.indices[campo]:
+                return f"Registro duplicado: {campo}={valor}"
+        return None
+
+    def inserir(self, registro):
+        """Insere um registro, garantindo a unicidade das chaves"""
+        erro = self.verificar_duplicado(registro)
+        if erro:
+            raise RegistroDuplicado(erro)
+
+        if self.motor:
+            self.motor.gravar(self.modulo, [registro])
+        if self.ordem_do_motor:
+            self.sincronizar()
+            return self.posicao('id', registro.get('id'))
+        return self.indexar(registro)
+
+    def inserir_varios(self, registros):
+        """Insere uma lista de registros em uma única gravação no motor
+
+        Retorna, para cada registro, None se foi inserido ou a mensagem de
+        erro se alguma chave única já existia (na tabela ou no próprio lote).
+        """
+        erros = []
+        aceitos = []
+        pendentes = {campo: set() for campo in self.chaves}
+
+        for registro in registros:
+            erro = self.verificar_duplicado(registro)
+            if not erro:
+                for campo in self.chaves:
+                    valor = registro.get(campo)
+                    if valor is not None and str(valor) in pendentes[campo]:
+                        erro = f"Registro duplicado: {campo}={valor}"
+                        break
+            erros.append(erro)
+            if erro:
+                continue
+
+            for campo in self.chaves:
+                valor = registro.get(campo)
+                if valor is not None:
+                    pendentes[campo].add(str(valor))
+            aceitos.append(registro)
+
+        if self.motor:
+            self.motor.gravar(self.modulo, aceitos)
+        if self.ordem_do_motor:
+            self.sincronizar()
+        else:
+            for registro in aceitos:
+                self.indexar(registro)
+
+        return erros
+
+    def indexar(self, registro, indice_data=True):
+        """Adiciona um registro à tabela e aos índices, sem gravar no motor
+
+        Com indice_data=False o índice por data não é atualizado (usado na
+        carga, que o reconstrói de uma vez no final).
+        """
+        posicao = len(self.registros)
+        # Os índices e agregados usam o dict original; a tabela guarda o modelo
+        self.registros.append(registro if isinstance(registro, Registro) else self.modelo.de_dict(registro))
+
+        for campo in self.chaves:
+            valor = registro.get(campo)
+            if valor is not None:
+                self.indices[campo][str(valor)] = posicao
+
+        if self.campo_data and indice_data:
+            data = str(registro.get(self.campo_data, ''))
+            if not self._datas or data >= self._datas[-1]:
+                # Caso comum: registros chegam em ordem de data
+                self._datas.append(data)
+                self._posicoes_data.append(posicao)
+            else:
+                indice = bisect_right(self._datas, data)
+                self._datas.insert(indice, data)
+                self._posicoes_data.insert(indice, posicao)
+
+        if self.agregados:
+            self.agregados.registrar(registro)
+        if self.colunas is not None:
+            self.colunas.registrar(registro)
+
+        self.versao += 1
+        return posicao
+
+    def indexar_varios(self, registros):
+        """Adiciona vários registros de uma vez, sem gravar no motor (carga)
+
+        Mesmo resultado de indexar cada registro, mas os índices, os
+        agregados e as colunas analíticas são montados em uma passada por
+        estrutura, e o índice por data é reconstruído no final. O coletor de
+        lixo fica pausado durante a carga: os objetos criados aqui não têm
+        ciclos e ficam na tabela, então percorrê-los a cada geração é inútil.
+        """
+        registros = list(registros)
+        if not registros:
+            return
+        coletor_ativo = gc.isenabled()
+        gc.disable()
+        try:
+            inicio = len(self.registros)
+            modelo = self.modelo
+            self.registros.extend(
+                registro if isinstance(registro, Registro) else modelo.de_dict(registro) for registro in registros
+            )
+            for campo in self.chaves:
+                indice = self.indices[campo]
+                for posicao, registro in enumerate(registros, inicio):
+                    valor = registro.get(campo)
+                    if valor is not None:
+                        indice[str(valor)] = posicao
+            if self.agregados:
+                self.agregados.registrar_varios(registros)
+            if self.colunas is not None:
+                self.colunas.registrar_varios(registros)
+            self.versao += len(registros)
+            self.reconstruir_indice_data()
+        finally:
+            if coletor_ativo:
+                gc.enable()
+
+    def carregar(self):
+        """Carrega na tabela os registros já gravados no motor"""
+        if self.motor:
+            self.indexar_varios(self.motor.carregar(self.modulo))
+
+    def reconstruir_indice_data(self):
+        """Reordena o índice por data com todos os registros da tabela
+
+        Uma ordenação só custa O(n log n), enquanto inserir um a um registros
+        fora de ordem custa O(n) por registro.
+        """
+        if not self.campo_data:
+            return
+        pares = sorted(
+            (str(registro.get(self.campo_data, '')), posicao) for posicao, registro in enumerate(self.registros)
+        )
+        self._datas = [data for data, _ in pares]
+        self._posicoes_data = [posicao for _, posicao in pares]
+
+    def sincronizar(self):
+        """Indexa os registros gravados no motor que ainda não estão na tabela, na ordem do motor"""
+        if self.motor:
+            for registro in self.motor.novos(self.modulo, self.indices['id']):
+                self.indexar(registro)
+
+    def registro_serializado(self, posicao, tipo=serializacao.JSON):
+        """Registro da posição serializado no tipo informado (bytes), uma única vez"""
+        cache = self.serializados.get(tipo)
+        if cache is None:
+            cache = self.serializados[tipo] = {}
+        dados = cache.get(posicao)
+        if dados is None:
+            if len(cache) >= MAXIMO_CACHE_SERIALIZADOS:
+                cache.clear()
+            dados = cache[posicao] = serializacao.codificar(self.registros[posicao].como_dict(), tipo)
+        return dados
+
+    def posicao(self, campo, valor):
+        """Retorna a posição do registro com o valor de chave informado"""
+        return self.indices[campo].get(str(valor))
+
+    def buscar(self, campo, valor):
+        """Busca um registro por uma chave indexada"""
+        posicao = self.posicao(campo, valor)
+        return None if posicao is None else self.registros[posicao]
+
+    def posicoes_periodo(self, inicio=None, fim=None):
+        """Retorna as posições dos registros com data no período, em ordem de inserção"""
+        if not self.campo_data:
+            raise ValueError("Tabela sem índice por data")
+
+        primeiro = bisect_left(self._datas, inicio) if inicio else 0
+        ultimo = bisect_right(self._datas, fim) if fim else len(self._datas)
+        posicoes = self._posicoes_data[primeiro:ultimo]
+        posicoes.sort()
+        return posicoes
+
+
+def criar_banco(motor=None, ordem_do_motor=False):
+    """Cria o "banco de dados" em memória com uma tabela indexada por módulo
+
+    Se um motor de armazenamento for informado, as tabelas são carregadas
+    com os registros já gravados nele (ordem_do_motor: ver TabelaIndexada).
+    Cada tabela mantém os agregados do seu módulo e, no financeiro e no
+    contábil, as colunas dos relatórios analíticos.
+    """
+    banco = {}
+    for modulo, definicao in MODULOS.items():
+        tabela = TabelaIndexada(
+            definicao['chaves'], definicao['campo_data'], modulo, motor,
+            criar_agregados(modulo), criar_colunas(modulo), MODELOS[modulo], ordem_do_motor
+        )
+        tabela.carregar()
+        banco[modulo] = tabela
+    return banco
@@ -0,0 +1,135 @@
+"""
+Serialização JSON usada pela API, pela simulação local e pelas exportações
+
+Usa o orjson ou o ujson, se instalados, e o json da biblioteca padrão caso
+contrário; a variável NASAJON_JSON ("orjson", "ujson" ou "json") força um
+deles. dumps() retorna bytes em UTF-8, compactos (sem espaços) ou, com
+indentado=True, com indentação de 2 espaços (arquivos de relatório e de
+notas fiscais).
+
+A API e o cliente também aceitam MessagePack (application/msgpack), se o
+pacote msgpack estiver instalado; codificar(), decodificar() e lista()
+recebem o tipo (JSON ou MSGPACK).
+"""
+import json
+import os
+
+try:
+    import orjson
+except ImportError:  # opcional
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # opcional
+    ujson = None
+
+try:
+    import msgpack
+except ImportError:  # opcional
+    msgpack = None
+
+JSON = 'application/json'
+MSGPACK = 'application/msgpack'
+# Tipos aceitos como MessagePack no Content-Type
+TIPOS_MSGPACK = (MSGPACK, 'application/x-msgpack')
+
+
+def dumps_json(objeto, indentado=False):
+    if indentado:
+        return json.dumps(objeto, indent=2, ensure_ascii=False).encode('utf-8')
+    return json.dumps(objeto, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def dumps_orjson(objeto, indentado=False):
+    opcoes = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    if indentado:
+        opcoes |= orjson.OPT_INDENT_2
+    return orjson.dumps(objeto, option=opcoes)
+
+
+def dumps_ujson(objeto, indentado=False):
+    texto = ujson.dumps(objeto, ensure_ascii=False, escape_forward_slashes=False, indent=2 if indentado else 0)
+    return texto.encode('utf-8')
+
+
+# Serializadores disponíveis, em ordem de preferência: nome -> (dumps, loads)
+SERIALIZADORES = {}
+if orjson is not None:
+    SERIALIZADORES['orjson'] = (dumps_orjson, orjson.loads)
+if ujson is not None:
+    SERIALIZADORES['ujson'] = (dumps_ujson, ujson.loads)
+SERIALIZADORES['json'] = (dumps_json, json.loads)
+
+
+def escolher(nome=None):
+    """Retorna (nome, dumps, loads) do serializador pedido ou do preferido"""
+    if nome:
+        if nome not in SERIALIZADORES:
+            raise ValueError(f"Serializador JSON indisponível: {nome} (disponíveis: {', '.join(SERIALIZADORES)})")
+        return (nome,) + SERIALIZADORES[nome]
+    nome = next(iter(SERIALIZADORES))
+    return (nome,) + SERIALIZADORES[nome]
+
+
+NOME, dumps, loads = escolher(os.environ.get('NASAJON_JSON'))
+
+
+def converter_msgpack(objeto):
+    """Tipos sem representação direta no MessagePack (por exemplo, números do NumPy)"""
+    if hasattr(objeto, 'item'):
+        return objeto.item()
+    raise TypeError(f"Tipo não serializável: {type(objeto).__name__}")
+
+
+def tipo_base(tipo):
+    """Tipo do Content-Type sem os parâmetros (charset etc.), com MessagePack normalizado"""
+    tipo = (tipo or '').split(';', 1)[0].strip().lower()
+    return MSGPACK if tipo in TIPOS_MSGPACK else tipo
+
+
+def negociar(aceitos):
+    """Tipo da resposta pelo Accept da requisição (o MIMEAccept do werkzeug)
+
+    JSON é o padrão; MessagePack só é usado se estiver instalado e o cliente
+    o preferir explicitamente.
+    """
+    if msgpack is not None and max(aceitos.quality(tipo) for tipo in TIPOS_MSGPACK) > aceitos.quality(JSON):
+        return MSGPACK
+    return JSON
+
+
+def codificar(corpo, tipo=JSON):
+    """Corpo no tipo informado, em bytes (corpos já codificados são mantidos)"""
+    if isinstance(corpo, bytes):
+        return corpo
+    if tipo == MSGPACK:
+        return msgpack.packb(corpo, use_bin_type=True, default=converter_msgpack)
+    return dumps(corpo)
+
+
+def decodificar(dados, tipo=JSON):
+    """Lê um corpo JSON ou MessagePack; lança ValueError se for inválido"""
+    if tipo_base(tipo) == MSGPACK:
+        if msgpack is None:
+            raise ValueError("MessagePack indisponível (pip install msgpack)")
+        try:
+            return msgpack.unpackb(dados, raw=False)
+        except (ValueError, msgpack.UnpackException) as e:
+            raise ValueError(f"MessagePack inválido: {e}")
+    return loads(dados)
+
+
+def cabecalho_lista_msgpack(quantidade):
+    if quantidade < 16:
+        return bytes((0x90 | quantidade,))
+    if quantidade < 0x10000:
+        return b'\xdc' + quantidade.to_bytes(2, 'big')
+    return b'\xdd' + quantidade.to_bytes(4, 'big')
+
+
+def lista(itens, tipo=JSON):
+    """Monta uma lista a partir dos itens já codificados (bytes) no mesmo tipo"""
+    if tipo == MSGPACK:
+        return cabecalho_lista_msgpack(len(itens)) + b''.join(itens)
+    return b'[' + b','.join(itens) + b']'
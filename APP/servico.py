@@ -0,0 +1,519 @@
+"""
+Regras da API compartilhadas pela versão Flask (app.py) e pela versão
+assíncrona (app_async.py)
+
+As funções recebem os dados já lidos da requisição e retornam uma tupla
+(corpo, status), deixando para cada aplicação apenas a leitura da
+requisição e a montagem da resposta.
+"""
+import atexit
+import functools
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import uuid
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+
+import analitico
+import serializacao
+from agregados import montar_relatorio
+from armazenamento import CacheSQLite, criar_motor
+from cache import CacheTTL
+from metricas import CONTENT_TYPE as CONTENT_TYPE_METRICAS, Metricas
+from perfilador import MODOS as MODOS_PERFIL, Perfil
+from modulos import MODULOS
+from registros import RegistroDuplicado, criar_banco
+from validacao import VALIDADORES, validar_lote
+
+# Com vários processos (ver servidor.py), as tabelas são sincronizadas com o
+# motor compartilhado antes de cada requisição
+MULTIPROCESSO = os.environ.get('NASAJON_MULTIPROCESSO') == '1'
+
+# Simulação de banco de dados (tabelas em memória indexadas, persistidas
+# pelo motor configurado em NASAJON_ARMAZENAMENTO). Com vários processos, os
+# registros entram nas tabelas na ordem do motor, a mesma em todos eles
+motor = criar_motor()
+atexit.register(motor.fechar)
+db = criar_banco(motor, ordem_do_motor=MULTIPROCESSO and motor.compartilhado)
+
+# Lock para operações de escrita no "banco de dados"
+db_lock = threading.Lock()
+
+# Rotas sem autenticação
+SWAGGER_URL = '/api/docs'
+API_URL = '/static/swagger.json'
+METRICAS_URL = '/api/metrics'
+
+# Paginação das listagens
+LIMITE_PADRAO = 100
+LIMITE_MAXIMO = 1000
+
+ERRO_INTERNO = {"error": "Erro interno do servidor"}
+
+# Respostas das consultas (listagens e relatórios) já serializadas, pela
+# versão das tabelas consultadas: (nome, versões, parâmetros) -> (corpo, status, cursor).
+# Limitadas também pela soma dos corpos (NASAJON_CACHE_BYTES, padrão 64 MiB),
+# já que uma listagem pode ter até LIMITE_MAXIMO registros
+RESPOSTAS_CAPACIDADE = 256
+RESPOSTAS_LIMITE_BYTES = int(os.environ.get('NASAJON_CACHE_BYTES', 64 * 1024 * 1024))
+respostas_consultas = CacheTTL(
+    RESPOSTAS_CAPACIDADE, limite_bytes=RESPOSTAS_LIMITE_BYTES, tamanho=lambda resposta: len(resposta[0])
+)
+
+# Identifica esta execução nas ETags, já que as versões recomeçam a cada inicialização
+INSTANCIA = uuid.uuid4().hex[:12]
+
+# Respostas das criações com Idempotency-Key, por 24 horas:
+# (módulo, chave) -> (impressão do corpo, corpo da resposta, status). Com
+# vários processos, ficam no arquivo do motor, vistas por todos; sem um
+# motor compartilhado, as requisições com Idempotency-Key são recusadas
+IDEMPOTENCIA_TTL = 24 * 60 * 60
+IDEMPOTENCIA_CAPACIDADE = 100000
+if not MULTIPROCESSO:
+    respostas_idempotentes = CacheTTL(IDEMPOTENCIA_CAPACIDADE, IDEMPOTENCIA_TTL)
+elif motor.compartilhado:
+    respostas_idempotentes = CacheSQLite(motor, 'idempotencia', IDEMPOTENCIA_TTL)
+else:
+    respostas_idempotentes = None
+
+# Contadores e latências das requisições (ver metricas.py); NASAJON_METRICAS=0 desativa
+METRICAS_ATIVAS = os.environ.get('NASAJON_METRICAS', '1') == '1'
+metricas = Metricas()
+
+# Perfil das requisições (ver perfilador.py): NASAJON_PERFIL=amostragem ou
+# deterministico perfila as rotas em NASAJON_PERFIL_ROTAS (separadas por
+# vírgula; vazio = todas); com NASAJON_PERFIL_CABECALHO=1, o cabeçalho
+# X-Profile também ativa o perfil de uma requisição autenticada
+PERFIL_MODO = os.environ.get('NASAJON_PERFIL') or None
+PERFIL_ROTAS = {rota for rota in os.environ.get('NASAJON_PERFIL_ROTAS', '').split(',') if rota}
+PERFIL_CABECALHO = os.environ.get('NASAJON_PERFIL_CABECALHO') == '1'
+PERFIL_ATIVO = PERFIL_MODO is not None or PERFIL_CABECALHO
+if PERFIL_MODO is not None and PERFIL_MODO not in MODOS_PERFIL:
+    raise ValueError(f"NASAJON_PERFIL inválido: {PERFIL_MODO} (use {', '.join(MODOS_PERFIL)})")
+
+
+def configurar_logging(arquivo="api.log"):
+    """Configura o logging da API com escrita em segundo plano
+
+    As requisições apenas colocam os registros de log em uma fila; uma
+    thread (QueueListener) grava no arquivo e no terminal (com
+    NASAJON_LOG_TERMINAL=0, apenas no arquivo).
+    """
+    fila = queue.SimpleQueue()
+    formatador = logging.Formatter('[%(levelname)s] %(asctime)s - %(message)s')
+    handlers = [logging.FileHandler(arquivo)]
+    if os.environ.get('NASAJON_LOG_TERMINAL', '1') == '1':
+        handlers.append(logging.StreamHandler())
+    for handler in handlers:
+        handler.setFormatter(formatador)
+
+    # O QueueHandler repassa apenas a mensagem; a formatação final é feita pelos handlers
+    queue_handler = QueueHandler(fila)
+    queue_handler.setFormatter(logging.Formatter('%(message)s'))
+    logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+    listener = QueueListener(fila, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+def autenticar(path, api_key):
+    """Retorna o erro de autenticação da requisição, ou None se autorizada"""
+    # Ignorar autenticação para swagger e static files
+    if path.startswith(SWAGGER_URL) or path.startswith('/static'):
+        return None
+
+    # Ignorar autenticação para as rotas de status e de métricas
+    if path == '/api/status' or path == METRICAS_URL:
+        return None
+
+    if not chave_valida(api_key):
+        return {"error": "Unauthorized"}, 401
+    return None
+
+
+def chave_valida(api_key):
+    return bool(api_key) and api_key == os.environ.get('NASAJON_API_KEY', 'api_key_simulada')
+
+
+def sincronizar(path):
+    """Sincroniza as tabelas com o motor compartilhado (apenas com vários processos)
+
+    Só os módulos com registros de outros processos são lidos; sem
+    gravações novas, o custo é uma consulta ao PRAGMA data_version.
+    """
+    if not MULTIPROCESSO or not path.startswith('/api/'):
+        return
+
+    with db_lock:
+        for modulo in motor.alterados():
+            db[modulo].sincronizar()
+
+
+def iniciar_perfil(metodo, rota, cabecalho=None, api_key=None):
+    """Inicia o perfil da requisição, se ativado pela configuração ou pelo cabeçalho X-Profile
+
+    Retorna o Perfil iniciado, ou None. O cabeçalho só vale com uma chave
+    de API válida (também nas rotas sem autenticação) e aceita um dos
+    modos; qualquer outro valor não vazio usa a amostragem.
+    """
+    if PERFIL_CABECALHO and cabecalho and cabecalho != '0' and chave_valida(api_key):
+        modo = cabecalho if cabecalho in MODOS_PERFIL else 'amostragem'
+    elif PERFIL_MODO is not None and rota and (not PERFIL_ROTAS or rota in PERFIL_ROTAS):
+        modo = PERFIL_MODO
+    else:
+        return None
+    return Perfil(f"{metodo}_{rota or 'desconhecida'}", modo).iniciar()
+
+
+def encerrar_perfil(perfil, status_code):
+    """Encerra o perfil da requisição e registra os tempos no log"""
+    resultado = perfil.parar()
+    logging.info(
+        f"Perfil {resultado['nome']} ({status_code}): {resultado['parede_s'] * 1000:.1f} ms, "
+        f"CPU {resultado['cpu_s'] * 1000:.1f} ms -> {resultado['arquivo']}"
+    )
+    return resultado
+
+
+def impressao_corpo(corpo):
+    """Resumo do corpo da requisição, para reconhecer a repetição de uma Idempotency-Key"""
+    texto = json.dumps(corpo, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def idempotente(criar):
+    """Decora uma função de criação (modulo, corpo) para aceitar chave_idempotencia
+
+    Sem chave, a função é chamada normalmente. Com chave, a primeira
+    resposta (exceto erros internos) é guardada em respostas_idempotentes, e
+    uma nova requisição com a mesma chave e o mesmo corpo recebe a resposta
+    original sem passar pela validação nem pelas tabelas; com outro corpo,
+    recebe 422. Requisições simultâneas com a mesma chave não são
+    serializadas: a segunda recebe 409 pela chave natural do registro.
+    Com vários processos e sem motor compartilhado, recebe 503.
+    """
+    @functools.wraps(criar)
+    def executar(modulo, corpo, chave_idempotencia=None):
+        if not chave_idempotencia:
+            return criar(modulo, corpo)
+
+        if respostas_idempotentes is None:
+            return {"error": "Idempotency-Key exige NASAJON_ARMAZENAMENTO=sqlite com vários processos"}, 503
+
+        chave = (modulo, criar.__name__, chave_idempotencia)
+        impressao = impressao_corpo(corpo)
+        anterior = respostas_idempotentes.obter(chave)
+        if anterior is not None:
+            if anterior[0] != impressao:
+                return {"error": "Idempotency-Key já usada com outro corpo"}, 422
+            return anterior[1], anterior[2]
+
+        resposta, status_code = criar(modulo, corpo)
+        if status_code < 500:
+            respostas_idempotentes.guardar(chave, (impressao, resposta, status_code))
+        return resposta, status_code
+
+    return executar
+
+
+@idempotente
+def criar_registro(modulo, data):
+    """Valida e grava um registro de um módulo"""
+    definicao = MODULOS[modulo]
+    try:
+        # Validação pelo schema do swagger (ver validacao.py)
+        erro = VALIDADORES[modulo](data)
+        if erro:
+            return {"error": erro}, 400
+
+        # Adiciona ID e timestamp
+        data['id'] = str(uuid.uuid4())
+        data['timestamp'] = datetime.now().isoformat()
+
+        # Salva no "banco de dados"
+        with db_lock:
+            db[modulo].inserir(data)
+
+        logging.info(f"{definicao['log']}: {data[definicao['campo_log']]}")
+
+        return {
+            "message": definicao['mensagem'],
+            "id": data['id']
+        }, 201
+    except RegistroDuplicado as e:
+        return {"error": str(e)}, 409
+    except Exception as e:
+        logging.error(f"Erro ao {definicao['acao']}: {str(e)}")
+        return ERRO_INTERNO, 500
+
+
+def parametros_consulta(args):
+    """Parâmetros da query string em uma tupla ordenada (aceita MultiDict ou dict)"""
+    if args is None:
+        return ()
+    if hasattr(args, 'lists'):
+        return tuple(sorted((chave, tuple(valores)) for chave, valores in args.lists()))
+    return tuple(sorted(args.items()))
+
+
+def versao_consulta(nome, modulos, args, tipo=serializacao.JSON):
+    """Chave de cache e ETag de uma consulta, pela versão atual das tabelas consultadas
+
+    As versões são lidas antes da consulta: se um registro for gravado
+    durante ela, a resposta guardada pode ser mais nova que a versão, nunca
+    mais antiga.
+    """
+    chave = (nome, tipo, tuple(db[modulo].versao for modulo in modulos), parametros_consulta(args))
+    etag = INSTANCIA + '-' + hashlib.sha1(repr(chave).encode('utf-8')).hexdigest()
+    return chave, etag
+
+
+def consultar_em_cache(chave, consultar, tipo=serializacao.JSON):
+    """Resposta de uma consulta: (corpo serializado no tipo, status, proximo_cursor)
+
+    consultar() retorna (corpo, status, proximo_cursor), com o corpo já
+    serializado ou não; só as respostas 200 são guardadas em
+    respostas_consultas.
+    """
+    resposta = respostas_consultas.obter(chave)
+    if resposta is None:
+        corpo, status_code, proximo_cursor = consultar()
+        resposta = (serializacao.codificar(corpo, tipo), status_code, proximo_cursor)
+        if status_code == 200:
+            respostas_consultas.guardar(chave, resposta)
+    return resposta
+
+
+def ler_ndjson(linhas):
+    """Converte as linhas de um stream NDJSON em registros"""
+    itens = []
+    for linha in linhas:
+        linha = linha.strip()
+        if not linha:
+            continue
+        try:
+            itens.append(serializacao.loads(linha))
+        except ValueError:
+            # Linhas inválidas viram erros individuais do lote
+            itens.append(None)
+    return itens
+
+
+@idempotente
+def criar_lote(modulo, itens):
+    """Valida e grava um lote de registros de um módulo"""
+    try:
+        if not isinstance(itens, list):
+            return {"error": "O corpo deve ser um array (JSON ou MessagePack) ou um stream NDJSON"}, 400
+
+        timestamp = datetime.now().isoformat()
+        resultados = [None] * len(itens)
+        validos = []
+
+        # Validação de todos os registros em uma única passada
+        for indice, (item, erro) in enumerate(zip(itens, validar_lote(modulo, itens))):
+            if erro:
+                resultados[indice] = {"indice": indice, "error": erro}
+                continue
+
+            item['id'] = str(uuid.uuid4())
+            item['timestamp'] = timestamp
+            validos.append((indice, item))
+
+        # Grava todos os registros válidos em uma única operação
+        with db_lock:
+            erros_gravacao = db[modulo].inserir_varios([item for _, item in validos])
+
+        criados = 0
+        for (indice, item), erro in zip(validos, erros_gravacao):
+            if erro:
+                resultados[indice] = {"indice": indice, "error": erro}
+            else:
+                resultados[indice] = {"indice": indice, "id": item['id']}
+                criados += 1
+
+        erros = len(itens) - criados
+        logging.info(f"Lote do módulo {modulo} processado: {criados} criados, {erros} com erro")
+
+        if not criados and itens:
+            status_code = 400
+        elif erros:
+            status_code = 207
+        else:
+            status_code = 201
+
+        return {
+            "message": "Lote processado",
+            "total": len(itens),
+            "criados": criados,
+            "erros": erros,
+            "resultados": resultados
+        }, status_code
+    except RegistroDuplicado as e:
+        return {"error": str(e)}, 409
+    except Exception as e:
+        logging.error(f"Erro ao processar lote do módulo {modulo}: {str(e)}")
+        return ERRO_INTERNO, 500
+
+
+def inteiro_parametro(args, nome, padrao, minimo):
+    """Lê um parâmetro inteiro da query string"""
+    valor = args.get(nome)
+    if valor is None:
+        return padrao
+    try:
+        valor = int(valor)
+    except ValueError:
+        raise ValueError(f"Parâmetro inválido: {nome}")
+    if valor < minimo:
+        raise ValueError(f"Parâmetro inválido: {nome}")
+    return valor
+
+
+def filtro_listagem(modulo, args):
+    """Monta a função de filtro a partir dos parâmetros da requisição"""
+    igualdades = [
+        (campo, args[campo])
+        for campo in MODULOS[modulo]['filtros']
+        if campo in args
+    ]
+
+    def filtro(registro):
+        for campo, valor in igualdades:
+            if str(registro.get(campo)) != valor:
+                return False
+        return True
+
+    return filtro
+
+
+def posicoes_listagem(modulo, args, inicio):
+    """Retorna as posições a percorrer, usando o índice por data quando há filtro de período"""
+    tabela = db[modulo]
+    data_inicio = args.get('data_inicio')
+    data_fim = args.get('data_fim')
+
+    if not (data_inicio or data_fim):
+        return range(inicio, len(tabela))
+
+    if not MODULOS[modulo]['campo_data']:
+        raise ValueError(f"O módulo {modulo} não possui filtro por data")
+
+    return [
+        posicao for posicao in tabela.posicoes_periodo(data_inicio, data_fim)
+        if posicao >= inicio
+    ]
+
+
+def gerar_ndjson(registros, posicoes, filtro, limite):
+    """Gera os registros filtrados em formato NDJSON (bytes), em blocos"""
+    bloco = []
+    enviados = 0
+    for posicao in posicoes:
+        if not filtro(registros[posicao]):
+            continue
+        bloco.append(registros.registro_serializado(posicao))
+        enviados += 1
+        if len(bloco) >= LIMITE_PADRAO:
+            yield b'\n'.join(bloco) + b'\n'
+            bloco = []
+        if limite is not None and enviados >= limite:
+            break
+    if bloco:
+        yield b'\n'.join(bloco) + b'\n'
+
+
+def listar(modulo, args, streaming=False, tipo=serializacao.JSON):
+    """Lista os registros de um módulo
+
+    Retorna (pagina, status, proximo_cursor), com a página já serializada
+    no tipo (JSON ou MessagePack, montada com a serialização guardada de
+    cada registro), ou (gerador NDJSON, 200, None) no modo streaming.
+    """
+    try:
+        try:
+            filtro = filtro_listagem(modulo, args)
+            # O cursor é a posição do último registro entregue (a lista só cresce e,
+            # com vários processos, segue a ordem do motor, a mesma em todos)
+            inicio = inteiro_parametro(args, 'after', -1, -1) + 1
+            limite = inteiro_parametro(args, 'limit', None if streaming else LIMITE_PADRAO, 1)
+            posicoes = posicoes_listagem(modulo, args, inicio)
+        except ValueError as e:
+            return {"error": str(e)}, 400, None
+
+        registros = db[modulo]
+
+        if streaming:
+            return gerar_ndjson(registros, posicoes, filtro, limite), 200, None
+
+        limite = min(limite, LIMITE_MAXIMO)
+        pagina = []
+        ultima_posicao = None
+        for posicao in posicoes:
+            if filtro(registros[posicao]):
+                pagina.append(registros.registro_serializado(posicao, tipo))
+                ultima_posicao = posicao
+                if len(pagina) >= limite:
+                    break
+
+        proximo_cursor = str(ultima_posicao) if len(pagina) >= limite else None
+        return serializacao.lista(pagina, tipo), 200, proximo_cursor
+    except Exception as e:
+        logging.error(f"Erro ao listar registros do módulo {modulo}: {str(e)}")
+        return ERRO_INTERNO, 500, None
+
+
+def obter(modulo, id_registro, tipo=serializacao.JSON):
+    """Busca um registro de um módulo pelo id (retornado já serializado no tipo)"""
+    try:
+        posicao = db[modulo].posicao('id', id_registro)
+        if posicao is None:
+            return {"error": "Registro não encontrado"}, 404
+        return db[modulo].registro_serializado(posicao, tipo), 200
+    except Exception as e:
+        logging.error(f"Erro ao buscar registro do módulo {modulo}: {str(e)}")
+        return ERRO_INTERNO, 500
+
+
+def relatorio(tipo=None, args=None):
+    """Estatísticas dos módulos, a partir dos agregados mantidos nas tabelas,
+    ou um relatório analítico (ver analitico.py)"""
+    try:
+        with db_lock:
+            if tipo is None:
+                return montar_relatorio(db), 200
+            if tipo not in analitico.RELATORIOS:
+                return {"error": "Relatório não encontrado"}, 404
+            try:
+                return analitico.gerar(db, tipo, args), 200
+            except ValueError as e:
+                return {"error": str(e)}, 400
+    except Exception as e:
+        logging.error(f"Erro ao gerar relatório: {str(e)}")
+        return ERRO_INTERNO, 500
+
+
+def status():
+    """Status da API"""
+    try:
+        return {
+            "status": "online",
+            "timestamp": datetime.now().isoformat(),
+            "modules": list(db.keys())
+        }, 200
+    except Exception as e:
+        logging.error(f"Erro ao verificar status: {str(e)}")
+        return ERRO_INTERNO, 500
+
+
+def exportar_metricas():
+    """Métricas da API no formato de texto do Prometheus"""
+    caches = {"consultas": respostas_consultas}
+    if respostas_idempotentes is not None:
+        caches["idempotencia"] = respostas_idempotentes
+    return metricas.exportar(db, caches), 200
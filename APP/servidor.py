@@ -0,0 +1,92 @@
+"""
+Inicia a API em modo de produção
+
+Usa o gunicorn (Linux/macOS) com vários processos e threads, ou o waitress
+(Windows) com várias threads. O servidor de desenvolvimento do Flask
+(python app.py) deve ser usado apenas para desenvolvimento.
+
+Com mais de um processo, o estado é compartilhado pelo motor SQLite
+(NASAJON_ARMAZENAMENTO=sqlite): cada processo grava no mesmo arquivo e
+sincroniza suas tabelas em memória antes de cada requisição.
+"""
+import argparse
+import os
+import sys
+
+
+def ler_argumentos():
+    """Lê a configuração da linha de comando (com padrões nas variáveis de ambiente)"""
+    parser = argparse.ArgumentParser(description="Servidor de produção da API Nasajon")
+    parser.add_argument('--host', default=os.environ.get('NASAJON_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('NASAJON_PORT', 5000)))
+    # Mais de um processo só funciona com o estado compartilhado pelo SQLite
+    compartilhado = os.environ.get('NASAJON_ARMAZENAMENTO', 'memoria') == 'sqlite'
+    workers_padrao = (os.cpu_count() or 1) if compartilhado else 1
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('NASAJON_WORKERS', workers_padrao)),
+                        help="Quantidade de processos (apenas gunicorn; padrão: núcleos com sqlite, 1 sem)")
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('NASAJON_THREADS', 8)),
+                        help="Threads por processo")
+    parser.add_argument('--keepalive', type=int, default=int(os.environ.get('NASAJON_KEEPALIVE', 5)),
+                        help="Segundos que uma conexão ociosa fica aberta")
+    parser.add_argument('--graceful-timeout', type=int, default=int(os.environ.get('NASAJON_GRACEFUL_TIMEOUT', 30)),
+                        help="Segundos para concluir as requisições em andamento ao encerrar")
+    parser.add_argument('--servidor', choices=['gunicorn', 'waitress'],
+                        default=os.environ.get('NASAJON_SERVIDOR', 'waitress' if sys.platform == 'win32' else 'gunicorn'))
+    return parser.parse_args()
+
+
+def iniciar_gunicorn(args):
+    """Inicia o gunicorn com workers gthread"""
+    from gunicorn.app.base import BaseApplication
+
+    class Aplicacao(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f"{args.host}:{args.port}")
+            self.cfg.set('workers', args.workers)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('threads', args.threads)
+            self.cfg.set('keepalive', args.keepalive)
+            self.cfg.set('graceful_timeout', args.graceful_timeout)
+            # Sem preload: cada processo importa a API e abre sua própria conexão com o motor
+            self.cfg.set('preload_app', False)
+
+        def load(self):
+            from app import app
+            return app
+
+    Aplicacao().run()
+
+
+def iniciar_waitress(args):
+    """Inicia o waitress (um processo, várias threads)"""
+    from waitress import serve
+    from app import app
+
+    serve(app, host=args.host, port=args.port, threads=args.threads, channel_timeout=args.keepalive)
+
+
+def main():
+    args = ler_argumentos()
+
+    if args.servidor == 'waitress':
+        args.workers = 1
+
+    if args.workers > 1:
+        if os.environ.get('NASAJON_ARMAZENAMENTO', 'memoria') != 'sqlite':
+            print("ERRO: com mais de um processo o estado precisa ser compartilhado.")
+            print("Use NASAJON_ARMAZENAMENTO=sqlite ou --workers 1.")
+            sys.exit(1)
+        # Os processos sincronizam suas tabelas com o motor a cada requisição
+        os.environ['NASAJON_MULTIPROCESSO'] = '1'
+
+    print(f"Iniciando a API com {args.servidor}: {args.workers} processo(s) x {args.threads} thread(s) "
+          f"em {args.host}:{args.port}")
+
+    if args.servidor == 'gunicorn':
+        iniciar_gunicorn(args)
+    else:
+        iniciar_waitress(args)
+
+
+if __name__ == '__main__':
+    main()
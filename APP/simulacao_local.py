@@ -1,27 +1,37 @@
+import argparse
 import json
 import uuid
 from datetime import datetime
 import os
 import time
 
+import analitico
+import serializacao
+from agregados import montar_relatorio
+from armazenamento import criar_motor
+from exportacao import Exportador
+from gerador_dados import GeradorDados, carregar_simulacao
+from gravador_notas import FORMATOS as FORMATOS_NOTAS, GravadorNotas
+from log_bufferizado import LogBufferizado
+from modulos import MODULOS
+from perfilador import MODOS as MODOS_PERFIL, Fases
+from registros import criar_banco
+from validacao import VALIDADORES, validar_lote
+
 class SimulacaoNasajon:
     """Simulação local da API Nasajon"""
     
-    def __init__(self):
-        # Simulação de banco de dados em memória
-        self.db = {
-            'financeiro': [],
-            'contabil': [],
-            'fiscal': [],
-            'rh': [],
-            'compras': [],
-            'vendas': [],
-            'estoque': [],
-            'patrimonio': []
-        }
+    def __init__(self, motor=None, silencioso=False, formato_notas='arquivos'):
+        # Simulação de banco de dados em memória (tabelas indexadas), opcionalmente
+        # persistida por um motor de armazenamento (ver armazenamento.py)
+        self.db = criar_banco(motor)
         # Diretório para logs e arquivos gerados
         os.makedirs('logs', exist_ok=True)
         self.log_file = os.path.join('logs', f'simulacao_{datetime.now().strftime("%Y%m%d_%H%M%S")}.log')
+        # O arquivo de log fica aberto durante toda a simulação (ver log_bufferizado.py)
+        self.logger = LogBufferizado(self.log_file, silencioso=silencioso)
+        # Os arquivos das notas fiscais são gravados em segundo plano (ver gravador_notas.py)
+        self.notas = GravadorNotas('notas_fiscais', formato_notas, log=self.log)
         
         # Inicializa o log
         self.log("Simulação Nasajon iniciada")
@@ -30,30 +40,33 @@ class SimulacaoNasajon:
         """Registra mensagens no log"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         log_entry = f"[{timestamp}] {mensagem}"
-        print(log_entry)
-        
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(log_entry + "\n")
+        self.logger.escrever(log_entry)
     
-    def validar_campos(self, dados, campos_obrigatorios):
-        """Valida se todos os campos obrigatórios estão presentes"""
-        for campo in campos_obrigatorios:
-            if campo not in dados:
-                raise ValueError(f"Campo obrigatório ausente: {campo}")
+    def encerrar(self):
+        """Grava os arquivos de notas fiscais e o log pendentes e fecha o arquivo de log"""
+        self.notas.fechar()
+        self.log("Simulação Nasajon encerrada")
+        self.logger.fechar()
+    
+    def validar(self, modulo, dados):
+        """Valida os dados pelo schema do swagger, o mesmo usado pela API (ver validacao.py)"""
+        erro = VALIDADORES[modulo](dados)
+        if erro:
+            raise ValueError(erro)
         return True
     
     def criar_lancamento_financeiro(self, lancamento):
         """Cria um lançamento financeiro"""
         try:
-            # Validação básica
-            self.validar_campos(lancamento, ['identificador', 'data', 'valor', 'tipo', 'conta'])
+            # Validação pelo schema
+            self.validar('financeiro', lancamento)
             
             # Adiciona ID e timestamp
             lancamento['id'] = str(uuid.uuid4())
             lancamento['timestamp'] = datetime.now().isoformat()
             
             # Salva no "banco de dados"
-            self.db['financeiro'].append(lancamento)
+            self.db['financeiro'].inserir(lancamento)
             
             self.log(f"Lançamento financeiro criado: {lancamento['identificador']}")
             
@@ -68,15 +81,15 @@ class SimulacaoNasajon:
     def criar_lancamento_contabil(self, lancamento):
         """Cria um lançamento contábil"""
         try:
-            # Validação básica
-            self.validar_campos(lancamento, ['identificador', 'data', 'valor', 'debito', 'credito'])
+            # Validação pelo schema
+            self.validar('contabil', lancamento)
             
             # Adiciona ID e timestamp
             lancamento['id'] = str(uuid.uuid4())
             lancamento['timestamp'] = datetime.now().isoformat()
             
             # Salva no "banco de dados"
-            self.db['contabil'].append(lancamento)
+            self.db['contabil'].inserir(lancamento)
             
             self.log(f"Lançamento contábil criado: {lancamento['identificador']}")
             
@@ -91,15 +104,15 @@ class SimulacaoNasajon:
     def emitir_nota_fiscal(self, nota_fiscal):
         """Emite uma nota fiscal"""
         try:
-            # Validação básica
-            self.validar_campos(nota_fiscal, ['numero', 'data', 'valor', 'cliente', 'itens'])
+            # Validação pelo schema
+            self.validar('fiscal', nota_fiscal)
             
             # Adiciona ID e timestamp
             nota_fiscal['id'] = str(uuid.uuid4())
             nota_fiscal['timestamp'] = datetime.now().isoformat()
             
             # Salva no "banco de dados"
-            self.db['fiscal'].append(nota_fiscal)
+            self.db['fiscal'].inserir(nota_fiscal)
             
             self.log(f"Nota fiscal emitida: {nota_fiscal['numero']}")
             
@@ -115,30 +128,24 @@ class SimulacaoNasajon:
             raise
     
     def gerar_arquivo_nota_fiscal(self, nota_fiscal):
-        """Gera um arquivo JSON com os dados da nota fiscal"""
+        """Enfileira a gravação do arquivo da nota fiscal (feita em segundo plano)"""
         try:
-            os.makedirs('notas_fiscais', exist_ok=True)
-            arquivo = os.path.join('notas_fiscais', f"NF_{nota_fiscal['numero']}.json")
-            
-            with open(arquivo, 'w', encoding='utf-8') as f:
-                json.dump(nota_fiscal, f, indent=2, ensure_ascii=False)
-            
-            self.log(f"Arquivo da nota fiscal gerado: {arquivo}")
+            self.notas.enviar(nota_fiscal)
         except Exception as e:
             self.log(f"Erro ao gerar arquivo da nota fiscal: {str(e)}")
     
     def cadastrar_funcionario(self, funcionario):
         """Cadastra um funcionário"""
         try:
-            # Validação básica
-            self.validar_campos(funcionario, ['matricula', 'nome', 'cpf', 'cargo', 'salario'])
+            # Validação pelo schema
+            self.validar('rh', funcionario)
             
             # Adiciona ID e timestamp
             funcionario['id'] = str(uuid.uuid4())
             funcionario['timestamp'] = datetime.now().isoformat()
             
             # Salva no "banco de dados"
-            self.db['rh'].append(funcionario)
+            self.db['rh'].inserir(funcionario)
             
             self.log(f"Funcionário cadastrado: {funcionario['nome']}")
             
@@ -153,15 +160,15 @@ class SimulacaoNasajon:
     def criar_pedido_compra(self, pedido):
         """Cria um pedido de compra"""
         try:
-            # Validação básica
-            self.validar_campos(pedido, ['numero', 'data', 'fornecedor', 'itens'])
+            # Validação pelo schema
+            self.validar('compras', pedido)
             
             # Adiciona ID e timestamp
             pedido['id'] = str(uuid.uuid4())
             pedido['timestamp'] = datetime.now().isoformat()
             
             # Salva no "banco de dados"
-            self.db['compras'].append(pedido)
+            self.db['compras'].inserir(pedido)
             
             self.log(f"Pedido de compra criado: {pedido['numero']}")
             
@@ -176,15 +183,15 @@ class SimulacaoNasajon:
     def criar_pedido_venda(self, pedido):
         """Cria um pedido de venda"""
         try:
-            # Validação básica
-            self.validar_campos(pedido, ['numero', 'data', 'cliente', 'itens'])
+            # Validação pelo schema
+            self.validar('vendas', pedido)
             
             # Adiciona ID e timestamp
             pedido['id'] = str(uuid.uuid4())
             pedido['timestamp'] = datetime.now().isoformat()
             
             # Salva no "banco de dados"
-            self.db['vendas'].append(pedido)
+            self.db['vendas'].inserir(pedido)
             
             self.log(f"Pedido de venda criado: {pedido['numero']}")
             
@@ -199,15 +206,15 @@ class SimulacaoNasajon:
     def cadastrar_produto(self, produto):
         """Cadastra um produto"""
         try:
-            # Validação básica
-            self.validar_campos(produto, ['codigo', 'descricao', 'unidade', 'preco'])
+            # Validação pelo schema
+            self.validar('estoque', produto)
             
             # Adiciona ID e timestamp
             produto['id'] = str(uuid.uuid4())
             produto['timestamp'] = datetime.now().isoformat()
             
             # Salva no "banco de dados"
-            self.db['estoque'].append(produto)
+            self.db['estoque'].inserir(produto)
             
             self.log(f"Produto cadastrado: {produto['codigo']}")
             
@@ -222,15 +229,15 @@ class SimulacaoNasajon:
     def cadastrar_bem(self, bem):
         """Cadastra um bem patrimonial"""
         try:
-            # Validação básica
-            self.validar_campos(bem, ['codigo', 'descricao', 'valor', 'dataAquisicao'])
+            # Validação pelo schema
+            self.validar('patrimonio', bem)
             
             # Adiciona ID e timestamp
             bem['id'] = str(uuid.uuid4())
             bem['timestamp'] = datetime.now().isoformat()
             
             # Salva no "banco de dados"
-            self.db['patrimonio'].append(bem)
+            self.db['patrimonio'].inserir(bem)
             
             self.log(f"Bem patrimonial cadastrado: {bem['codigo']}")
             
@@ -242,61 +249,90 @@ class SimulacaoNasajon:
             self.log(f"Erro ao cadastrar bem patrimonial: {str(e)}")
             raise
     
-    def exportar_dados(self):
-        """Exporta todos os dados para arquivos JSON"""
+    def criar_lote(self, modulo, registros):
+        """Valida e grava uma lista de registros de um módulo de uma vez
+
+        Usado nas cargas de grande volume (ver gerador_dados.py): uma linha de
+        log por lote e uma única gravação na tabela. As notas fiscais válidas também têm os arquivos gerados.
+        """
         try:
-            os.makedirs('dados_exportados', exist_ok=True)
-            
-            for modulo, dados in self.db.items():
-                if dados:  # Só exporta se tiver dados
-                    arquivo = os.path.join('dados_exportados', f"{modulo}.json")
-                    
-                    with open(arquivo, 'w', encoding='utf-8') as f:
-                        json.dump(dados, f, indent=2, ensure_ascii=False)
-                    
-                    self.log(f"Dados do módulo {modulo} exportados para {arquivo}")
-            
-            return {"message": "Dados exportados com sucesso"}
+            timestamp = datetime.now().isoformat()
+            validos = []
+            erros = 0
+            for registro, erro in zip(registros, validar_lote(modulo, registros)):
+                if erro:
+                    erros += 1
+                    continue
+                registro['id'] = str(uuid.uuid4())
+                registro['timestamp'] = timestamp
+                validos.append(registro)
+            
+            criados = 0
+            for registro, erro in zip(validos, self.db[modulo].inserir_varios(validos)):
+                if erro:
+                    erros += 1
+                    continue
+                criados += 1
+                if modulo == 'fiscal':
+                    self.gerar_arquivo_nota_fiscal(registro)
+            
+            self.log(f"Lote do módulo {modulo} processado: {criados} criados, {erros} com erro")
+            
+            return {
+                "message": "Lote processado",
+                "criados": criados,
+                "erros": erros
+            }
         except Exception as e:
-            self.log(f"Erro ao exportar dados: {str(e)}")
+            self.log(f"Erro ao processar lote do módulo {modulo}: {str(e)}")
             raise
     
-    def gerar_relatorio(self):
-        """Gera um relatório com estatísticas dos dados"""
+    def exportar_dados(self, incremental=True, compressao=None):
+        """Exporta os dados para arquivos NDJSON (ver exportacao.py)
+
+        No modo incremental, acrescenta apenas os registros criados desde a
+        última exportação; com incremental=False, regrava um retrato completo.
+        compressao pode ser None, 'gzip' ou 'zstd'.
+        """
         try:
-            relatorio = {
-                "timestamp": datetime.now().isoformat(),
-                "estatisticas": {}
-            }
+            exportador = Exportador('dados_exportados', compressao)
+            exportados = exportador.exportar(self.db, incremental)
             
-            for modulo, dados in self.db.items():
-                relatorio["estatisticas"][modulo] = {
-                    "total_registros": len(dados)
-                }
-                
-                # Estatísticas específicas por módulo
-                if modulo == 'financeiro' and dados:
-                    total_receitas = sum(item['valor'] for item in dados if item['tipo'] == 'RECEITA')
-                    total_despesas = sum(item['valor'] for item in dados if item['tipo'] == 'DESPESA')
-                    relatorio["estatisticas"][modulo].update({
-                        "total_receitas": total_receitas,
-                        "total_despesas": total_despesas,
-                        "saldo": total_receitas - total_despesas
-                    })
-                
-                elif modulo == 'fiscal' and dados:
-                    total_valor = sum(item['valor'] for item in dados)
-                    relatorio["estatisticas"][modulo].update({
-                        "total_valor_notas": total_valor,
-                        "media_valor": total_valor / len(dados) if dados else 0
-                    })
+            for modulo, quantidade in exportados.items():
+                if quantidade:
+                    arquivo = os.path.join('dados_exportados', exportador.nome_arquivo(modulo))
+                    self.log(f"{quantidade} registros do módulo {modulo} exportados para {arquivo}")
+            
+            return {
+                "message": "Dados exportados com sucesso",
+                "modo": "incremental" if incremental else "completo",
+                "registros": exportados
+            }
+        except Exception as e:
+            self.log(f"Erro ao exportar dados: {str(e)}")
+            raise
+    
+    def gerar_relatorio(self, tipo=None, parametros=None):
+        """Gera um relatório com estatísticas dos dados (ver agregados.py)
+
+        tipo pode ser também um relatório analítico de analitico.py
+        ('fluxo-caixa', 'saldos-conta' ou 'balancete'), com parametros como
+        periodo ('dia' ou 'mes'), data_inicio e data_fim.
+        """
+        try:
+            if tipo is None:
+                relatorio = montar_relatorio(self.db)
+                prefixo = "relatorio"
+            else:
+                relatorio = analitico.gerar(self.db, tipo, parametros)
+                prefixo = f"relatorio_{tipo.replace('-', '_')}"
             
             # Salva o relatório
             os.makedirs('relatorios', exist_ok=True)
-            arquivo = os.path.join('relatorios', f"relatorio_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+            arquivo = os.path.join('relatorios', f"{prefixo}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
             
-            with open(arquivo, 'w', encoding='utf-8') as f:
-                json.dump(relatorio, f, indent=2, ensure_ascii=False)
+            with open(arquivo, 'wb') as f:
+                f.write(serializacao.dumps(relatorio, indentado=True))
             
             self.log(f"Relatório gerado: {arquivo}")
             
@@ -307,179 +343,296 @@ class SimulacaoNasajon:
         except Exception as e:
             self.log(f"Erro ao gerar relatório: {str(e)}")
             raise
+    
+    def gerar_relatorio_perfil(self, perfil):
+        """Salva os tempos das fases da execução (ver perfilador.Fases) em relatorios/"""
+        os.makedirs('relatorios', exist_ok=True)
+        arquivo = os.path.join('relatorios', f"perfil_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        with open(arquivo, 'wb') as f:
+            f.write(serializacao.dumps(perfil, indentado=True))
+        
+        self.log(f"Perfil das fases: {arquivo}")
+        
+        return {
+            "message": "Perfil das fases gerado com sucesso",
+            "arquivo": arquivo,
+            "total": perfil["total"]
+        }
+
 
+def lotes_pendentes(nasajon, modulo, lotes):
+    """Ignora os lotes já gravados (pela chave natural do último registro), ao retomar uma execução"""
+    tabela = nasajon.db[modulo]
+    campo = MODULOS[modulo]['chaves'][0]
+    for lote in lotes:
+        if lote and tabela.posicao(campo, lote[-1][campo]) is None:
+            yield lote
 
-def simular_operacoes():
-    """Executa a simulação de operações com o Nasajon"""
+
+def simular_operacoes(silencioso=False, exportacao_completa=False, compressao=None, formato_notas='arquivos',
+                      volume=0, semente=0, perfil=None, fases_perfil=None, armazenamento='memoria'):
+    """Executa a simulação de operações com o Nasajon
+
+    Com volume > 0, depois dos registros de exemplo cada módulo recebe
+    volume registros sintéticos (ver gerador_dados.py), gerados e gravados
+    em lotes.
+
+    Com perfil ('amostragem' ou 'deterministico', ver perfilador.py), as
+    fases em fases_perfil (ou todas) têm o perfil gravado em logs/perfis/
+    e os tempos de parede e de CPU de cada fase vão para relatorios/.
+
+    armazenamento escolhe o motor que persiste os registros (ver
+    armazenamento.py). Com 'sqlite' ou 'wal', uma simulação interrompida pode ser
+    executada de novo com os mesmos parâmetros: os registros gravados são
+    carregados e apenas os lotes sintéticos que faltam são gerados.
+    """
     print("=== Simulação de Integração com Nasajon (Local) ===")
     
     # Inicializa a simulação
-    nasajon = SimulacaoNasajon()
+    motor = criar_motor(armazenamento)
+    nasajon = SimulacaoNasajon(motor=motor, silencioso=silencioso, formato_notas=formato_notas)
+    fases = Fases(perfil, fases_perfil)
     
     try:
-        # 1. Financeiro - Criar lançamento (receita)
-        lancamento_financeiro_receita = {
-            "identificador": "LF001",
-            "data": datetime.now().strftime("%Y-%m-%d"),
-            "valor": 1500.00,
-            "tipo": "RECEITA",
-            "conta": "1001",
-            "descricao": "Venda à vista"
-        }
-        
-        resultado = nasajon.criar_lancamento_financeiro(lancamento_financeiro_receita)
-        print(f"Financeiro - Criar lançamento (receita): {json.dumps(resultado, indent=2)}")
-        print("\n")
-        
-        # Financeiro - Criar lançamento (despesa)
-        lancamento_financeiro_despesa = {
-            "identificador": "LF002",
-            "data": datetime.now().strftime("%Y-%m-%d"),
-            "valor": 500.00,
-            "tipo": "DESPESA",
-            "conta": "2001",
-            "descricao": "Pagamento de fornecedor"
-        }
-        
-        resultado = nasajon.criar_lancamento_financeiro(lancamento_financeiro_despesa)
-        print(f"Financeiro - Criar lançamento (despesa): {json.dumps(resultado, indent=2)}")
-        print("\n")
-        
-        # 2. Contábil - Criar lançamento
-        lancamento_contabil = {
-            "identificador": "LC001",
-            "data": datetime.now().strftime("%Y-%m-%d"),
-            "valor": 1500.00,
-            "debito": "1001",
-            "credito": "2001",
-            "historico": "Venda à vista"
-        }
-        
-        resultado = nasajon.criar_lancamento_contabil(lancamento_contabil)
-        print(f"Contábil - Criar lançamento: {json.dumps(resultado, indent=2)}")
-        print("\n")
-        
-        # 3. Fiscal - Emitir nota fiscal
-        nota_fiscal = {
-            "numero": "NF001",
-            "data": datetime.now().strftime("%Y-%m-%d"),
-            "valor": 1500.00,
-            "cliente": {
-                "cnpj": "12345678000100",
-                "nome": "Cliente Exemplo"
-            },
-            "itens": [
-                {
-                    "codigo": "001",
-                    "descricao": "Produto A",
-                    "quantidade": 1,
-                    "valorUnitario": 1500.00
+        # Com um armazenamento que já tem registros (execução retomada), os
+        # registros de exemplo já foram gravados
+        retomada = any(len(tabela) for tabela in nasajon.db.values())
+        if retomada:
+            print("Armazenamento com registros gravados: retomando a simulação")
+            print("\n")
+        else:
+            # 1. Financeiro - Criar lançamento (receita)
+            with fases.fase('financeiro'):
+                lancamento_financeiro_receita = {
+                    "identificador": "LF001",
+                    "data": datetime.now().strftime("%Y-%m-%d"),
+                    "valor": 1500.00,
+                    "tipo": "RECEITA",
+                    "conta": "1001",
+                    "descricao": "Venda à vista"
                 }
-            ]
-        }
-        
-        resultado = nasajon.emitir_nota_fiscal(nota_fiscal)
-        print(f"Fiscal - Emitir nota fiscal: {json.dumps(resultado, indent=2)}")
-        print("\n")
-        
-        # 4. RH - Cadastrar funcionário
-        funcionario = {
-            "matricula": "F001",
-            "nome": "João Silva",
-            "cpf": "12345678900",
-            "cargo": "Analista",
-            "salario": 5000.00,
-            "dataAdmissao": datetime.now().strftime("%Y-%m-%d")
-        }
-        
-        resultado = nasajon.cadastrar_funcionario(funcionario)
-        print(f"RH - Cadastrar funcionário: {json.dumps(resultado, indent=2)}")
-        print("\n")
-        
-        # 5. Compras - Criar pedido
-        pedido_compra = {
-            "numero": "PC001",
-            "data": datetime.now().strftime("%Y-%m-%d"),
-            "fornecedor": {
-                "cnpj": "98765432000100",
-                "nome": "Fornecedor Exemplo"
-            },
-            "itens": [
-                {
-                    "codigo": "001",
-                    "descricao": "Material de escritório",
-                    "quantidade": 10,
-                    "valorUnitario": 50.00
+                
+                resultado = nasajon.criar_lancamento_financeiro(lancamento_financeiro_receita)
+                print(f"Financeiro - Criar lançamento (receita): {json.dumps(resultado, indent=2)}")
+                print("\n")
+                
+                # Financeiro - Criar lançamento (despesa)
+                lancamento_financeiro_despesa = {
+                    "identificador": "LF002",
+                    "data": datetime.now().strftime("%Y-%m-%d"),
+                    "valor": 500.00,
+                    "tipo": "DESPESA",
+                    "conta": "2001",
+                    "descricao": "Pagamento de fornecedor"
                 }
-            ]
-        }
-        
-        resultado = nasajon.criar_pedido_compra(pedido_compra)
-        print(f"Compras - Criar pedido: {json.dumps(resultado, indent=2)}")
-        print("\n")
-        
-        # 6. Vendas - Criar pedido
-        pedido_venda = {
-            "numero": "PV001",
-            "data": datetime.now().strftime("%Y-%m-%d"),
-            "cliente": {
-                "cnpj": "12345678000100",
-                "nome": "Cliente Exemplo"
-            },
-            "itens": [
-                {
-                    "codigo": "001",
-                    "descricao": "Produto A",
-                    "quantidade": 1,
-                    "valorUnitario": 1500.00
+                
+                resultado = nasajon.criar_lancamento_financeiro(lancamento_financeiro_despesa)
+                print(f"Financeiro - Criar lançamento (despesa): {json.dumps(resultado, indent=2)}")
+                print("\n")
+            
+            # 2. Contábil - Criar lançamento
+            with fases.fase('contabil'):
+                lancamento_contabil = {
+                    "identificador": "LC001",
+                    "data": datetime.now().strftime("%Y-%m-%d"),
+                    "valor": 1500.00,
+                    "debito": "1001",
+                    "credito": "2001",
+                    "historico": "Venda à vista"
                 }
-            ]
-        }
-        
-        resultado = nasajon.criar_pedido_venda(pedido_venda)
-        print(f"Vendas - Criar pedido: {json.dumps(resultado, indent=2)}")
-        print("\n")
-        
-        # 7. Estoque - Cadastrar produto
-        produto = {
-            "codigo": "P001",
-            "descricao": "Produto Teste",
-            "unidade": "UN",
-            "preco": 100.00
-        }
-        
-        resultado = nasajon.cadastrar_produto(produto)
-        print(f"Estoque - Cadastrar produto: {json.dumps(resultado, indent=2)}")
-        print("\n")
-        
-        # 8. Patrimônio - Cadastrar bem
-        bem = {
-            "codigo": "B001",
-            "descricao": "Computador",
-            "valor": 3000.00,
-            "dataAquisicao": datetime.now().strftime("%Y-%m-%d")
-        }
+                
+                resultado = nasajon.criar_lancamento_contabil(lancamento_contabil)
+                print(f"Contábil - Criar lançamento: {json.dumps(resultado, indent=2)}")
+                print("\n")
+            
+            # 3. Fiscal - Emitir nota fiscal
+            with fases.fase('fiscal'):
+                nota_fiscal = {
+                    "numero": "NF001",
+                    "data": datetime.now().strftime("%Y-%m-%d"),
+                    "valor": 1500.00,
+                    "cliente": {
+                        "cnpj": "12345678000100",
+                        "nome": "Cliente Exemplo"
+                    },
+                    "itens": [
+                        {
+                            "codigo": "001",
+                            "descricao": "Produto A",
+                            "quantidade": 1,
+                            "valorUnitario": 1500.00
+                        }
+                    ]
+                }
+                
+                resultado = nasajon.emitir_nota_fiscal(nota_fiscal)
+                print(f"Fiscal - Emitir nota fiscal: {json.dumps(resultado, indent=2)}")
+                print("\n")
+            
+            # 4. RH - Cadastrar funcionário
+            with fases.fase('rh'):
+                funcionario = {
+                    "matricula": "F001",
+                    "nome": "João Silva",
+                    "cpf": "12345678900",
+                    "cargo": "Analista",
+                    "salario": 5000.00,
+                    "dataAdmissao": datetime.now().strftime("%Y-%m-%d")
+                }
+                
+                resultado = nasajon.cadastrar_funcionario(funcionario)
+                print(f"RH - Cadastrar funcionário: {json.dumps(resultado, indent=2)}")
+                print("\n")
+            
+            # 5. Compras - Criar pedido
+            with fases.fase('compras'):
+                pedido_compra = {
+                    "numero": "PC001",
+                    "data": datetime.now().strftime("%Y-%m-%d"),
+                    "fornecedor": {
+                        "cnpj": "98765432000100",
+                        "nome": "Fornecedor Exemplo"
+                    },
+                    "itens": [
+                        {
+                            "codigo": "001",
+                            "descricao": "Material de escritório",
+                            "quantidade": 10,
+                            "valorUnitario": 50.00
+                        }
+                    ]
+                }
+                
+                resultado = nasajon.criar_pedido_compra(pedido_compra)
+                print(f"Compras - Criar pedido: {json.dumps(resultado, indent=2)}")
+                print("\n")
+            
+            # 6. Vendas - Criar pedido
+            with fases.fase('vendas'):
+                pedido_venda = {
+                    "numero": "PV001",
+                    "data": datetime.now().strftime("%Y-%m-%d"),
+                    "cliente": {
+                        "cnpj": "12345678000100",
+                        "nome": "Cliente Exemplo"
+                    },
+                    "itens": [
+                        {
+                            "codigo": "001",
+                            "descricao": "Produto A",
+                            "quantidade": 1,
+                            "valorUnitario": 1500.00
+                        }
+                    ]
+                }
+                
+                resultado = nasajon.criar_pedido_venda(pedido_venda)
+                print(f"Vendas - Criar pedido: {json.dumps(resultado, indent=2)}")
+                print("\n")
+            
+            # 7. Estoque - Cadastrar produto
+            with fases.fase('estoque'):
+                produto = {
+                    "codigo": "P001",
+                    "descricao": "Produto Teste",
+                    "unidade": "UN",
+                    "preco": 100.00
+                }
+                
+                resultado = nasajon.cadastrar_produto(produto)
+                print(f"Estoque - Cadastrar produto: {json.dumps(resultado, indent=2)}")
+                print("\n")
+            
+            # 8. Patrimônio - Cadastrar bem
+            with fases.fase('patrimonio'):
+                bem = {
+                    "codigo": "B001",
+                    "descricao": "Computador",
+                    "valor": 3000.00,
+                    "dataAquisicao": datetime.now().strftime("%Y-%m-%d")
+                }
+                
+                resultado = nasajon.cadastrar_bem(bem)
+                print(f"Patrimônio - Cadastrar bem: {json.dumps(resultado, indent=2)}")
+                print("\n")
         
-        resultado = nasajon.cadastrar_bem(bem)
-        print(f"Patrimônio - Cadastrar bem: {json.dumps(resultado, indent=2)}")
-        print("\n")
+        # 9. Registros sintéticos em volume
+        if volume:
+            gerador = GeradorDados(semente)
+            for modulo in MODULOS:
+                with fases.fase(f'sinteticos_{modulo}') as fase:
+                    lotes = lotes_pendentes(nasajon, modulo, gerador.lotes(modulo, volume))
+                    criados, erros = carregar_simulacao(nasajon, modulo, lotes)
+                decorrido = fase.resultado['parede_s']
+                print(f"Sintéticos - {modulo}: {criados} criados, {erros} com erro em {decorrido:.1f}s "
+                      f"({criados / decorrido * 60 if decorrido else 0:,.0f} registros/min)")
+            print("\n")
         
         # Exportar dados
-        resultado = nasajon.exportar_dados()
-        print(f"Exportação de dados: {json.dumps(resultado, indent=2)}")
-        print("\n")
+        with fases.fase('exportacao'):
+            resultado = nasajon.exportar_dados(incremental=not exportacao_completa, compressao=compressao)
+            print(f"Exportação de dados: {json.dumps(resultado, indent=2)}")
+            print("\n")
         
         # Gerar relatório
-        resultado = nasajon.gerar_relatorio()
-        print(f"Geração de relatório: {json.dumps(resultado, indent=2)}")
-        print("\n")
+        with fases.fase('relatorio'):
+            resultado = nasajon.gerar_relatorio()
+            print(f"Geração de relatório: {json.dumps(resultado, indent=2)}")
+            print("\n")
+        
+        # Relatórios analíticos (fluxo de caixa, saldos por conta e balancete)
+        for tipo in analitico.RELATORIOS:
+            with fases.fase(f"relatorio_{tipo.replace('-', '_')}"):
+                resultado = nasajon.gerar_relatorio(tipo)
+            print(f"Relatório {tipo}: {json.dumps(resultado, indent=2)}")
+            print("\n")
+        
+        # Tempos de cada fase (e arquivos de perfil)
+        if perfil:
+            resultado = nasajon.gerar_relatorio_perfil(fases.relatorio())
+            print(f"Perfil das fases: {json.dumps(resultado, indent=2)}")
+            print("\n")
         
         print("=== Simulação concluída com sucesso ===")
     
     except Exception as e:
         print(f"ERRO: {str(e)}")
         print("Simulação interrompida devido a um erro.")
+    
+    finally:
+        nasajon.encerrar()
+        motor.fechar()
 
 
 if __name__ == "__main__":
-    simular_operacoes()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Simulação local da API Nasajon")
+    parser.add_argument('--silencioso', action='store_true', help="Não repete o log no terminal")
+    parser.add_argument('--exportacao-completa', action='store_true',
+                        help="Regrava todos os registros em vez de acrescentar apenas os novos")
+    parser.add_argument('--compressao', choices=['gzip', 'zstd'], help="Comprime os arquivos exportados")
+    parser.add_argument('--notas', choices=FORMATOS_NOTAS, default='arquivos',
+                        help="Formato dos arquivos de notas fiscais (um por nota ou segmentos com índice)")
+    parser.add_argument('--volume', type=int, default=0,
+                        help="Registros sintéticos gerados por módulo (ver gerador_dados.py)")
+    parser.add_argument('--semente', type=int, default=0, help="Semente dos registros sintéticos")
+    parser.add_argument('--perfil', choices=MODOS_PERFIL, default=os.environ.get('NASAJON_PERFIL') or None,
+                        help="Grava o perfil das fases em logs/perfis/ e os tempos em relatorios/")
+    parser.add_argument('--perfil-fases', nargs='+', metavar='FASE',
+                        help="Fases perfiladas (ex.: exportacao sinteticos_fiscal); padrão: todas")
+    parser.add_argument('--armazenamento', choices=['memoria', 'sqlite', 'wal'],
+                        default=os.environ.get('NASAJON_ARMAZENAMENTO', 'memoria'),
+                        help="Motor que persiste os registros (sqlite: arquivo em NASAJON_SQLITE, "
+                             "padrão dados/nasajon.db; wal: diretório em NASAJON_WAL, padrão dados/wal)")
+    args = parser.parse_args()
+    
+    simular_operacoes(
+        silencioso=args.silencioso,
+        exportacao_completa=args.exportacao_completa,
+        compressao=args.compressao,
+        formato_notas=args.notas,
+        volume=args.volume,
+        semente=args.semente,
+        perfil=args.perfil,
+        fases_perfil=args.perfil_fases,
+        armazenamento=args.armazenamento
+    )
\ No newline at end of file
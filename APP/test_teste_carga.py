@@ -0,0 +1,22 @@
+import random
+
+from teste_carga import gerar_registro
+
+
+def cpfs_execucao(prefixo, workers=4, registros=500):
+    """CPFs gerados por uma execução, como nos workers do executar_carga"""
+    cpfs = []
+    for numero in range(workers):
+        rnd = random.Random(numero)
+        for enviado in range(registros):
+            cpfs.append(gerar_registro('rh', f"{prefixo}-{numero}-{enviado}", rnd)["cpf"])
+    return cpfs
+
+
+def test_cpfs_nao_se_repetem_entre_execucoes():
+    primeira = cpfs_execucao("CARGAaaaaaaaa")
+    segunda = cpfs_execucao("CARGAbbbbbbbb")
+    assert len(set(primeira)) == len(primeira)
+    assert len(set(segunda)) == len(segunda)
+    assert not set(primeira) & set(segunda)
+    assert all(len(cpf) == 11 and cpf.isdigit() for cpf in primeira + segunda)
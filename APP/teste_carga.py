@@ -0,0 +1,296 @@
+"""
+Teste de carga da API: vários workers concorrentes enviando registros
+sintéticos para as rotas de criação dos oito módulos a uma taxa alvo
+
+Usado pelo modo --carga do client_simulation.py.
+"""
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+
+import requests
+
+from cliente_nasajon import ROTAS, ClienteNasajon
+
+def data_aleatoria(rnd):
+    """Data aleatória no último ano (YYYY-MM-DD)"""
+    return (date.today() - timedelta(days=rnd.randint(0, 365))).isoformat()
+
+
+def documento_aleatorio(rnd, digitos):
+    """Sequência numérica aleatória (CNPJ, CPF)"""
+    return ''.join(rnd.choice('0123456789') for _ in range(digitos))
+
+
+def documento_da_chave(chave, digitos):
+    """Sequência numérica derivada da chave natural, para documentos únicos (CPF)
+
+    Depende apenas da chave (que inclui o prefixo da execução), então não se
+    repete entre execuções contra o mesmo servidor como a sequência de um
+    gerador com semente fixa.
+    """
+    numero = int.from_bytes(hashlib.sha1(chave.encode('utf-8')).digest(), 'big')
+    return f"{numero % 10 ** digitos:0{digitos}d}"
+
+
+def itens_aleatorios(rnd):
+    """Lista de 1 a 5 itens de nota ou pedido"""
+    return [
+        {
+            "codigo": f"{rnd.randint(1, 999):03d}",
+            "descricao": f"Produto {rnd.randint(1, 999)}",
+            "quantidade": rnd.randint(1, 20),
+            "valorUnitario": round(rnd.uniform(1, 500), 2)
+        }
+        for _ in range(rnd.randint(1, 5))
+    ]
+
+
+def gerar_registro(modulo, chave, rnd):
+    """Gera um registro sintético válido de um módulo, com a chave natural informada"""
+    if modulo == 'financeiro':
+        return {
+            "identificador": chave,
+            "data": data_aleatoria(rnd),
+            "valor": round(rnd.uniform(10, 10000), 2),
+            "tipo": rnd.choice(["RECEITA", "DESPESA"]),
+            "conta": rnd.choice(["1001", "1002", "2001", "2002"]),
+            "descricao": "Lançamento de carga"
+        }
+    if modulo == 'contabil':
+        return {
+            "identificador": chave,
+            "data": data_aleatoria(rnd),
+            "valor": round(rnd.uniform(10, 10000), 2),
+            "debito": rnd.choice(["1001", "1002"]),
+            "credito": rnd.choice(["2001", "2002"]),
+            "historico": "Lançamento de carga"
+        }
+    if modulo in ('fiscal', 'vendas'):
+        registro = {
+            "numero": chave,
+            "data": data_aleatoria(rnd),
+            "cliente": {"cnpj": documento_aleatorio(rnd, 14), "nome": "Cliente de carga"},
+            "itens": itens_aleatorios(rnd)
+        }
+        if modulo == 'fiscal':
+            registro["valor"] = round(sum(i["quantidade"] * i["valorUnitario"] for i in registro["itens"]), 2)
+        return registro
+    if modulo == 'rh':
+        return {
+            "matricula": chave,
+            "nome": f"Funcionário {chave}",
+            "cpf": documento_da_chave(chave, 11),
+            "cargo": rnd.choice(["Analista", "Assistente", "Gerente"]),
+            "salario": round(rnd.uniform(1500, 20000), 2),
+            "dataAdmissao": data_aleatoria(rnd)
+        }
+    if modulo == 'compras':
+        return {
+            "numero": chave,
+            "data": data_aleatoria(rnd),
+            "fornecedor": {"cnpj": documento_aleatorio(rnd, 14), "nome": "Fornecedor de carga"},
+            "itens": itens_aleatorios(rnd)
+        }
+    if modulo == 'estoque':
+        return {
+            "codigo": chave,
+            "descricao": f"Produto {chave}",
+            "unidade": rnd.choice(["UN", "CX", "KG"]),
+            "preco": round(rnd.uniform(1, 1000), 2)
+        }
+    if modulo == 'patrimonio':
+        return {
+            "codigo": chave,
+            "descricao": f"Bem {chave}",
+            "valor": round(rnd.uniform(500, 50000), 2),
+            "dataAquisicao": data_aleatoria(rnd)
+        }
+    raise ValueError(f"Módulo desconhecido: {modulo}")
+
+
+class Histograma:
+    """Histograma de latências com faixas logarítmicas (erro relativo de ~2%)
+
+    Cada worker usa o seu; no fim eles são mesclados.
+    """
+
+    BASE = math.log(1.02)
+
+    def __init__(self):
+        self.faixas = {}
+        self.total = 0
+        self.soma = 0.0
+        self.maximo = 0.0
+
+    def registrar(self, segundos):
+        micros = max(segundos * 1e6, 1.0)
+        faixa = int(math.log(micros) / self.BASE)
+        self.faixas[faixa] = self.faixas.get(faixa, 0) + 1
+        self.total += 1
+        self.soma += segundos
+        self.maximo = max(self.maximo, segundos)
+
+    def mesclar(self, outro):
+        for faixa, quantidade in outro.faixas.items():
+            self.faixas[faixa] = self.faixas.get(faixa, 0) + quantidade
+        self.total += outro.total
+        self.soma += outro.soma
+        self.maximo = max(self.maximo, outro.maximo)
+
+    def percentil(self, p):
+        """Latência (em segundos) do percentil p (0-100)"""
+        if not self.total:
+            return 0.0
+        alvo = math.ceil(self.total * p / 100)
+        acumulado = 0
+        for faixa in sorted(self.faixas):
+            acumulado += self.faixas[faixa]
+            if acumulado >= alvo:
+                # Limite superior da faixa
+                return math.exp((faixa + 1) * self.BASE) / 1e6
+        return self.maximo
+
+
+class EstatisticasRota:
+    """Contadores e histograma de uma rota"""
+
+    def __init__(self):
+        self.histograma = Histograma()
+        self.status = {}
+        self.erros = 0
+
+    def registrar(self, segundos, status_code):
+        self.histograma.registrar(segundos)
+        self.status[status_code] = self.status.get(status_code, 0) + 1
+        if not isinstance(status_code, int) or status_code >= 400:
+            self.erros += 1
+
+    def mesclar(self, outra):
+        self.histograma.mesclar(outra.histograma)
+        for status_code, quantidade in outra.status.items():
+            self.status[status_code] = self.status.get(status_code, 0) + quantidade
+        self.erros += outra.erros
+
+
+def executar_worker(numero, base_url, api_key, modulos, rps, fim, prefixo, estatisticas, formato='json'):
+    """Envia requisições até o fim do teste, respeitando a taxa do worker"""
+    rnd = random.Random(f"{prefixo}-{numero}")
+    # Sem repetições automáticas, para que as falhas apareçam no relatório
+    cliente = ClienteNasajon(base_url, api_key, pool=1, tentativas=0, formato=formato)
+    intervalo = 1.0 / rps if rps else 0.0
+    proximo_envio = time.perf_counter()
+    enviados = 0
+
+    while True:
+        agora = time.perf_counter()
+        if agora >= fim:
+            break
+        if intervalo:
+            if proximo_envio > agora:
+                time.sleep(proximo_envio - agora)
+            proximo_envio += intervalo
+
+        modulo = modulos[enviados % len(modulos)]
+        chave = f"{prefixo}-{numero}-{enviados}"
+        registro = gerar_registro(modulo, chave, rnd)
+        enviados += 1
+
+        inicio = time.perf_counter()
+        try:
+            resposta = cliente.enviar('POST', ROTAS[modulo], registro)
+            status_code = resposta.status_code
+        except requests.exceptions.RequestException as e:
+            status_code = type(e).__name__
+        estatisticas[modulo].registrar(time.perf_counter() - inicio, status_code)
+
+    cliente.fechar()
+
+
+def executar_carga(base_url, api_key, workers=8, rps=0, duracao=30, modulos=None, formato='json'):
+    """Executa o teste de carga e retorna o relatório
+
+    rps é a taxa alvo total (0 = sem limite), dividida igualmente entre os
+    workers; formato é o dos corpos enviados ('json' ou 'msgpack').
+    """
+    modulos = modulos or list(ROTAS)
+    prefixo = f"CARGA{uuid.uuid4().hex[:8]}"
+    por_worker = [{modulo: EstatisticasRota() for modulo in modulos} for _ in range(workers)]
+
+    inicio = time.perf_counter()
+    fim = inicio + duracao
+    threads = [
+        threading.Thread(
+            target=executar_worker,
+            args=(numero, base_url, api_key, modulos, rps / workers, fim, prefixo, por_worker[numero], formato)
+        )
+        for numero in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    decorrido = time.perf_counter() - inicio
+
+    estatisticas = {modulo: EstatisticasRota() for modulo in modulos}
+    for estatisticas_worker in por_worker:
+        for modulo, estatisticas_rota in estatisticas_worker.items():
+            estatisticas[modulo].mesclar(estatisticas_rota)
+
+    return montar_relatorio(estatisticas, decorrido, workers, rps)
+
+
+def resumo(estatisticas_rota, decorrido):
+    """Resumo de uma rota (ou do total) para o relatório"""
+    histograma = estatisticas_rota.histograma
+    return {
+        "requisicoes": histograma.total,
+        "vazao_rps": round(histograma.total / decorrido, 1) if decorrido else 0,
+        "taxa_erros": round(estatisticas_rota.erros / histograma.total, 4) if histograma.total else 0,
+        "status": {str(codigo): quantidade for codigo, quantidade in estatisticas_rota.status.items()},
+        "latencia_ms": {
+            "media": round(histograma.soma / histograma.total * 1000, 2) if histograma.total else 0,
+            "p50": round(histograma.percentil(50) * 1000, 2),
+            "p95": round(histograma.percentil(95) * 1000, 2),
+            "p99": round(histograma.percentil(99) * 1000, 2),
+            "max": round(histograma.maximo * 1000, 2)
+        }
+    }
+
+
+def montar_relatorio(estatisticas, decorrido, workers, rps):
+    """Monta o relatório por rota e total"""
+    total = EstatisticasRota()
+    for estatisticas_rota in estatisticas.values():
+        total.mesclar(estatisticas_rota)
+
+    return {
+        "configuracao": {"workers": workers, "rps_alvo": rps, "duracao_s": round(decorrido, 2)},
+        "rotas": {ROTAS[modulo]: resumo(e, decorrido) for modulo, e in estatisticas.items()},
+        "total": resumo(total, decorrido)
+    }
+
+
+def imprimir_relatorio(relatorio):
+    """Imprime o relatório em forma de tabela"""
+    configuracao = relatorio["configuracao"]
+    print(f"Workers: {configuracao['workers']}  RPS alvo: {configuracao['rps_alvo'] or 'sem limite'}  "
+          f"Duração: {configuracao['duracao_s']}s")
+    print(f"{'Rota':<28}{'Req':>8}{'Req/s':>10}{'Erros':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+
+    linhas = list(relatorio["rotas"].items()) + [("TOTAL", relatorio["total"])]
+    for rota, dados in linhas:
+        latencia = dados["latencia_ms"]
+        print(f"{rota:<28}{dados['requisicoes']:>8}{dados['vazao_rps']:>10}{dados['taxa_erros']:>8.2%}"
+              f"{latencia['p50']:>10}{latencia['p95']:>10}{latencia['p99']:>10}")
+
+
+def salvar_relatorio(relatorio, arquivo):
+    """Salva o relatório em JSON"""
+    with open(arquivo, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,305 @@
+"""
+Validação dos registros, compilada a partir dos schemas do static/swagger.json
+
+Na importação, cada definição do swagger usada nas rotas de criação vira
+uma função Python gerada (sem interpretar o schema a cada registro),
+compartilhada pela API e pela simulação local. São verificados os campos
+obrigatórios, os tipos (string, number, integer, boolean, object e array),
+os valores de enum, as datas (YYYY-MM-DD, existentes no calendário) e os
+objetos e listas aninhados (cliente, fornecedor, itens).
+"""
+import json
+import os
+import re
+from datetime import date
+
+from modulos import MODULOS
+
+ARQUIVO_SWAGGER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'swagger.json')
+
+# Mensagens de erro; o {} recebe o caminho do campo (por exemplo itens[0].quantidade)
+AUSENTE = "Campo obrigatório ausente: {}"
+TIPO = "Tipo inválido: {} (esperado {})"
+ENUM = "Valor inválido: {} (use {})"
+DATA = "Data inválida: {} (use YYYY-MM-DD)"
+REGISTRO_INVALIDO = "Registro inválido"
+
+# Condição (com o valor em v) que indica tipo inválido
+CONDICOES_TIPO = {
+    'string': "v.__class__ is not str",
+    'number': "v.__class__ is not float and v.__class__ is not int",
+    'integer': "v.__class__ is not int",
+    'boolean': "v.__class__ is not bool",
+    'object': "v.__class__ is not dict",
+    'array': "v.__class__ is not list"
+}
+
+# Mesma condição, no caminho rápido, com o valor na expressão {}
+CONDICOES_RAPIDAS = {
+    'string': "{}.__class__ is str",
+    'number': "{}.__class__ in NUMEROS",
+    'integer': "{}.__class__ is int",
+    'boolean': "{}.__class__ is bool",
+    'object': "{}.__class__ is dict",
+    'array': "{}.__class__ is list"
+}
+
+FORMATO_DATA = re.compile(r'[0-9]{4}-[0-9]{2}-[0-9]{2}\Z').match
+
+# Datas já validadas: os registros repetem poucas datas distintas, e uma
+# consulta ao conjunto custa bem menos que a expressão regular
+DATAS_VALIDAS = set()
+MAXIMO_DATAS_VALIDAS = 10000
+
+
+def data_valida(v):
+    """Verifica o formato YYYY-MM-DD e se a data existe (2025-02-30 não passa)"""
+    if FORMATO_DATA(v) is None:
+        return False
+    try:
+        date.fromisoformat(v)
+    except ValueError:
+        return False
+    if len(DATAS_VALIDAS) >= MAXIMO_DATAS_VALIDAS:
+        DATAS_VALIDAS.clear()
+    DATAS_VALIDAS.add(v)
+    return True
+
+
+class Compilador:
+    """Gera o código das funções de validação a partir das definições do swagger
+
+    Cada módulo vira três funções, com as definições aninhadas ($ref)
+    expandidas no próprio corpo (sem chamadas por objeto ou item):
+
+    - validar_<modulo>(d): o caminho rápido, uma única condição que lê cada
+      campo uma vez (a ausência de um obrigatório aparece como KeyError) e
+      um laço por lista. Se tudo passa, retorna None; senão chama a função
+      detalhada, que encontra o erro.
+    - validar_lote_<modulo>(registros): o mesmo caminho rápido dentro do
+      laço do lote, sem uma chamada por registro.
+    - detalhar_<modulo>(d): verifica regra a regra e retorna None ou a
+      mensagem de erro, já pronta como literal; só os índices das listas
+      são interpolados. É também quem valida (e guarda em DATAS_VALIDAS)
+      as datas ainda não vistas.
+    """
+
+    def __init__(self, definicoes):
+        self.definicoes = definicoes
+        self.constantes = {}
+        self.variaveis = 0
+
+    def constante(self, valor):
+        nome = f"_C{len(self.constantes)}"
+        self.constantes[nome] = valor
+        return nome
+
+    @staticmethod
+    def erro(modelo, caminho, *argumentos):
+        """Expressão que retorna a mensagem de erro; caminho já vem no formato de f-string"""
+        argumentos = [str(a).replace('{', '{{').replace('}', '}}') for a in argumentos]
+        return "return f" + repr(modelo.format(caminho, *argumentos))
+
+    def objeto(self, definicao, variavel, caminho, pilha):
+        """Linhas que verificam o dict em variavel conforme uma definição"""
+        if definicao in pilha:
+            raise ValueError(f"Definição recursiva no swagger: {definicao}")
+        pilha = pilha + (definicao,)
+        schema = self.definicoes[definicao]
+        prefixo = f"{caminho}." if caminho else ""
+
+        linhas = []
+        obrigatorios = schema.get('required', [])
+        for campo in obrigatorios:
+            linhas.append(f"if {campo!r} not in {variavel}: {self.erro(AUSENTE, prefixo + campo)}")
+        for campo, propriedade in schema.get('properties', {}).items():
+            verificacao = self.valor(propriedade, prefixo + campo, len(pilha), pilha)
+            if not verificacao:
+                continue
+            if campo in obrigatorios:
+                linhas.append(f"v = {variavel}[{campo!r}]")
+                linhas.extend(verificacao)
+            else:
+                linhas.append(f"if {campo!r} in {variavel}:")
+                linhas.append(f"    v = {variavel}[{campo!r}]")
+                linhas.extend("    " + linha for linha in verificacao)
+        return linhas
+
+    def valor(self, propriedade, caminho, profundidade, pilha):
+        """Linhas que verificam o valor em v"""
+        if '$ref' in propriedade:
+            variavel = f"d{profundidade}"
+            return [
+                f"if v.__class__ is not dict: {self.erro(TIPO, caminho, 'object')}",
+                f"{variavel} = v"
+            ] + self.objeto(propriedade['$ref'].rsplit('/', 1)[-1], variavel, caminho, pilha)
+
+        tipo = propriedade.get('type')
+        linhas = []
+        if tipo in CONDICOES_TIPO:
+            linhas.append(f"if {CONDICOES_TIPO[tipo]}: {self.erro(TIPO, caminho, tipo)}")
+
+        if 'enum' in propriedade:
+            valores = self.constante(frozenset(propriedade['enum']))
+            opcoes = ', '.join(map(str, propriedade['enum']))
+            linhas.append(f"if v not in {valores}: {self.erro(ENUM, caminho, opcoes)}")
+
+        if tipo == 'string' and propriedade.get('format') == 'date':
+            linhas.append(f"if v not in DATAS_VALIDAS and not data_valida(v): {self.erro(DATA, caminho)}")
+
+        if tipo == 'array' and 'items' in propriedade:
+            indice = f"i{profundidade}"
+            item = self.valor(propriedade['items'], f"{caminho}[{{{indice}}}]", profundidade + 1, pilha)
+            if item:
+                linhas.append(f"for {indice}, v in enumerate(v):")
+                linhas.extend("    " + linha for linha in item)
+
+        return linhas
+
+    def variavel(self):
+        self.variaveis += 1
+        return f"r{self.variaveis}"
+
+    def rapido_objeto(self, definicao, variavel):
+        """Condições e laços do caminho rápido para o dict em variavel"""
+        schema = self.definicoes[definicao]
+        obrigatorios = schema.get('required', [])
+        condicoes = []
+        lacos = []
+        for campo, propriedade in schema.get('properties', {}).items():
+            condicao, lacos_campo = self.rapido_valor(propriedade, f"{variavel}[{campo!r}]")
+            if campo in obrigatorios:
+                condicoes.append(condicao or f"{campo!r} in {variavel}")
+                lacos.extend(lacos_campo)
+            elif condicao:
+                condicoes.append(f"({campo!r} not in {variavel} or {condicao})")
+                if lacos_campo:
+                    lacos.append(f"if {campo!r} in {variavel}:")
+                    lacos.extend("    " + linha for linha in lacos_campo)
+        # Obrigatórios sem propriedade: basta a presença
+        condicoes.extend(f"{campo!r} in {variavel}" for campo in obrigatorios
+                         if campo not in schema.get('properties', {}))
+        return condicoes, lacos
+
+    def rapido_valor(self, propriedade, expressao):
+        """Condição (ou None) e laços do caminho rápido para o valor em expressao"""
+        if '$ref' in propriedade:
+            variavel = expressao if expressao.isidentifier() else self.variavel()
+            primeiro = variavel if variavel == expressao else f"({variavel} := {expressao})"
+            condicoes, lacos = self.rapido_objeto(propriedade['$ref'].rsplit('/', 1)[-1], variavel)
+            return " and ".join([f"{primeiro}.__class__ is dict"] + condicoes), lacos
+
+        tipo = propriedade.get('type')
+        itens = propriedade.get('items') if tipo == 'array' else None
+        data = tipo == 'string' and propriedade.get('format') == 'date'
+        # Os conjuntos de datas e de valores de enum só têm strings: estar
+        # neles já garante o tipo string
+        enum_strings = 'enum' in propriedade and all(valor.__class__ is str for valor in propriedade['enum'])
+        modelos = []
+        if tipo in CONDICOES_RAPIDAS and not (tipo == 'string' and (data or enum_strings)):
+            modelos.append(CONDICOES_RAPIDAS[tipo])
+        if 'enum' in propriedade:
+            modelos.append("{} in " + self.constante(frozenset(propriedade['enum'])))
+        if data:
+            modelos.append("{} in DATAS_VALIDAS")
+
+        # O valor vai para uma variável quando é usado mais de uma vez
+        if expressao.isidentifier() or len(modelos) + bool(itens) < 2:
+            variavel = primeiro = expressao
+        else:
+            variavel = self.variavel()
+            primeiro = f"({variavel} := {expressao})"
+        condicoes = [modelo.format(primeiro if posicao == 0 else variavel) for posicao, modelo in enumerate(modelos)]
+
+        lacos = []
+        if itens:
+            item = self.variavel()
+            condicao, lacos_item = self.rapido_valor(itens, item)
+            if condicao or lacos_item:
+                lacos.append(f"for {item} in {variavel}:")
+                if condicao:
+                    lacos.append(f"    if not ({condicao}): raise KeyError")
+                lacos.extend("    " + linha for linha in lacos_item)
+
+        return " and ".join(condicoes) or None, lacos
+
+    def rapido(self, definicao, sucesso):
+        """Linhas do caminho rápido do registro em d0, terminando em sucesso se ele passar"""
+        condicoes, lacos = self.rapido_objeto(definicao, 'd0')
+        linhas = [f"if ({condicoes[0]}"]
+        linhas.extend(f"        and {condicao}" for condicao in condicoes[1:])
+        linhas[-1] += "):"
+        linhas.extend("    " + linha for linha in lacos)
+        linhas.append(f"    {sucesso}")
+        return linhas
+
+    def compilar(self, modulos):
+        """Compila as funções dos módulos ({modulo: definição})
+
+        Retorna {modulo: validar_<modulo>} e {modulo: validar_lote_<modulo>}.
+        """
+        linhas = []
+        for modulo, definicao in modulos.items():
+            linhas.append(f"def validar_{modulo}(d0):")
+            linhas.append("    try:")
+            linhas.extend("        " + linha for linha in self.rapido(definicao, "return None"))
+            linhas.append("    except (KeyError, TypeError):")
+            linhas.append("        pass")
+            linhas.append(f"    return detalhar_{modulo}(d0)")
+            linhas.append("")
+            linhas.append(f"def validar_lote_{modulo}(registros):")
+            linhas.append("    erros = [None] * len(registros)")
+            linhas.append("    for indice, d0 in enumerate(registros):")
+            linhas.append("        try:")
+            linhas.extend("            " + linha for linha in self.rapido(definicao, "continue"))
+            linhas.append("        except (KeyError, TypeError):")
+            linhas.append("            pass")
+            linhas.append(f"        erros[indice] = detalhar_{modulo}(d0)")
+            linhas.append("    return erros")
+            linhas.append("")
+            linhas.append(f"def detalhar_{modulo}(d0):")
+            linhas.append(f"    if d0.__class__ is not dict: return {REGISTRO_INVALIDO!r}")
+            linhas.extend("    " + linha for linha in self.objeto(definicao, 'd0', '', ()))
+            linhas.append("    return None")
+            linhas.append("")
+        self.codigo = "\n".join(linhas)
+
+        ambiente = {'data_valida': data_valida, 'DATAS_VALIDAS': DATAS_VALIDAS, 'NUMEROS': (float, int)}
+        ambiente.update(self.constantes)
+        exec(compile(self.codigo, "<validacao>", "exec"), ambiente)
+        return (
+            {modulo: ambiente[f"validar_{modulo}"] for modulo in modulos},
+            {modulo: ambiente[f"validar_lote_{modulo}"] for modulo in modulos}
+        )
+
+
+def definicoes_modulos(swagger):
+    """Definição do corpo do POST de cada módulo, lida das rotas do swagger"""
+    base = swagger.get('basePath', '')
+    modulos = {}
+    for modulo, definicao in MODULOS.items():
+        caminho = definicao['rota'][len(base):] if definicao['rota'].startswith(base) else definicao['rota']
+        for parametro in swagger['paths'][caminho]['post']['parameters']:
+            if parametro.get('in') == 'body':
+                modulos[modulo] = parametro['schema']['$ref'].rsplit('/', 1)[-1]
+    return modulos
+
+
+def compilar(arquivo=ARQUIVO_SWAGGER):
+    """Lê o swagger e compila os validadores (de registro e de lote) de todos os módulos"""
+    with open(arquivo, encoding='utf-8') as f:
+        swagger = json.load(f)
+    return Compilador(swagger['definitions']).compilar(definicoes_modulos(swagger))
+
+
+VALIDADORES, VALIDADORES_LOTE = compilar()
+
+
+def validar(modulo, registro):
+    """Retorna a mensagem de erro do registro, ou None se ele for válido"""
+    return VALIDADORES[modulo](registro)
+
+
+def validar_lote(modulo, registros):
+    """Retorna a lista de erros (ou None) de cada registro do lote"""
+    return VALIDADORES_LOTE[modulo](registros)